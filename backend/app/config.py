@@ -0,0 +1,82 @@
+"""
+Configurações da aplicação, lidas de variáveis de ambiente.
+"""
+import os
+
+# Modo de gravação das tabelas JSON:
+# - "snapshot": cada escrita regrava o arquivo inteiro (users.json, ...)
+# - "log": escritas são anexadas a <arquivo>.log e reaplicadas sobre o
+#   último snapshot na leitura (custo proporcional ao registro, não à tabela)
+STORAGE_MODE = os.getenv("COLLECTMASTER_STORAGE_MODE", "snapshot")
+
+# Checkpoint do modo "log": o log é consolidado num novo snapshot quando
+# qualquer um dos limites é atingido (0 desativa o limite)
+CHECKPOINT_LOG_BYTES = int(os.getenv("COLLECTMASTER_CHECKPOINT_LOG_BYTES", str(4 * 1024 * 1024)))
+CHECKPOINT_LOG_RECORDS = int(os.getenv("COLLECTMASTER_CHECKPOINT_LOG_RECORDS", "5000"))
+CHECKPOINT_INTERVAL_SECONDS = float(os.getenv("COLLECTMASTER_CHECKPOINT_INTERVAL_SECONDS", "300"))
+# Intervalo em que a thread de checkpoint verifica os limites
+CHECKPOINT_POLL_SECONDS = float(os.getenv("COLLECTMASTER_CHECKPOINT_POLL_SECONDS", "1"))
+
+# Backend de armazenamento (ver repository.py):
+# - "json": arquivos users.json/collections.json/items.json (padrão)
+# - "sqlite": banco SQLite em SQLITE_PATH (migração: python -m app.manutencao migrar-sqlite)
+# - "memory": dados só em memória, partindo dos arquivos JSON (testes de carga)
+STORAGE_BACKEND = os.getenv("COLLECTMASTER_STORAGE_BACKEND", "json")
+SQLITE_PATH = os.getenv("COLLECTMASTER_SQLITE_PATH", "collectmaster.db")
+
+# Gravação adiada (write-behind) das tabelas JSON: mutações dentro desta
+# janela são gravadas juntas, numa escrita por tabela. 0 = grava na hora.
+# As pendências são gravadas no desligamento da API.
+WRITE_BEHIND_SECONDS = float(os.getenv("COLLECTMASTER_WRITE_BEHIND_SECONDS", "0"))
+
+# Durabilidade das gravações JSON (snapshots são sempre atômicos):
+# - "always": fsync antes de responder (nada se perde numa queda de energia)
+# - "periodic": fsync em segundo plano a cada FSYNC_INTERVAL_SECONDS
+# - "never": confia no cache do sistema operacional (mais rápido)
+# Custo de cada política: python -m benchmarks.bench_fsync
+FSYNC_POLICY = os.getenv("COLLECTMASTER_FSYNC_POLICY", "periodic")
+FSYNC_INTERVAL_SECONDS = float(os.getenv("COLLECTMASTER_FSYNC_INTERVAL_SECONDS", "1"))
+
+# Validação completa (Pydantic) de cada registro ao carregar as tabelas JSON.
+# Desligada, a carga confia nos arquivos, que são escritos pela própria API;
+# a verificação fica disponível em: python -m app.manutencao verificar
+STORAGE_VERIFY = os.getenv("COLLECTMASTER_STORAGE_VERIFY", "0") == "1"
+
+# Biblioteca JSON do log de escrita e do journal de commits:
+# "auto" (orjson se instalada), "orjson" ou "json" (biblioteca padrão)
+JSON_LIBRARY = os.getenv("COLLECTMASTER_JSON_LIBRARY", "auto")
+# Snapshots JSON indentados, legíveis para quem abre os arquivos.
+# "0" grava compacto (arquivos menores, gravação mais rápida).
+JSON_PRETTY = os.getenv("COLLECTMASTER_JSON_PRETTY", "1") == "1"
+
+# Cache binário das tabelas JSON (<arquivo>.cache): gravado no desligamento
+# e na inicialização, e usado na próxima partida se os arquivos JSON não
+# mudaram, sem parse nem validação. "1" ativa.
+BINARY_CACHE = os.getenv("COLLECTMASTER_BINARY_CACHE", "0") == "1"
+
+# Acelerador de consultas dos itens: cópia colunar (NumPy) para filtros por
+# valor, ordenação e totais por coleção/dono vetorizados. É mantida além dos
+# registros, então aumenta a memória usada. "0" (padrão, consultas em Python
+# puro), "1" (exige o NumPy) ou "auto" (se o NumPy estiver instalado)
+ITEM_COLUMNS = os.getenv("COLLECTMASTER_ITEM_COLUMNS", "0")
+
+# Armazenamento dos itens no backend JSON:
+# - "json": items.json, inteiro em memória (padrão)
+# - "ndjson": items.ndjson lido por mmap; em memória fica só um índice
+#   (para catálogos grandes). Na primeira partida os itens de items.json
+#   são copiados para items.ndjson.
+# - "sharded": um arquivo por coleção em items.shards/ (com manifest.json);
+#   cada escrita regrava só o arquivo da coleção do item. Na primeira
+#   partida os itens de items.json são distribuídos pelos shards.
+ITEM_STORAGE = os.getenv("COLLECTMASTER_ITEM_STORAGE", "json")
+
+# Modo de depuração: cada resposta leva o cabeçalho X-Storage-Stats com as
+# operações de armazenamento da requisição (chamadas load_*/save_*, arquivos
+# e bytes lidos/gravados, tempo de parse, validação, serialização e fsync).
+# O acumulado fica sempre em GET /api/metrics/storage.
+DEBUG = os.getenv("COLLECTMASTER_DEBUG", "0") == "1"
+
+# Métricas no formato do Prometheus em GET /metrics (contagem e latência por
+# rota, requisições em andamento, arquivos, caches, bcrypt). "0" desativa o
+# middleware e o endpoint.
+METRICS = os.getenv("COLLECTMASTER_METRICS", "1") == "1"
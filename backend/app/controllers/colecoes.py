@@ -1,5 +1,6 @@
 from fastapi import HTTPException, status
-from .. import schemas, db_json
+from .. import schemas
+from ..repository import get_repository
 from ..entities.colecao import EColecao
 from ..entities.item import EItem
 
@@ -15,8 +16,7 @@ class CColecoes:
     @staticmethod
     def createCollection(dados: schemas.CollectionCreate) -> schemas.CollectionPublic:
 
-        all_collections = db_json.load_collections()
-        new_id = 1 if not all_collections else all_collections[-1].id + 1
+        new_id = get_repository().next_collection_id()
         
         final_image = dados.image_url or f"https://via.placeholder.com/300x200/4F518C/FFFFFF?text={dados.name}"
         
@@ -1,7 +1,8 @@
 import uuid
 from typing import Optional
 from fastapi import HTTPException, status
-from .. import schemas, security, db_json
+from .. import schemas, security
+from ..repository import get_repository
 from ..entities.colecionador import EColecionador
 
 """
@@ -34,7 +35,7 @@ class CRecuperarSenha:
 
         token = CRecuperarSenha.gerarToken()
 
-        db_json.update_user_reset_token(email=email, token=token)
+        get_repository().update_user_reset_token(email=email, token=token)
         
         CRecuperarSenha.enviarToken(email=email, token=token)
         
@@ -67,7 +68,7 @@ class CRecuperarSenha:
     @staticmethod
     def confirmar_recuperacao(token: str, nova_senha: str) -> dict:
         
-        user = db_json.get_user_by_reset_token(token=token)
+        user = get_repository().get_user_by_reset_token(token=token)
         
         if not user:
             raise HTTPException(
@@ -77,7 +78,7 @@ class CRecuperarSenha:
         
         hashed_password = security.get_password_hash(nova_senha)
         
-        db_json.update_user_password(
+        get_repository().update_user_password(
             user_id=user.id,
             new_hashed_password=hashed_password
         )
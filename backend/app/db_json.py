@@ -1,230 +1,536 @@
-import json
-from typing import List, Optional
-from .schemas import UserInDB, CollectionInDB, ItemInDB, ItemUpdate, CollectionUpdate, UserUpdate
+import functools
+import os
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from .schemas import UserInDB, CollectionInDB, ItemInDB, ItemUpdate, CollectionUpdate, UserUpdate, normalize_email
+from . import config
+from .repository import ITEM_SORT_FIELDS
+from .storage import (Checkpointer, ColumnStore, FsyncPolicy, JsonTable, NdjsonTable, ProcessLock, ShardedTable,
+                      StorageWriter, UnitOfWork, columns_enabled, get_serializer, ndjson_path, shards_directory,
+                      stats)
 
 DB_FILE = "users.json"
+COLLECTIONS_DB_FILE = "collections.json"
+ITEMS_DB_FILE = "items.json"
+LOCK_FILE = "collectmaster.lock"
+JOURNAL_FILE = "collectmaster.journal"
 
-def load_users() -> List[UserInDB]:
-    try:
-        with open(DB_FILE, "r") as f:
-            users_data = json.load(f)
-            return [UserInDB(**user) for user in users_data]
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
-
-def save_users(users: List[UserInDB]):
-    with open(DB_FILE, "w") as f:
-        users_data = [user.model_dump() for user in users]
-        json.dump(users_data, f, indent=2)
-
-def get_user_by_email(email: str) -> Optional[UserInDB]:
-    users = load_users()
-    for user in users:
-        if user.email == email:
-            return user
-    return None
-
-def create_user(user: UserInDB) -> UserInDB:
-    users = load_users()
-
-    users.append(user)
-    
-    save_users(users)
-    return user
 
-COLLECTIONS_DB_FILE = "collections.json"
+def mutation(method):
+    """
+    Executa o método na thread de escrita do repositório: mutações
+    concorrentes são aplicadas uma de cada vez, na ordem de chegada, e o
+    ler-alterar-gravar de cada uma não é intercalado com o de outra.
+    Entre processos, a mutação roda sob o lock do arquivo LOCK_FILE.
 
-def load_collections() -> List[CollectionInDB]:
-    try:
-        with open(COLLECTIONS_DB_FILE, "r") as f:
-            data = json.load(f)
-            return [CollectionInDB(**col) for col in data]
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
-
-def save_collections(collections: List[CollectionInDB]):
-    with open(COLLECTIONS_DB_FILE, "w") as f:
-        # Converte para dicionário para salvar no JSON
-        data = [col.model_dump() for col in collections]
-        json.dump(data, f, indent=2)
-
-def create_collection_in_db(collection: CollectionInDB) -> CollectionInDB:
-    collections = load_collections()
-    collections.append(collection)
-    save_collections(collections)
-    return collection
-
-def get_collections_by_owner_id(owner_id: int) -> List[CollectionInDB]:
-    collections = load_collections()
-    return [col for col in collections if col.owner_id == owner_id]
-
-def update_collection_in_db(collection_id: int, collection_update: CollectionUpdate) -> Optional[CollectionInDB]:
-    collections = load_collections()
-    
-    for i, col in enumerate(collections):
-        if col.id == collection_id:
-            # Pydantic magic: atualiza apenas os campos enviados
-            update_data = collection_update.model_dump(exclude_unset=True)
-            updated_col = col.model_copy(update=update_data)
-            
-            collections[i] = updated_col
-            save_collections(collections)
-            return updated_col
-            
-    return None
+    Cada mutação é uma transação (UnitOfWork): as tabelas que ela altera
+    são gravadas juntas no final, uma vez cada, ou nenhuma se der erro.
+    """
+    def locked(self, *args, **kwargs):
+        with self._unit_of_work.transaction():
+            return method(self, *args, **kwargs)
 
-ITEMS_DB_FILE = "items.json"
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self._writer.call(locked, self, *args, **kwargs)
+    return wrapper
+
+
+def committed(method):
+    """
+    Leitura sem passar pela thread de escrita, mas só do que já foi
+    confirmado: não vê as mutações de uma transação em andamento (ver
+    UnitOfWork.read_committed).
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self._unit_of_work.read_committed(method, self, *args, **kwargs)
+    return wrapper
+
+
+class JsonRepository:
+    """
+    Implementação do repositório (ver repository.Repository) sobre os
+    arquivos users.json, collections.json e items.json.
+
+    Todas as mutações passam pela thread de escrita (StorageWriter, via
+    @mutation); as leituras acessam direto a cópia em memória, no último
+    estado confirmado (@committed).
+
+    Seguro com vários workers (`uvicorn --workers N`): as mutações de todos
+    os processos são serializadas por um lock de arquivo (ProcessLock) e
+    cada processo recarrega as tabelas que outro alterou.
+    """
+
+    def __init__(self, users_path: str = DB_FILE, collections_path: str = COLLECTIONS_DB_FILE,
+                 items_path: str = ITEMS_DB_FILE, mode: Optional[str] = None,
+                 durability: Optional[FsyncPolicy] = None):
+        self.mode = mode = mode or config.STORAGE_MODE
+        self.durability = durability = durability or FsyncPolicy(
+            config.FSYNC_POLICY, config.FSYNC_INTERVAL_SECONDS)
+        # O modo "memory" nunca grava: não há o que coordenar entre processos
+        lock_path = os.path.join(os.path.dirname(users_path), LOCK_FILE)
+        self._process_lock = None if mode == "memory" else ProcessLock(lock_path)
+
+        options = dict(
+            mode=mode,
+            write_behind_seconds=config.WRITE_BEHIND_SECONDS,
+            durability=durability,
+            verify=config.STORAGE_VERIFY,
+            process_lock=self._process_lock,
+            serializer=get_serializer(config.JSON_LIBRARY),
+            pretty=config.JSON_PRETTY,
+            binary_cache=config.BINARY_CACHE,
+        )
+
+        # Cache em memória: o arquivo só é relido quando muda no disco.
+        # Índices únicos por email (normalizado) e por token de reset de senha.
+        self._users_table = JsonTable(users_path, UserInDB, unique={
+            "email": lambda user: normalize_email(user.email),
+            "reset_token": lambda user: user.reset_token,
+        }, version_slot=0, **options)
+
+        self._collections_table = JsonTable(collections_path, CollectionInDB, multi={
+            "owner_id": lambda col: col.owner_id,
+        }, version_slot=1, **options)
+
+        if config.ITEM_STORAGE == "ndjson":
+            # Itens fora da memória: só o índice fica carregado (ver storage/ndjson.py)
+            self._items_table = NdjsonTable(
+                ndjson_path(items_path), ItemInDB, group="collection_id", mode=mode, durability=durability,
+                process_lock=self._process_lock, version_slot=2, verify=config.STORAGE_VERIFY,
+                serializer=options["serializer"],
+            )
+            self._import_json_items(items_path)
+        elif config.ITEM_STORAGE == "sharded":
+            # Um arquivo por coleção: cada escrita regrava só a coleção do item
+            # (ver storage/shards.py). As versões dos shards ocupam as
+            # posições do arquivo de lock a partir da 3.
+            self._items_table = ShardedTable(
+                shards_directory(items_path), ItemInDB, shard_by="collection_id",
+                version_slot=2, first_shard_slot=3, **options,
+            )
+            self._import_json_items(items_path)
+        elif config.ITEM_STORAGE == "json":
+            # Acelerador das consultas (search_items, get_item_totals): cópia
+            # colunar dos itens, além dos registros; desligado por padrão
+            item_columns = ColumnStore(
+                numeric={"quantity": "int64", "estimated_value": "float64", "collection_id": "int64"},
+                text=("name",),
+            ) if columns_enabled(config.ITEM_COLUMNS) else None
+
+            self._items_table = JsonTable(items_path, ItemInDB, multi={
+                "collection_id": lambda item: item.collection_id,
+            }, version_slot=2, columns=item_columns, **options)
+        else:
+            raise ValueError(f"Armazenamento de itens inválido: {config.ITEM_STORAGE}")
+
+        # Commit atômico entre as tabelas (item + totais da coleção); um
+        # journal interrompido por uma queda é reaplicado aqui, na partida
+        self._unit_of_work = UnitOfWork(
+            self.all_tables(),
+            journal_path=None if mode == "memory" else os.path.join(os.path.dirname(users_path), JOURNAL_FILE),
+            durability=durability, process_lock=self._process_lock, serializer=options["serializer"],
+        )
+        self._unit_of_work.recover()
+
+        self._writer = StorageWriter()
+        self._checkpointer = Checkpointer(
+            self.all_tables(),
+            max_log_bytes=config.CHECKPOINT_LOG_BYTES,
+            max_log_records=config.CHECKPOINT_LOG_RECORDS,
+            max_age_seconds=config.CHECKPOINT_INTERVAL_SECONDS,
+            poll_seconds=config.CHECKPOINT_POLL_SECONDS,
+        )
+
+    def _cross_process(self):
+        return self._process_lock if self._process_lock is not None else nullcontext()
+
+    def _import_json_items(self, items_path: str):
+        """Primeira partida com items.ndjson ou items.shards: copia os itens de items.json (snapshot + log)."""
+        table = self._items_table
+        if os.path.exists(table.path):
+            return
+        with self._cross_process():
+            if os.path.exists(table.path):
+                return  # outro worker já copiou
+            items = JsonTable(items_path, ItemInDB, mode="memory", serializer=table.serializer).rows()
+            if items:
+                table.save(items)
+
+    # --- Usuários ---
+
+    @committed
+    def load_users(self) -> List[UserInDB]:
+        stats.count("load_users")
+        return self._users_table.rows()
+
+    @mutation
+    def save_users(self, users: List[UserInDB]):
+        stats.count("save_users")
+        self._users_table.save(users)
+
+    @committed
+    def get_user_by_email(self, email: str) -> Optional[UserInDB]:
+        return self._users_table.get_by("email", normalize_email(email))
+
+    @committed
+    def get_user_by_id(self, user_id: int) -> Optional[UserInDB]:
+        return self._users_table.get(user_id)
+
+    @mutation
+    def create_user(self, user: UserInDB) -> UserInDB:
+        return self._users_table.insert(user)
+
+    @mutation
+    def update_user_in_db(self, user_id: int, user_update: UserUpdate) -> Optional[UserInDB]:
+        user = self._users_table.get(user_id)
+        if user is None:
+            return None
+
+        # Atualiza apenas os campos enviados
+        update_data = user_update.model_dump(exclude_unset=True)
+
+        # Copia e atualiza
+        updated_user = user.model_copy(update=update_data)
+
+        return self._users_table.replace(updated_user)
+
+    @mutation
+    def next_user_id(self) -> int:
+        return self._users_table.next_key()
+
+    @committed
+    def get_user_by_reset_token(self, token: str) -> Optional[UserInDB]:
+        """Busca um usuário pelo token de reset de senha."""
+        return self._users_table.get_by("reset_token", token)
+
+    @mutation
+    def update_user_reset_token(self, email: str, token: Optional[str]) -> Optional[UserInDB]:
+        """Atualiza o token de reset de senha de um usuário."""
+        user = self.get_user_by_email(email)
+        if user is None:
+            return None
+
+        # Atualiza o token de reset
+        updated_user = user.model_copy(update={"reset_token": token})
+        return self._users_table.replace(updated_user)
+
+    @mutation
+    def update_user_password(self, user_id: int, new_hashed_password: str) -> Optional[UserInDB]:
+        """Atualiza a senha de um usuário e remove o token de reset."""
+        user = self._users_table.get(user_id)
+        if user is None:
+            return None
+
+        # Atualiza a senha e remove o token
+        updated_user = user.model_copy(update={
+            "hashed_password": new_hashed_password,
+            "reset_token": None
+        })
+        return self._users_table.replace(updated_user)
+
+    # --- Coleções ---
+
+    @committed
+    def load_collections(self) -> List[CollectionInDB]:
+        stats.count("load_collections")
+        return self._collections_table.rows()
+
+    @mutation
+    def save_collections(self, collections: List[CollectionInDB]):
+        stats.count("save_collections")
+        self._collections_table.save(collections)
+
+    @mutation
+    def next_collection_id(self) -> int:
+        return self._collections_table.next_key()
+
+    @mutation
+    def create_collection_in_db(self, collection: CollectionInDB) -> CollectionInDB:
+        return self._collections_table.insert(collection)
+
+    @committed
+    def get_collection_by_id(self, collection_id: int) -> Optional[CollectionInDB]:
+        return self._collections_table.get(collection_id)
+
+    @committed
+    def get_collections_by_owner_id(self, owner_id: int) -> List[CollectionInDB]:
+        return self._collections_table.find_by("owner_id", owner_id)
+
+    @mutation
+    def update_collection_in_db(self, collection_id: int, collection_update: CollectionUpdate) -> Optional[CollectionInDB]:
+        col = self._collections_table.get(collection_id)
+        if col is None:
+            return None
+
+        # Pydantic magic: atualiza apenas os campos enviados
+        update_data = collection_update.model_dump(exclude_unset=True)
+        updated_col = col.model_copy(update=update_data)
+
+        return self._collections_table.replace(updated_col)
+
+    @mutation
+    def delete_collection_in_db(self, collection_id: int) -> bool:
+        if self._collections_table.get(collection_id) is None:
+            return False
+
+        # 1. Remove todos os itens dessa coleção (Limpeza em cascata)
+        collection_items = self.get_items_by_collection_id(collection_id)
+        self._items_table.delete_many([item.id for item in collection_items])
+
+        # 2. Remove a coleção (as duas tabelas são gravadas juntas, no commit)
+        self._collections_table.delete(collection_id)
+        return True
+
+    # --- Itens ---
+
+    @committed
+    def load_items(self) -> List[ItemInDB]:
+        stats.count("load_items")
+        return self._items_table.rows()
+
+    @mutation
+    def save_items(self, items: List[ItemInDB]):
+        stats.count("save_items")
+        self._items_table.save(items)
+
+    @mutation
+    def next_item_id(self) -> int:
+        return self._items_table.next_key()
+
+    @mutation
+    def create_item_in_db(self, item: ItemInDB) -> ItemInDB:
+        self._items_table.insert(item)
+
+        # Mágica: Atualiza o valor total e contagem na coleção pai!
+        self._apply_item_delta(None, item)
+
+        return item
+
+    @committed
+    def get_items_by_collection_id(self, collection_id: int) -> List[ItemInDB]:
+        return self._items_table.find_by("collection_id", collection_id)
+
+    @committed
+    def get_item_by_id(self, item_id: int) -> Optional[ItemInDB]:
+        return self._items_table.get(item_id)
+
+    @mutation
+    def update_item_in_db(self, item_id: int, item_update: ItemUpdate) -> Optional[ItemInDB]:
+        item = self._items_table.get(item_id)
+        if item is None:
+            return None
+
+        # Atualiza apenas os campos que foram enviados (não nulos)
+        update_data = item_update.model_dump(exclude_unset=True)
+        updated_item = self._items_table.replace(item.model_copy(update=update_data))
+
+        # Atualiza estatísticas da coleção
+        self._apply_item_delta(item, updated_item)
+        return updated_item
+
+    @mutation
+    def delete_item_in_db(self, item_id: int) -> bool:
+        item = self._items_table.delete(item_id)
+        if item is None:
+            return False
+
+        self._apply_item_delta(item, None) # Desconta o item removido
+        return True
+
+    # --- Consultas sobre os itens ---
+
+    def _items_of(self, collection_ids: Optional[List[int]]) -> List[ItemInDB]:
+        if collection_ids is None:
+            return self.load_items()
+        return [item for collection_id in dict.fromkeys(collection_ids)
+                for item in self.get_items_by_collection_id(collection_id)]
+
+    @committed
+    def search_items(self, collection_ids: Optional[List[int]] = None, min_value: Optional[float] = None,
+                     max_value: Optional[float] = None, sort_by: str = "id",
+                     descending: bool = False) -> List[ItemInDB]:
+        """
+        Itens das coleções dadas (todas, se None) com estimated_value entre
+        min_value e max_value (inclusive), ordenados por `sort_by` (um de
+        ITEM_SORT_FIELDS). Com a cópia colunar, filtro e ordenação são
+        vetorizados e só os itens devolvidos são buscados na tabela.
+        """
+        if sort_by not in ITEM_SORT_FIELDS:
+            raise ValueError(f"Campo de ordenação inválido: {sort_by}")
+        columns = self._items_table.columns()
+        if columns is not None:
+            keys = columns.select(
+                equals_any=None if collection_ids is None else {"collection_id": collection_ids},
+                ranges={"estimated_value": (min_value, max_value)},
+                order_by=sort_by, descending=descending,
+            )
+            return self._items_table.get_many(keys)
+
+        items = [
+            item for item in self._items_of(collection_ids)
+            if (min_value is None or item.estimated_value >= min_value)
+            and (max_value is None or item.estimated_value <= max_value)
+        ]
+        # Mesma ordem da versão colunar: por `sort_by`, empates por id
+        items.sort(key=lambda item: item.id)
+        if sort_by != "id":
+            items.sort(key=lambda item: getattr(item, sort_by), reverse=descending)
+        elif descending:
+            items.reverse()
+        return items
+
+    @committed
+    def get_item_totals(self, collection_ids: Optional[List[int]] = None) -> Dict[int, Tuple[int, float]]:
+        """
+        (itemCount, value) calculados a partir dos itens, por coleção (só as
+        que têm itens). Com a cópia colunar, uma única agregação vetorizada.
+        """
+        columns = self._items_table.columns()
+        if columns is not None:
+            sums = columns.sum_by(
+                "collection_id",
+                {"itemCount": ("quantity",), "value": ("quantity", "estimated_value")},
+                equals_any=None if collection_ids is None else {"collection_id": collection_ids},
+            )
+            return {collection_id: (total["itemCount"], total["value"]) for collection_id, total in sums.items()}
+
+        totals: Dict[int, Tuple[int, float]] = {}
+        for item in self._items_of(collection_ids):
+            count, value = totals.get(item.collection_id, (0, 0.0))
+            totals[item.collection_id] = (count + item.quantity, value + item.estimated_value * item.quantity)
+        return totals
+
+    # --- Totais das coleções ---
+
+    @staticmethod
+    def _item_stats(item: Optional[ItemInDB]) -> tuple:
+        """Contribuição de um item para (itemCount, value) da sua coleção."""
+        if item is None:
+            return (0, 0.0)
+        return (item.quantity, item.estimated_value * item.quantity)
+
+    def _add_collection_stats(self, collection_id: int, count_delta: int, value_delta: float):
+        if count_delta == 0 and value_delta == 0:
+            return
+
+        col = self._collections_table.get(collection_id)
+        if col is None:
+            return
+
+        self._collections_table.replace(col.model_copy(update={
+            "itemCount": col.itemCount + count_delta,
+            "value": col.value + value_delta,
+        }))
+
+    def _apply_item_delta(self, old: Optional[ItemInDB], new: Optional[ItemInDB]):
+        """
+        Atualiza itemCount e value da coleção aplicando apenas a diferença
+        entre o item antigo e o novo (None = item inexistente), em O(1).
+        """
+        old_count, old_value = self._item_stats(old)
+        new_count, new_value = self._item_stats(new)
+
+        if old is not None and new is not None and old.collection_id == new.collection_id:
+            self._add_collection_stats(new.collection_id, new_count - old_count, new_value - old_value)
+            return
+
+        if old is not None:
+            self._add_collection_stats(old.collection_id, -old_count, -old_value)
+        if new is not None:
+            self._add_collection_stats(new.collection_id, new_count, new_value)
+
+    @mutation
+    def update_collection_stats(self, collection_id: int):
+        """
+        Recalcula os totais da coleção do zero e salva.
+
+        Operação de reparo: o fluxo normal mantém os totais por delta
+        (_apply_item_delta). Use via `python -m app.manutencao`.
+        """
+        col = self._collections_table.get(collection_id)
+        if col is None:
+            return
+
+        item_count, value = self.get_item_totals([collection_id]).get(collection_id, (0, 0.0))
+        self._collections_table.replace(col.model_copy(update={"itemCount": item_count, "value": value}))
+
+    @mutation
+    def recalculate_all_collection_stats(self) -> int:
+        """Reparo completo: recalcula os totais de todas as coleções numa só passada pelos itens."""
+        collections = self.load_collections()
+        totals = self.get_item_totals()
+        for col in collections:
+            item_count, value = totals.get(col.id, (0, 0.0))
+            self._collections_table.replace(col.model_copy(update={"itemCount": item_count, "value": value}))
+        return len(collections)
+
+    # --- Manutenção e ciclo de vida ---
+
+    def all_tables(self) -> List[Union[JsonTable, NdjsonTable, ShardedTable]]:
+        return [self._users_table, self._collections_table, self._items_table]
+
+    def verify(self) -> List[str]:
+        """Valida todos os registros gravados; retorna os problemas encontrados."""
+        problems = []
+        for table in self.all_tables():
+            problems.extend(table.verify_files())
+        return problems
+
+    def checkpoint(self) -> List[str]:
+        """Consolida o log de todas as tabelas em snapshots (modo "log")."""
+        return [table.path for table in self.all_tables() if table.checkpoint()]
+
+    def storage_files(self) -> List[str]:
+        """Arquivos de dados no disco (para as métricas de tamanho)."""
+        files = [path for table in self.all_tables() for path in table.files()]
+        journal = self._unit_of_work.journal_path
+        if journal is not None and os.path.exists(journal):
+            files.append(journal)
+        return files
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """
+        Agrupa várias mutações: cada tabela alterada é gravada uma única vez
+        ao final do bloco (importações, edições em sequência), num único
+        commit da UnitOfWork.
+        """
+        tables = self.all_tables()
+        for table in tables:
+            self._writer.call(table.begin_batch)
+        try:
+            yield
+        finally:
+            for table in tables:
+                self._writer.call(table.end_batch, flush=False)
+            self._writer.call(self._unit_of_work.flush)
+
+    def flush(self):
+        """Grava imediatamente as mutações adiadas pelo write-behind (um único commit)."""
+        self._unit_of_work.flush()
+
+    def save_caches(self):
+        """Atualiza o cache binário das tabelas (COLLECTMASTER_BINARY_CACHE)."""
+        for table in self.all_tables():
+            table.save_cache()
+
+    def start(self):
+        """Chamado na inicialização da API: inicia as tarefas em segundo plano."""
+        self._writer.start()
+        if config.BINARY_CACHE:
+            # Carrega as tabelas já na partida (do cache, se estiver em dia)
+            # e regrava o cache das que precisaram ler o JSON
+            self.save_caches()
+        if self.mode == "log" or (config.ITEM_STORAGE == "ndjson" and self.mode != "memory"):
+            # No items.ndjson o checkpoint compacta as linhas substituídas
+            self._checkpointer.start()
 
-def load_items() -> List[ItemInDB]:
-    try:
-        with open(ITEMS_DB_FILE, "r") as f:
-            data = json.load(f)
-            return [ItemInDB(**item) for item in data]
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
-
-def save_items(items: List[ItemInDB]):
-    with open(ITEMS_DB_FILE, "w") as f:
-        data = [item.model_dump() for item in items]
-        json.dump(data, f, indent=2)
-
-def create_item_in_db(item: ItemInDB) -> ItemInDB:
-    items = load_items()
-    items.append(item)
-    save_items(items)
-    
-    # Mágica: Atualiza o valor total e contagem na coleção pai!
-    update_collection_stats(item.collection_id)
-    
-    return item
-
-def get_items_by_collection_id(collection_id: int) -> List[ItemInDB]:
-    items = load_items()
-    return [i for i in items if i.collection_id == collection_id]
-
-def update_collection_stats(collection_id: int):
-    """Recalcula os totais da coleção e salva."""
-    all_items = get_items_by_collection_id(collection_id)
-    all_collections = load_collections()
-    
-    for col in all_collections:
-        if col.id == collection_id:
-            col.itemCount = sum(i.quantity for i in all_items)
-            col.value = sum(i.estimated_value * i.quantity for i in all_items)
-            break
-    
-    save_collections(all_collections)
-
-def get_item_by_id(item_id: int) -> Optional[ItemInDB]:
-    items = load_items()
-    for item in items:
-        if item.id == item_id:
-            return item
-    return None
-
-def update_item_in_db(item_id: int, item_update: ItemUpdate) -> Optional[ItemInDB]:
-    items = load_items()
-    
-    for i, item in enumerate(items):
-        if item.id == item_id:
-            # Atualiza apenas os campos que foram enviados (não nulos)
-            update_data = item_update.model_dump(exclude_unset=True)
-            updated_item = item.model_copy(update=update_data)
-            
-            items[i] = updated_item
-            save_items(items)
-            
-            # Atualiza estatísticas da coleção
-            update_collection_stats(updated_item.collection_id)
-            return updated_item
-            
-    return None
-
-def delete_item_in_db(item_id: int) -> bool:
-    items = load_items()
-    
-    for i, item in enumerate(items):
-        if item.id == item_id:
-            collection_id = item.collection_id # Guarda o ID para atualizar estatísticas
-            
-            items.pop(i) # Remove da lista
-            save_items(items)
-            
-            update_collection_stats(collection_id) # Recalcula
-            return True
-            
-    return False
-
-def delete_collection_in_db(collection_id: int) -> bool:
-    collections = load_collections()
-    
-    for i, col in enumerate(collections):
-        if col.id == collection_id:
-            # 1. Remove a coleção
-            collections.pop(i)
-            save_collections(collections)
-            
-            # 2. Remove todos os itens dessa coleção (Limpeza em cascata)
-            all_items = load_items()
-            remaining_items = [item for item in all_items if item.collection_id != collection_id]
-            save_items(remaining_items)
-            
-            return True
-            
-    return False
-
-def update_user_in_db(user_id: int, user_update: UserUpdate) -> Optional[UserInDB]:
-    users = load_users()
-    
-    for i, user in enumerate(users):
-        if user.id == user_id:
-            # Atualiza apenas os campos enviados
-            update_data = user_update.model_dump(exclude_unset=True)
-            
-            # Copia e atualiza
-            updated_user = user.model_copy(update=update_data)
-            
-            users[i] = updated_user
-            save_users(users)
-            return updated_user
-            
-    return None
-
-def get_user_by_reset_token(token: str) -> Optional[UserInDB]:
-    """Busca um usuário pelo token de reset de senha."""
-    users = load_users()
-    for user in users:
-        if user.reset_token == token:
-            return user
-    return None
-
-def update_user_reset_token(email: str, token: Optional[str]) -> Optional[UserInDB]:
-    """Atualiza o token de reset de senha de um usuário."""
-    users = load_users()
-    
-    for i, user in enumerate(users):
-        if user.email == email:
-            # Atualiza o token de reset
-            updated_user = user.model_copy(update={"reset_token": token})
-            users[i] = updated_user
-            save_users(users)
-            return updated_user
-            
-    return None
-
-def update_user_password(user_id: int, new_hashed_password: str) -> Optional[UserInDB]:
-    """Atualiza a senha de um usuário e remove o token de reset."""
-    users = load_users()
-    
-    for i, user in enumerate(users):
-        if user.id == user_id:
-            # Atualiza a senha e remove o token
-            updated_user = user.model_copy(update={
-                "hashed_password": new_hashed_password,
-                "reset_token": None
-            })
-            users[i] = updated_user
-            save_users(users)
-            return updated_user
-            
-    return None
\ No newline at end of file
+    def stop(self):
+        """Chamado no desligamento da API: nada pendente fica sem gravar."""
+        self._checkpointer.stop()
+        self._writer.stop()
+        self.flush()
+        self.save_caches()
+        self.durability.stop()
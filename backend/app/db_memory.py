@@ -0,0 +1,15 @@
+from .db_json import DB_FILE, COLLECTIONS_DB_FILE, ITEMS_DB_FILE, JsonRepository
+
+
+class MemoryRepository(JsonRepository):
+    """
+    Repositório puramente em memória, para testes de carga e benchmarks.
+
+    Parte do conteúdo atual dos arquivos JSON (se existirem), mas nenhuma
+    escrita é gravada em disco: ao reiniciar a API, os dados voltam ao
+    estado dos arquivos.
+    """
+
+    def __init__(self, users_path: str = DB_FILE, collections_path: str = COLLECTIONS_DB_FILE,
+                 items_path: str = ITEMS_DB_FILE):
+        super().__init__(users_path, collections_path, items_path, mode="memory")
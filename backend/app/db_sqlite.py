@@ -0,0 +1,503 @@
+"""
+Implementação do repositório (ver repository.Repository) sobre SQLite.
+
+Selecionada com COLLECTMASTER_STORAGE_BACKEND=sqlite. Cada thread usa sua
+própria conexão; o banco roda em modo WAL, então leituras não esperam as
+escritas. Mutações que tocam mais de uma tabela (item + totais da coleção,
+remoção em cascata) acontecem numa única transação.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Set, Tuple
+
+from . import config
+from .repository import ITEM_SORT_FIELDS
+from .schemas import UserInDB, CollectionInDB, ItemInDB, ItemUpdate, CollectionUpdate, UserUpdate, normalize_email
+
+if TYPE_CHECKING:
+    from .repository import Repository
+
+
+# Equivalente de config.FSYNC_POLICY no SQLite (PRAGMA synchronous em modo WAL)
+SYNCHRONOUS = {"always": "FULL", "periodic": "NORMAL", "never": "OFF"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    email_normalized TEXT NOT NULL UNIQUE,
+    hashed_password TEXT NOT NULL,
+    bio TEXT,
+    reset_token TEXT UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS collections (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT,
+    is_public INTEGER NOT NULL,
+    owner_id INTEGER NOT NULL,
+    image_url TEXT,
+    value REAL NOT NULL DEFAULT 0,
+    itemCount INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_collections_owner_id ON collections (owner_id);
+
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT,
+    quantity INTEGER NOT NULL,
+    estimated_value REAL NOT NULL,
+    collection_id INTEGER NOT NULL,
+    image_url TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_items_collection_id ON items (collection_id);
+
+-- Última chave reservada de cada tabela (next_*_id)
+CREATE TABLE IF NOT EXISTS sequences (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+USER_COLUMNS = "id, name, email, hashed_password, bio, reset_token"
+COLLECTION_COLUMNS = "id, name, description, is_public, owner_id, image_url, value, itemCount"
+ITEM_COLUMNS = "id, name, description, quantity, estimated_value, collection_id, image_url"
+
+def _integrity_error(exc: sqlite3.IntegrityError) -> ValueError:
+    # Mesmo tipo de erro que o db_json levanta para chave/índice duplicado
+    return ValueError(f"Violação de unicidade no SQLite: {exc}")
+
+
+def _user(row: sqlite3.Row) -> UserInDB:
+    return UserInDB(**dict(row))
+
+def _collection(row: sqlite3.Row) -> CollectionInDB:
+    return CollectionInDB(**dict(row))
+
+def _item(row: sqlite3.Row) -> ItemInDB:
+    return ItemInDB(**dict(row))
+
+
+def _user_params(user: UserInDB) -> tuple:
+    return (user.id, user.name, user.email, normalize_email(user.email),
+            user.hashed_password, user.bio, user.reset_token)
+
+def _collection_params(col: CollectionInDB) -> tuple:
+    return (col.id, col.name, col.description, col.is_public, col.owner_id,
+            col.image_url, col.value, col.itemCount)
+
+def _item_params(item: ItemInDB) -> tuple:
+    return (item.id, item.name, item.description, item.quantity,
+            item.estimated_value, item.collection_id, item.image_url)
+
+
+def _insert_users(conn: sqlite3.Connection, users: List[UserInDB]):
+    conn.executemany(
+        "INSERT INTO users (id, name, email, email_normalized, hashed_password, bio, reset_token) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [_user_params(user) for user in users],
+    )
+
+def _insert_collections(conn: sqlite3.Connection, collections: List[CollectionInDB]):
+    conn.executemany(
+        f"INSERT INTO collections ({COLLECTION_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [_collection_params(col) for col in collections],
+    )
+
+def _insert_items(conn: sqlite3.Connection, items: List[ItemInDB]):
+    conn.executemany(
+        f"INSERT INTO items ({ITEM_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [_item_params(item) for item in items],
+    )
+
+def _write_user(conn: sqlite3.Connection, user: UserInDB):
+    try:
+        conn.execute(
+            "UPDATE users SET name = ?, email = ?, email_normalized = ?, hashed_password = ?, "
+            "bio = ?, reset_token = ? WHERE id = ?",
+            _user_params(user)[1:] + (user.id,),
+        )
+    except sqlite3.IntegrityError as exc:
+        raise _integrity_error(exc)
+
+def _next_id(conn: sqlite3.Connection, table: str) -> int:
+    """
+    Reserva a próxima chave de `table`. Nunca fica abaixo do maior id
+    existente (MAX(id) da chave primária é uma busca no índice).
+    """
+    row = conn.execute(
+        "INSERT INTO sequences (name, value) "
+        f"VALUES (?, (SELECT COALESCE(MAX(id), 0) FROM {table}) + 1) "
+        "ON CONFLICT (name) DO UPDATE SET "
+        f"value = MAX(value, (SELECT COALESCE(MAX(id), 0) FROM {table})) + 1 "
+        "RETURNING value",
+        (table,),
+    ).fetchone()
+    return row[0]
+
+
+def _item_filters(collection_ids: Optional[List[int]]) -> Tuple[List[str], list]:
+    if collection_ids is None:
+        return [], []
+    placeholders = ", ".join("?" * len(collection_ids))
+    return [f"collection_id IN ({placeholders})"], list(collection_ids)
+
+
+def _add_collection_stats(conn: sqlite3.Connection, collection_id: int, count_delta: int, value_delta: float):
+    conn.execute(
+        "UPDATE collections SET itemCount = itemCount + ?, value = value + ? WHERE id = ?",
+        (count_delta, value_delta, collection_id),
+    )
+
+
+class SqliteRepository:
+    """Repositório sobre um banco SQLite em `path` (padrão: SQLITE_PATH)."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or config.SQLITE_PATH
+        self._local = threading.local()
+        # Conexões de todas as threads, fechadas juntas no stop()
+        self._connections: Set[sqlite3.Connection] = set()
+        self._connections_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Conexão da thread atual (criada e configurada no primeiro uso)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or conn not in self._connections:
+            # Cada conexão só é usada pela sua thread; check_same_thread=False
+            # deixa o stop() fechá-la a partir de outra
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={SYNCHRONOUS.get(config.FSYNC_POLICY, 'NORMAL')}")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.add(conn)
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Transação de escrita (BEGIN IMMEDIATE): a leitura que precede a
+        atualização já acontece com o lock de escrita do banco.
+        """
+        conn = self._connect()
+        if getattr(self._local, "batch_depth", 0):
+            # Dentro de batch(): a operação entra na transação já aberta
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+
+    def load_users(self) -> List[UserInDB]:
+        rows = self._connect().execute(f"SELECT {USER_COLUMNS} FROM users ORDER BY id").fetchall()
+        return [_user(row) for row in rows]
+
+    def save_users(self, users: List[UserInDB]):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM users")
+            _insert_users(conn, users)
+
+    def get_user_by_email(self, email: str) -> Optional[UserInDB]:
+        row = self._connect().execute(
+            f"SELECT {USER_COLUMNS} FROM users WHERE email_normalized = ?", (normalize_email(email),)
+        ).fetchone()
+        return _user(row) if row else None
+
+    def get_user_by_id(self, user_id: int) -> Optional[UserInDB]:
+        row = self._connect().execute(f"SELECT {USER_COLUMNS} FROM users WHERE id = ?", (user_id,)).fetchone()
+        return _user(row) if row else None
+
+    def next_user_id(self) -> int:
+        with self._transaction() as conn:
+            return _next_id(conn, "users")
+
+    def create_user(self, user: UserInDB) -> UserInDB:
+        try:
+            with self._transaction() as conn:
+                _insert_users(conn, [user])
+        except sqlite3.IntegrityError as exc:
+            raise _integrity_error(exc)
+        return user
+
+    def update_user_in_db(self, user_id: int, user_update: UserUpdate) -> Optional[UserInDB]:
+        with self._transaction() as conn:
+            user = self.get_user_by_id(user_id)
+            if user is None:
+                return None
+
+            # Atualiza apenas os campos enviados
+            updated_user = user.model_copy(update=user_update.model_dump(exclude_unset=True))
+            _write_user(conn, updated_user)
+            return updated_user
+
+    def get_user_by_reset_token(self, token: str) -> Optional[UserInDB]:
+        """Busca um usuário pelo token de reset de senha."""
+        row = self._connect().execute(f"SELECT {USER_COLUMNS} FROM users WHERE reset_token = ?", (token,)).fetchone()
+        return _user(row) if row else None
+
+    def update_user_reset_token(self, email: str, token: Optional[str]) -> Optional[UserInDB]:
+        """Atualiza o token de reset de senha de um usuário."""
+        with self._transaction() as conn:
+            user = self.get_user_by_email(email)
+            if user is None:
+                return None
+
+            updated_user = user.model_copy(update={"reset_token": token})
+            _write_user(conn, updated_user)
+            return updated_user
+
+    def update_user_password(self, user_id: int, new_hashed_password: str) -> Optional[UserInDB]:
+        """Atualiza a senha de um usuário e remove o token de reset."""
+        with self._transaction() as conn:
+            user = self.get_user_by_id(user_id)
+            if user is None:
+                return None
+
+            updated_user = user.model_copy(update={
+                "hashed_password": new_hashed_password,
+                "reset_token": None
+            })
+            _write_user(conn, updated_user)
+            return updated_user
+
+    # --- Coleções ---
+
+    def load_collections(self) -> List[CollectionInDB]:
+        rows = self._connect().execute(f"SELECT {COLLECTION_COLUMNS} FROM collections ORDER BY id").fetchall()
+        return [_collection(row) for row in rows]
+
+    def save_collections(self, collections: List[CollectionInDB]):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM collections")
+            _insert_collections(conn, collections)
+
+    def next_collection_id(self) -> int:
+        with self._transaction() as conn:
+            return _next_id(conn, "collections")
+
+    def create_collection_in_db(self, collection: CollectionInDB) -> CollectionInDB:
+        try:
+            with self._transaction() as conn:
+                _insert_collections(conn, [collection])
+        except sqlite3.IntegrityError as exc:
+            raise _integrity_error(exc)
+        return collection
+
+    def get_collection_by_id(self, collection_id: int) -> Optional[CollectionInDB]:
+        row = self._connect().execute(
+            f"SELECT {COLLECTION_COLUMNS} FROM collections WHERE id = ?", (collection_id,)
+        ).fetchone()
+        return _collection(row) if row else None
+
+    def get_collections_by_owner_id(self, owner_id: int) -> List[CollectionInDB]:
+        rows = self._connect().execute(
+            f"SELECT {COLLECTION_COLUMNS} FROM collections WHERE owner_id = ? ORDER BY id", (owner_id,)
+        ).fetchall()
+        return [_collection(row) for row in rows]
+
+    def update_collection_in_db(self, collection_id: int, collection_update: CollectionUpdate) -> Optional[CollectionInDB]:
+        with self._transaction() as conn:
+            col = self.get_collection_by_id(collection_id)
+            if col is None:
+                return None
+
+            updated_col = col.model_copy(update=collection_update.model_dump(exclude_unset=True))
+            conn.execute(
+                "UPDATE collections SET name = ?, description = ?, is_public = ?, image_url = ? WHERE id = ?",
+                (updated_col.name, updated_col.description, updated_col.is_public, updated_col.image_url, collection_id),
+            )
+            return updated_col
+
+    def delete_collection_in_db(self, collection_id: int) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute("DELETE FROM collections WHERE id = ?", (collection_id,))
+            if cursor.rowcount == 0:
+                return False
+
+            # Limpeza em cascata na mesma transação
+            conn.execute("DELETE FROM items WHERE collection_id = ?", (collection_id,))
+            return True
+
+    # --- Itens ---
+
+    def load_items(self) -> List[ItemInDB]:
+        rows = self._connect().execute(f"SELECT {ITEM_COLUMNS} FROM items ORDER BY id").fetchall()
+        return [_item(row) for row in rows]
+
+    def save_items(self, items: List[ItemInDB]):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM items")
+            _insert_items(conn, items)
+
+    def next_item_id(self) -> int:
+        with self._transaction() as conn:
+            return _next_id(conn, "items")
+
+    def create_item_in_db(self, item: ItemInDB) -> ItemInDB:
+        try:
+            with self._transaction() as conn:
+                _insert_items(conn, [item])
+                # Totais da coleção mantidos por delta, na mesma transação
+                _add_collection_stats(conn, item.collection_id, item.quantity, item.estimated_value * item.quantity)
+        except sqlite3.IntegrityError as exc:
+            raise _integrity_error(exc)
+        return item
+
+    def get_items_by_collection_id(self, collection_id: int) -> List[ItemInDB]:
+        rows = self._connect().execute(
+            f"SELECT {ITEM_COLUMNS} FROM items WHERE collection_id = ? ORDER BY id", (collection_id,)
+        ).fetchall()
+        return [_item(row) for row in rows]
+
+    def get_item_by_id(self, item_id: int) -> Optional[ItemInDB]:
+        row = self._connect().execute(f"SELECT {ITEM_COLUMNS} FROM items WHERE id = ?", (item_id,)).fetchone()
+        return _item(row) if row else None
+
+    def update_item_in_db(self, item_id: int, item_update: ItemUpdate) -> Optional[ItemInDB]:
+        with self._transaction() as conn:
+            item = self.get_item_by_id(item_id)
+            if item is None:
+                return None
+
+            updated_item = item.model_copy(update=item_update.model_dump(exclude_unset=True))
+            conn.execute(
+                "UPDATE items SET name = ?, description = ?, quantity = ?, estimated_value = ?, image_url = ? WHERE id = ?",
+                (updated_item.name, updated_item.description, updated_item.quantity,
+                 updated_item.estimated_value, updated_item.image_url, item_id),
+            )
+            _add_collection_stats(
+                conn, item.collection_id,
+                updated_item.quantity - item.quantity,
+                updated_item.estimated_value * updated_item.quantity - item.estimated_value * item.quantity,
+            )
+            return updated_item
+
+    def delete_item_in_db(self, item_id: int) -> bool:
+        with self._transaction() as conn:
+            item = self.get_item_by_id(item_id)
+            if item is None:
+                return False
+
+            conn.execute("DELETE FROM items WHERE id = ?", (item_id,))
+            _add_collection_stats(conn, item.collection_id, -item.quantity, -item.estimated_value * item.quantity)
+            return True
+
+    # --- Consultas sobre os itens ---
+
+    def search_items(self, collection_ids: Optional[List[int]] = None, min_value: Optional[float] = None,
+                     max_value: Optional[float] = None, sort_by: str = "id",
+                     descending: bool = False) -> List[ItemInDB]:
+        if sort_by not in ITEM_SORT_FIELDS:
+            raise ValueError(f"Campo de ordenação inválido: {sort_by}")
+        conditions, params = _item_filters(collection_ids)
+        if min_value is not None:
+            conditions.append("estimated_value >= ?")
+            params.append(min_value)
+        if max_value is not None:
+            conditions.append("estimated_value <= ?")
+            params.append(max_value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        direction = "DESC" if descending else "ASC"
+        rows = self._connect().execute(
+            f"SELECT {ITEM_COLUMNS} FROM items {where} ORDER BY {sort_by} {direction}, id", params
+        ).fetchall()
+        return [_item(row) for row in rows]
+
+    def get_item_totals(self, collection_ids: Optional[List[int]] = None) -> Dict[int, Tuple[int, float]]:
+        conditions, params = _item_filters(collection_ids)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._connect().execute(
+            f"SELECT collection_id, SUM(quantity), SUM(quantity * estimated_value) FROM items {where} "
+            "GROUP BY collection_id", params
+        ).fetchall()
+        return {row[0]: (row[1], row[2]) for row in rows}
+
+    def update_collection_stats(self, collection_id: int):
+        """Operação de reparo: recalcula os totais da coleção a partir dos itens."""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE collections SET "
+                "itemCount = (SELECT COALESCE(SUM(quantity), 0) FROM items WHERE collection_id = ?), "
+                "value = (SELECT COALESCE(SUM(quantity * estimated_value), 0.0) FROM items WHERE collection_id = ?) "
+                "WHERE id = ?",
+                (collection_id, collection_id, collection_id),
+            )
+
+    def recalculate_all_collection_stats(self) -> int:
+        """Reparo completo: recalcula os totais de todas as coleções."""
+        collections = self.load_collections()
+        for col in collections:
+            self.update_collection_stats(col.id)
+        return len(collections)
+
+    # --- Manutenção ---
+
+    def verify(self) -> List[str]:
+        """Verificação de integridade do arquivo do banco (os registros já são validados a cada leitura)."""
+        rows = self._connect().execute("PRAGMA integrity_check").fetchall()
+        return [f"{self.path}: {row[0]}" for row in rows if row[0] != "ok"]
+
+    def checkpoint(self) -> List[str]:
+        """Transfere o WAL para o arquivo principal do banco e o trunca."""
+        self._connect().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return [self.path]
+
+    def storage_files(self) -> List[str]:
+        """Arquivo do banco e, se existirem, o WAL e a memória compartilhada."""
+        return [path for path in (self.path, self.path + "-wal", self.path + "-shm") if os.path.exists(path)]
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Agrupa várias mutações desta thread num único commit."""
+        with self._transaction():
+            self._local.batch_depth = getattr(self._local, "batch_depth", 0) + 1
+            try:
+                yield
+            finally:
+                self._local.batch_depth -= 1
+
+    def flush(self):
+        """Cada transação já é gravada no commit; nada fica pendente."""
+
+    def start(self):
+        self._connect()
+
+    def stop(self):
+        """Fecha as conexões de todas as threads (não só a da thread atual)."""
+        with self._connections_lock:
+            connections, self._connections = self._connections, set()
+        for conn in connections:
+            conn.close()
+        self._local.conn = None
+
+    def import_from(self, source: "Repository") -> dict:
+        """
+        Migração única: substitui todo o conteúdo do banco pelo de outro
+        repositório (ex.: os arquivos JSON) numa única transação.
+        """
+        users = source.load_users()
+        collections = source.load_collections()
+        items = source.load_items()
+
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM items")
+            conn.execute("DELETE FROM collections")
+            conn.execute("DELETE FROM users")
+            _insert_users(conn, users)
+            _insert_collections(conn, collections)
+            _insert_items(conn, items)
+
+        return {"users": len(users), "collections": len(collections), "items": len(items)}
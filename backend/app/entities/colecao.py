@@ -1,5 +1,6 @@
 from typing import Optional, List
-from .. import schemas, db_json
+from .. import schemas
+from ..repository import get_repository
 
 
 class EColecao:
@@ -12,7 +13,7 @@ class EColecao:
     """
     @staticmethod
     def create_collection_in_db(collection: schemas.CollectionInDB) -> schemas.CollectionInDB:
-        return db_json.create_collection_in_db(collection)
+        return get_repository().create_collection_in_db(collection)
     
 
     """
@@ -23,12 +24,7 @@ class EColecao:
     """
     @staticmethod
     def buscar(id_colecao: int) -> Optional[schemas.CollectionInDB]:
-        
-        collections = db_json.load_collections()
-        for collection in collections:
-            if collection.id == id_colecao:
-                return collection
-        return None
+        return get_repository().get_collection_by_id(id_colecao)
     
 
 
@@ -53,13 +49,7 @@ class EColecao:
         """
     @staticmethod
     def removerItem(id_item: int) -> bool:
-        items = db_json.load_items()
-
-        item_to_remove = None
-        for item in items:
-            if item.id == id_item:
-                item_to_remove = item
-                break
+        item_to_remove = get_repository().get_item_by_id(id_item)
         
         if not item_to_remove:
             return False
@@ -78,7 +68,7 @@ class EColecao:
     """
     @staticmethod
     def buscarColecao(id_alvo: int) -> List[schemas.CollectionPublic]:
-        collections = db_json.get_collections_by_owner_id(owner_id=id_alvo)
+        collections = get_repository().get_collections_by_owner_id(owner_id=id_alvo)
         
         collections_public = []
         for col in collections:
@@ -1,5 +1,6 @@
 from typing import Optional, List
-from .. import schemas, db_json, security
+from .. import schemas, security
+from ..repository import get_repository
 
 
 class EColecionador:
@@ -13,14 +14,13 @@ class EColecionador:
     @staticmethod
     def criarUsuario(nome: str, email: str, senha: str) -> Optional[schemas.UserInDB]:
 
-        usuario_existente = db_json.get_user_by_email(email=email)
+        usuario_existente = get_repository().get_user_by_email(email=email)
         if usuario_existente:
             return None
         
         hashed_password = security.get_password_hash(senha)
         
-        all_users = db_json.load_users()
-        new_id = len(all_users) + 1
+        new_id = get_repository().next_user_id()
         
         user_to_save = schemas.UserInDB(
             id=new_id,
@@ -29,7 +29,7 @@ class EColecionador:
             hashed_password=hashed_password
         )
         
-        created_user = db_json.create_user(user_to_save)
+        created_user = get_repository().create_user(user_to_save)
         
         return created_user
     
@@ -42,7 +42,7 @@ class EColecionador:
     """
     @staticmethod
     def get_user_by_email(email: str) -> Optional[schemas.UserInDB]:
-        return db_json.get_user_by_email(email=email)
+        return get_repository().get_user_by_email(email=email)
     
 
 
@@ -53,7 +53,7 @@ class EColecionador:
     """
     @staticmethod
     def load_users() -> List[schemas.UserInDB]:
-        return db_json.load_users()
+        return get_repository().load_users()
     
 
     """
@@ -65,11 +65,8 @@ class EColecionador:
     @staticmethod
     def verificaEmailEmUso(email: str, user_id_excluir: int) -> bool:
     
-        users = db_json.load_users()
-        for user in users:
-            if user.email == email and user.id != user_id_excluir:
-                return True
-        return False
+        user = get_repository().get_user_by_email(email=email)
+        return user is not None and user.id != user_id_excluir
     
     """
     Conforme diagrama SD03:
@@ -78,7 +75,7 @@ class EColecionador:
     """
     @staticmethod
     def update_user_in_db(user_id: int, user_update: schemas.UserUpdate) -> Optional[schemas.UserInDB]:
-        return db_json.update_user_in_db(user_id, user_update)
+        return get_repository().update_user_in_db(user_id, user_update)
     
 
     """
@@ -89,9 +86,7 @@ class EColecionador:
     """
     @staticmethod
     def buscarUsuario(id_outro: int) -> Optional[schemas.UserPublic]:
-        
-        users = db_json.load_users()
-        user = next((u for u in users if u.id == id_outro), None)
+        user = get_repository().get_user_by_id(id_outro)
         
         if not user:
             return None
@@ -112,5 +107,5 @@ class EColecionador:
     """
     @staticmethod
     def buscarEmail(email: str) -> Optional[schemas.UserInDB]:
-        return db_json.get_user_by_email(email=email)
+        return get_repository().get_user_by_email(email=email)
 
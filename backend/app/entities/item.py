@@ -1,4 +1,6 @@
-from .. import schemas, db_json
+from typing import Optional
+from .. import schemas
+from ..repository import get_repository
 
 
 class EItem:
@@ -11,8 +13,8 @@ class EItem:
     @staticmethod
     def dadosItem(dados_item: schemas.ItemCreate) -> schemas.ItemInDB:
         
-        all_items = db_json.load_items()
-        new_id = 1 if not all_items else all_items[-1].id + 1
+        # Id reservado na sequência da tabela: nunca se repete, nem entre workers
+        new_id = get_repository().next_item_id()
         
         image_url = f"https://via.placeholder.com/150?text={dados_item.name}"
         
@@ -22,7 +24,7 @@ class EItem:
             **dados_item.model_dump()
         )
         
-        created_item = db_json.create_item_in_db(item_to_save)
+        created_item = get_repository().create_item_in_db(item_to_save)
         
         return created_item
     
@@ -35,5 +37,16 @@ class EItem:
     """
     @staticmethod
     def removerItem(id_item: int) -> bool:
-        return db_json.delete_item_in_db(item_id=id_item)
+        return get_repository().delete_item_in_db(item_id=id_item)
+    
+
+    """
+    Conforme diagrama SD06:
+    - Recebe id_item da interface (FRM-VISUCOLEC)
+    - Busca o item em E-ITEM (buscar)
+    - Retorna o item encontrado
+    """
+    @staticmethod
+    def buscar(id_item: int) -> Optional[schemas.ItemInDB]:
+        return get_repository().get_item_by_id(item_id=id_item)
 
@@ -0,0 +1,254 @@
+"""
+Medições por requisição: operações de armazenamento (storage/stats.py),
+métricas HTTP no formato do Prometheus (metrics.py) e o cabeçalho
+Server-Timing de cada resposta.
+"""
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from fastapi.routing import APIRoute
+
+from . import config, metrics
+from .storage import stats
+
+STORAGE_STATS_HEADER = b"x-storage-stats"
+
+
+def route_template(scope) -> str:
+    """Modelo da rota que atendeu a requisição (ex.: /api/items/{item_id}), ou "unmatched"."""
+    # O roteamento grava a rota encontrada no próprio scope. Versões recentes
+    # do FastAPI mantêm os routers incluídos aninhados: o caminho com o
+    # prefixo fica no contexto efetivo da rota, e route.path só tem o final.
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    path = getattr(context, "path", None) or getattr(scope.get("route"), "path", None)
+    return path or "unmatched"
+
+
+class StorageStatsMiddleware:
+    """
+    Middleware ASGI: mede as operações de armazenamento de cada requisição
+    HTTP e soma ao acumulado do processo. Com config.DEBUG, a resposta leva
+    o resumo no cabeçalho X-Storage-Stats.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with stats.request_stats() as request:
+            if not config.DEBUG:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_with_stats(message):
+                # O corpo já foi montado: as leituras e gravações da rota terminaram
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", ()))
+                    headers.append((STORAGE_STATS_HEADER, request.header().encode("latin-1")))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_stats)
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI: conta as requisições HTTP e mede a latência de cada uma
+    pelo modelo da rota (ex.: /api/items/{item_id}), não pela URL, para que
+    cada rota seja uma única série. Requisições que não casam com nenhuma
+    rota ficam juntas em "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500  # se a aplicação falhar antes de responder
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics.IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.IN_FLIGHT.dec()
+            route = route_template(scope)
+            metrics.REQUESTS.inc(scope["method"], route, str(status))
+            metrics.REQUEST_SECONDS.observe(elapsed, scope["method"], route)
+
+
+# --- Server-Timing ---
+
+SERVER_TIMING_HEADER = b"server-timing"
+
+
+class RequestTiming:
+    """
+    Marcos e tempos acumulados de uma requisição. TimedRoute marca o início
+    e o fim do handler da rota e do endpoint; timed() soma o tempo gasto no
+    repositório (RepositorySession) e no bcrypt (security.py).
+    """
+
+    __slots__ = ("start", "handler_start", "handler_end", "endpoint_start", "endpoint_end", "seconds")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.handler_start: Optional[float] = None
+        self.handler_end: Optional[float] = None
+        self.endpoint_start: Optional[float] = None
+        self.endpoint_end: Optional[float] = None
+        self.seconds: Dict[str, float] = {"storage": 0.0, "bcrypt": 0.0}
+
+    def header(self, storage_validate: float) -> str:
+        """
+        Fases da requisição, sem sobreposição, em milissegundos:
+        - storage: chamadas ao repositório, menos a validação dos registros lidos
+        - validation: Pydantic, na entrada (corpo e parâmetros) e nos registros lidos
+        - controller: o endpoint (E-*, C-*), menos repositório e bcrypt
+        - bcrypt: hash e verificação de senhas
+        - serialization: validação e serialização da resposta (response_model)
+        - total: a requisição inteira, até o início da resposta
+        """
+        now = time.perf_counter()
+        storage, bcrypt = self.seconds["storage"], self.seconds["bcrypt"]
+        phases = [("storage", storage - storage_validate)]
+        validation = storage_validate
+        if self.handler_start is not None:
+            # Entrada inválida (422): o endpoint nem chega a rodar
+            entry_end = self.endpoint_start if self.endpoint_start is not None else self.handler_end
+            validation += (entry_end if entry_end is not None else now) - self.handler_start
+        phases.append(("validation", validation))
+        if self.endpoint_start is not None:
+            endpoint_end = self.endpoint_end if self.endpoint_end is not None else now
+            phases.append(("controller", endpoint_end - self.endpoint_start - storage - bcrypt))
+        phases.append(("bcrypt", bcrypt))
+        if self.endpoint_end is not None:
+            phases.append(("serialization", now - self.endpoint_end))
+        phases.append(("total", now - self.start))
+        return ", ".join(f"{name};dur={max(seconds, 0.0) * 1000:.3f}" for name, seconds in phases)
+
+
+_timing: ContextVar[Optional[RequestTiming]] = ContextVar("request_timing", default=None)
+
+
+def add_time(phase: str, seconds: float):
+    """Soma `seconds` ao `phase` ("storage" ou "bcrypt") da requisição em andamento, se houver."""
+    timing = _timing.get()
+    if timing is not None:
+        timing.seconds[phase] += seconds
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """Como add_time(), com o tempo gasto dentro do bloco."""
+    timing = _timing.get()
+    if timing is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.seconds[phase] += time.perf_counter() - start
+
+
+def _timed_endpoint(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    # Mesma natureza (async ou não) do endpoint original: o FastAPI decide
+    # por ela se o executa no event loop ou numa thread
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def timed_async(*args, **kwargs):
+            timing = _timing.get()
+            if timing is None:
+                return await endpoint(*args, **kwargs)
+            timing.endpoint_start = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                timing.endpoint_end = time.perf_counter()
+        return timed_async
+
+    @functools.wraps(endpoint)
+    def timed_sync(*args, **kwargs):
+        timing = _timing.get()
+        if timing is None:
+            return endpoint(*args, **kwargs)
+        timing.endpoint_start = time.perf_counter()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            timing.endpoint_end = time.perf_counter()
+    return timed_sync
+
+
+class TimedRoute(APIRoute):
+    """
+    Rota que marca, para o Server-Timing, quando o handler começa (antes da
+    leitura e validação da entrada) e quando o endpoint começa e termina.
+    Usada como route_class dos routers.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            timing = _timing.get()
+            if timing is None:
+                return await handler(request)
+            timing.handler_start = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                timing.handler_end = time.perf_counter()
+        return timed_handler
+
+
+class ServerTimingMiddleware:
+    """
+    Middleware ASGI: cada resposta leva o cabeçalho Server-Timing com as
+    fases da requisição (ver RequestTiming.header()), visível nas
+    ferramentas de desenvolvedor do navegador.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timing = RequestTiming()
+        token = _timing.set(timing)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                request_stats = stats.current()
+                storage_validate = request_stats.seconds["validate"] if request_stats is not None else 0.0
+                headers: List[Any] = list(message.get("headers", ()))
+                headers.append((SERVER_TIMING_HEADER, timing.header(storage_validate).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timing.reset(token)
@@ -1,13 +1,39 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import auth, collections, items, users
+from . import config
+from .instrumentation import MetricsMiddleware, ServerTimingMiddleware, StorageStatsMiddleware, TimedRoute
+from .metrics import CONTENT_TYPE, render as render_metrics
+from .repository import get_repository, get_shared_repository
+from .routers import auth, collections, items, metrics, users
+from .session import RepositorySessionMiddleware
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_repository().start()
+    yield
+    get_repository().stop()
+
+
+# As respostas com response_model já são serializadas pelo pydantic-core
+# (sem passar pelo json da biblioteca padrão); o ORJSONResponse está obsoleto
+app = FastAPI(lifespan=lifespan)
+# Rotas declaradas direto na aplicação também marcam as fases do Server-Timing
+app.router.route_class = TimedRoute
 
 app.include_router(auth.router, prefix="/api/auth", tags=["Autenticação"])
 app.include_router(collections.router, prefix="/api/collections", tags=["Coleções"])
 app.include_router(items.router, prefix="/api/items", tags=["Itens"])
 app.include_router(users.router, prefix="/api/users", tags=["Usuários"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["Métricas"])
+
+# Identity map por requisição: E-* e controllers compartilham as consultas
+app.add_middleware(RepositorySessionMiddleware)
+# Cabeçalho Server-Timing (dentro do anterior: usa a validação medida por ele)
+app.add_middleware(ServerTimingMiddleware)
+# Contadores de armazenamento por requisição (cabeçalho com COLLECTMASTER_DEBUG=1)
+app.add_middleware(StorageStatsMiddleware)
 
 origins = [
     "http://localhost:5173",  
@@ -22,6 +48,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if config.METRICS:
+    # Por último: envolve os demais middlewares e mede a requisição inteira
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics():
+        return Response(render_metrics(get_shared_repository().storage_files()), media_type=CONTENT_TYPE)
+
 
 @app.get("/api")
 async def root():
@@ -0,0 +1,166 @@
+"""
+Operações de manutenção do armazenamento, executadas manualmente.
+
+Uso (a partir da pasta backend/):
+    python -m app.manutencao recalcular-estatisticas
+    python -m app.manutencao compactar
+    python -m app.manutencao verificar
+    python -m app.manutencao emails-duplicados [--corrigir]
+    python -m app.manutencao migrar-sqlite
+"""
+import argparse
+import sys
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from . import config
+from .db_json import JsonRepository
+from .db_sqlite import SqliteRepository
+from .repository import Repository, get_repository
+from .schemas import UserInDB, normalize_email
+
+
+@contextmanager
+def _repositorio(repository: Optional[Repository] = None) -> Iterator[Repository]:
+    """
+    Repositório usado por um comando (o ativo, se nenhum for dado). No fim,
+    mesmo se o comando falhar, ele é parado e grava o que ficou pendente.
+    """
+    repository = repository if repository is not None else get_repository()
+    try:
+        yield repository
+    finally:
+        repository.stop()
+
+
+def recalcular_estatisticas(args: argparse.Namespace) -> None:
+    "Recalcula itemCount e value de todas as coleções a partir dos itens."
+    with _repositorio() as repository, repository.batch():
+        total = repository.recalculate_all_collection_stats()
+    print(f"Estatísticas recalculadas para {total} coleções.")
+
+
+def compactar(args: argparse.Namespace) -> None:
+    "Consolida o log de escrita (JSON) ou o WAL (SQLite) do backend ativo."
+    with _repositorio() as repository:
+        tabelas = repository.checkpoint()
+    if not tabelas:
+        print("Nenhum log para consolidar.")
+    for tabela in tabelas:
+        print(f"Snapshot atualizado: {tabela}")
+
+
+def verificar(args: argparse.Namespace) -> None:
+    "Valida por completo todos os registros gravados (a carga normal não valida)."
+    with _repositorio() as repository:
+        problemas = repository.verify()
+    for problema in problemas:
+        print(problema)
+    if problemas:
+        print(f"{len(problemas)} problema(s) encontrado(s).")
+        sys.exit(1)
+    print("Nenhum problema encontrado.")
+
+
+def _emails_duplicados(users: List[UserInDB]) -> List[List[UserInDB]]:
+    "Grupos de usuários cujos emails só diferem em maiúsculas/minúsculas ou espaços."
+    grupos: Dict[str, List[UserInDB]] = {}
+    for user in users:
+        grupos.setdefault(normalize_email(user.email), []).append(user)
+    return [grupo for grupo in grupos.values() if len(grupo) > 1]
+
+
+def emails_duplicados(args: argparse.Namespace) -> None:
+    """
+    Lista os emails cadastrados mais de uma vez (gravados antes da busca sem
+    distinção de maiúsculas). Com --corrigir, funde cada grupo no usuário
+    que o login encontra: as coleções dos demais passam para ele e os
+    demais são removidos.
+    """
+    with _repositorio() as repository:
+        grupos = _emails_duplicados(repository.load_users())
+        if not grupos:
+            print("Nenhum email duplicado.")
+            return
+        mantido_por: Dict[int, int] = {}
+        for grupo in grupos:
+            mantido = repository.get_user_by_email(grupo[0].email) or grupo[0]
+            duplicados = [user for user in grupo if user.id != mantido.id]
+            mantido_por.update((user.id, mantido.id) for user in duplicados)
+            print(f"{normalize_email(mantido.email)}: mantém o usuário {mantido.id} ({mantido.email}); duplicados: "
+                  + ", ".join(f"{user.id} ({user.email})" for user in duplicados))
+        if not args.corrigir:
+            print(f"{len(grupos)} email(s) duplicado(s). Para fundir os usuários: --corrigir")
+            sys.exit(1)
+
+        with repository.batch():
+            # Coleções primeiro: se o processo cair no meio, rodar de novo conclui a fusão
+            repository.save_collections([
+                col.model_copy(update={"owner_id": mantido_por[col.owner_id]}) if col.owner_id in mantido_por else col
+                for col in repository.load_collections()
+            ])
+            repository.save_users([user for user in repository.load_users() if user.id not in mantido_por])
+        print(f"{len(mantido_por)} usuário(s) duplicado(s) removido(s); as coleções passaram para o usuário mantido.")
+
+
+def migrar_sqlite(args: argparse.Namespace) -> None:
+    "Copia users/collections/items dos arquivos JSON para o banco SQLite."
+    # Modo "memory": lê snapshot + log sem nunca regravar os arquivos
+    with _repositorio(JsonRepository(mode="memory")) as origem:
+        if _emails_duplicados(origem.load_users()):
+            # O SQLite recusa emails repetidos (coluna email_normalized UNIQUE)
+            print("Há emails cadastrados mais de uma vez; corrija antes com: "
+                  "python -m app.manutencao emails-duplicados --corrigir")
+            sys.exit(1)
+        with _repositorio(SqliteRepository()) as destino:
+            totais = destino.import_from(origem)
+    print(
+        f"Migrados para {config.SQLITE_PATH}: {totais['users']} usuários, "
+        f"{totais['collections']} coleções, {totais['items']} itens."
+    )
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.manutencao")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    recalcular = subparsers.add_parser(
+        "recalcular-estatisticas",
+        help="recalcula itemCount/value das coleções do zero",
+    )
+    recalcular.set_defaults(func=recalcular_estatisticas)
+
+    compactar_parser = subparsers.add_parser(
+        "compactar",
+        help="consolida o log de escrita (modo log) nos snapshots JSON",
+    )
+    compactar_parser.set_defaults(func=compactar)
+
+    verificar_parser = subparsers.add_parser(
+        "verificar",
+        help="valida todos os registros com os modelos Pydantic (integridade)",
+    )
+    verificar_parser.set_defaults(func=verificar)
+
+    duplicados_parser = subparsers.add_parser(
+        "emails-duplicados",
+        help="lista usuários com o mesmo email (sem distinção de maiúsculas)",
+    )
+    duplicados_parser.add_argument(
+        "--corrigir", action="store_true",
+        help="funde cada grupo num só usuário, transferindo as coleções",
+    )
+    duplicados_parser.set_defaults(func=emails_duplicados)
+
+    migrar = subparsers.add_parser(
+        "migrar-sqlite",
+        help="copia os arquivos JSON para o banco SQLite (COLLECTMASTER_SQLITE_PATH)",
+    )
+    migrar.set_defaults(func=migrar_sqlite)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
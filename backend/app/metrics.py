@@ -0,0 +1,193 @@
+"""
+Métricas no formato de texto do Prometheus (GET /metrics), sem dependências.
+
+- Contadores e histogramas são atualizados durante as requisições pelo
+  MetricsMiddleware (instrumentation.py) e pelo hash de senhas (security.py)
+- Os valores do momento (tamanho dos arquivos, caches, armazenamento) são
+  lidos na coleta, em render()
+
+Os valores são por processo: com vários workers, cada um tem os seus (o
+Prometheus distingue os alvos pelo rótulo `instance`).
+"""
+import bisect
+import os
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+from .storage import stats
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Limites (em segundos) dos histogramas de latência, os mesmos do cliente oficial
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# bcrypt leva dezenas a centenas de milissegundos por hash (custo padrão 12)
+BCRYPT_BUCKETS = (0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _header(name: str, documentation: str, kind: str) -> List[str]:
+    return [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+
+
+class Counter:
+    """Contador monotônico, com um valor por combinação de rótulos."""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = _header(self.name, self.documentation, "counter")
+        lines += [f"{self.name}{_labels(self.labels, key)} {_number(value)}" for key, value in values]
+        return lines
+
+
+class Gauge:
+    """Valor que sobe e desce (ex.: requisições em andamento)."""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self):
+        with self._lock:
+            self.value += 1
+
+    def dec(self):
+        with self._lock:
+            self.value -= 1
+
+    def render(self) -> List[str]:
+        return _header(self.name, self.documentation, "gauge") + [f"{self.name} {_number(self.value)}"]
+
+
+class Histogram:
+    """Histograma com limites fixos; cada observação custa uma busca binária."""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # Rótulos → [contagem por faixa (a última é acima do maior limite), soma]
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            values = self._values.get(labels)
+            if values is None:
+                values = self._values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            counts, total = values
+            counts[index] += 1
+            total[0] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, list(counts), total[0]) for key, (counts, total) in self._values.items())
+        lines = _header(self.name, self.documentation, "histogram")
+        names = self.labels + ("le",)
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(names, key + (_number(bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+# --- Métricas da API ---
+
+REQUESTS = Counter("collectmaster_http_requests_total",
+                   "Requisições HTTP atendidas, por método, rota e status.", ("method", "route", "status"))
+REQUEST_SECONDS = Histogram("collectmaster_http_request_duration_seconds",
+                            "Latência das requisições HTTP, por método e rota.", ("method", "route"))
+IN_FLIGHT = Gauge("collectmaster_http_requests_in_flight", "Requisições HTTP em andamento.")
+BCRYPT_SECONDS = Histogram("collectmaster_bcrypt_duration_seconds",
+                           "Tempo de hash e verificação de senhas com bcrypt.", ("operation",), BCRYPT_BUCKETS)
+
+
+def _file_sizes(files: List[str]) -> List[str]:
+    name = "collectmaster_storage_file_bytes"
+    lines = _header(name, "Tamanho dos arquivos de dados.", "gauge")
+    for path in files:
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            continue  # substituído ou removido desde a listagem
+        lines.append(f"{name}{_labels(('file',), (path,))} {size}")
+    return lines
+
+
+def _caches() -> List[str]:
+    caches = stats.caches()
+    lookups = "collectmaster_cache_lookups_total"
+    ratio = "collectmaster_cache_hit_ratio"
+    lines = _header(lookups, "Acessos a cada cache (cópia das tabelas, cache binário, índice NDJSON, "
+                             "sessão da requisição), por resultado.", "counter")
+    for cache, counts in caches.items():
+        for result, key in (("hit", "hits"), ("miss", "misses")):
+            lines.append(f"{lookups}{_labels(('cache', 'result'), (cache, result))} {counts[key]}")
+    lines += _header(ratio, "Fração dos acessos a cada cache atendidos sem recarga, desde a partida.", "gauge")
+    for cache, counts in caches.items():
+        total = counts["hits"] + counts["misses"]
+        lines.append(f"{ratio}{_labels(('cache',), (cache,))} {_number(counts['hits'] / total if total else 0.0)}")
+    return lines
+
+
+def _storage() -> List[str]:
+    totals = stats.totals()
+    lines = []
+    for name, documentation, key in (
+        ("collectmaster_storage_read_bytes_total", "Bytes lidos dos arquivos de dados.", "bytes_read"),
+        ("collectmaster_storage_written_bytes_total", "Bytes gravados nos arquivos de dados.", "bytes_written"),
+    ):
+        lines += _header(name, documentation, "counter") + [f"{name} {totals[key]}"]
+    name = "collectmaster_storage_phase_seconds_total"
+    lines += _header(name, "Tempo gasto em cada fase do armazenamento (parse, validate, serialize, fsync).",
+                     "counter")
+    lines += [f"{name}{_labels(('phase',), (phase,))} {_number(round(ms / 1000, 6))}"
+              for phase, ms in totals["ms"].items()]
+    return lines
+
+
+def render(storage_files: List[str]) -> str:
+    """Todas as métricas no formato de texto do Prometheus."""
+    lines: List[str] = []
+    for metric in (REQUESTS, REQUEST_SECONDS, IN_FLIGHT, BCRYPT_SECONDS):
+        lines += metric.render()
+    lines += _file_sizes(storage_files)
+    lines += _caches()
+    lines += _storage()
+    return "\n".join(lines) + "\n"
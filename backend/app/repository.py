@@ -0,0 +1,112 @@
+"""
+Interface única de acesso aos dados (E-* e routers passam sempre por aqui).
+
+O backend é escolhido na inicialização por COLLECTMASTER_STORAGE_BACKEND:
+- "json": arquivos users.json/collections.json/items.json (db_json)
+- "sqlite": banco SQLite (db_sqlite)
+- "memory": tudo em memória, sem gravação (db_memory)
+
+Durante uma requisição, get_repository() devolve a sessão da requisição
+(identity map, ver session.py) em vez do repositório compartilhado.
+"""
+from contextvars import ContextVar
+from typing import ContextManager, Dict, List, Optional, Protocol, Tuple
+
+from . import config
+from .schemas import UserInDB, CollectionInDB, ItemInDB, ItemUpdate, CollectionUpdate, UserUpdate
+
+# Campos aceitos na ordenação de search_items()
+ITEM_SORT_FIELDS = ("id", "name", "quantity", "estimated_value")
+
+
+class Repository(Protocol):
+
+    # --- Usuários ---
+    def load_users(self) -> List[UserInDB]: ...
+    def save_users(self, users: List[UserInDB]): ...
+    def get_user_by_email(self, email: str) -> Optional[UserInDB]: ...
+    def get_user_by_id(self, user_id: int) -> Optional[UserInDB]: ...
+    def next_user_id(self) -> int: ...
+    def create_user(self, user: UserInDB) -> UserInDB: ...
+    def update_user_in_db(self, user_id: int, user_update: UserUpdate) -> Optional[UserInDB]: ...
+    def get_user_by_reset_token(self, token: str) -> Optional[UserInDB]: ...
+    def update_user_reset_token(self, email: str, token: Optional[str]) -> Optional[UserInDB]: ...
+    def update_user_password(self, user_id: int, new_hashed_password: str) -> Optional[UserInDB]: ...
+
+    # --- Coleções ---
+    def load_collections(self) -> List[CollectionInDB]: ...
+    def save_collections(self, collections: List[CollectionInDB]): ...
+    def next_collection_id(self) -> int: ...
+    def create_collection_in_db(self, collection: CollectionInDB) -> CollectionInDB: ...
+    def get_collection_by_id(self, collection_id: int) -> Optional[CollectionInDB]: ...
+    def get_collections_by_owner_id(self, owner_id: int) -> List[CollectionInDB]: ...
+    def update_collection_in_db(self, collection_id: int, collection_update: CollectionUpdate) -> Optional[CollectionInDB]: ...
+    def delete_collection_in_db(self, collection_id: int) -> bool: ...
+
+    # --- Itens ---
+    def load_items(self) -> List[ItemInDB]: ...
+    def save_items(self, items: List[ItemInDB]): ...
+    def next_item_id(self) -> int: ...
+    def create_item_in_db(self, item: ItemInDB) -> ItemInDB: ...
+    def get_items_by_collection_id(self, collection_id: int) -> List[ItemInDB]: ...
+    def get_item_by_id(self, item_id: int) -> Optional[ItemInDB]: ...
+    def update_item_in_db(self, item_id: int, item_update: ItemUpdate) -> Optional[ItemInDB]: ...
+    def delete_item_in_db(self, item_id: int) -> bool: ...
+
+    # --- Consultas sobre os itens ---
+    def search_items(self, collection_ids: Optional[List[int]] = None, min_value: Optional[float] = None,
+                     max_value: Optional[float] = None, sort_by: str = "id",
+                     descending: bool = False) -> List[ItemInDB]: ...
+    def get_item_totals(self, collection_ids: Optional[List[int]] = None) -> Dict[int, Tuple[int, float]]: ...
+
+    # --- Reparo, manutenção e ciclo de vida ---
+    def update_collection_stats(self, collection_id: int): ...
+    def recalculate_all_collection_stats(self) -> int: ...
+    def verify(self) -> List[str]: ...
+    def checkpoint(self) -> List[str]: ...
+    def storage_files(self) -> List[str]: ...
+    def batch(self) -> ContextManager[None]: ...
+    def flush(self): ...
+    def start(self): ...
+    def stop(self): ...
+
+
+def create_repository(backend: str) -> Repository:
+    if backend == "json":
+        from .db_json import JsonRepository
+        return JsonRepository()
+    if backend == "sqlite":
+        from .db_sqlite import SqliteRepository
+        return SqliteRepository()
+    if backend == "memory":
+        from .db_memory import MemoryRepository
+        return MemoryRepository()
+    raise ValueError(f"Backend de armazenamento desconhecido: {backend}")
+
+
+_repository: Optional[Repository] = None
+
+# Sessão (RepositorySession) da requisição em andamento; None fora delas
+current_session: ContextVar[Optional[Repository]] = ContextVar("current_session", default=None)
+
+
+def get_repository() -> Repository:
+    """Repositório ativo: a sessão da requisição em andamento ou, fora dela, o compartilhado."""
+    session = current_session.get()
+    if session is not None:
+        return session
+    return get_shared_repository()
+
+
+def get_shared_repository() -> Repository:
+    """Repositório compartilhado pelo processo (criado no primeiro uso a partir da configuração)."""
+    global _repository
+    if _repository is None:
+        _repository = create_repository(config.STORAGE_BACKEND)
+    return _repository
+
+
+def set_repository(repository: Repository) -> None:
+    """Troca o repositório ativo (benchmarks e testes)."""
+    global _repository
+    _repository = repository
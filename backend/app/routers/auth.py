@@ -1,14 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from .. import schemas, security, db_json
+from .. import schemas, security
 from ..controllers.cadastro import CCadastro
 from ..controllers.realizarLogin import CRealizarLogin
 from ..controllers.recuperar_senha import CRecuperarSenha
+from ..instrumentation import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.post("/register", response_model=schemas.UserPublic, status_code=status.HTTP_201_CREATED)
-async def register_user(user: schemas.UserCreate):
+def register_user(user: schemas.UserCreate):
     "Endpoint HTTP para cadastro de usuário."
     cadastro = CCadastro.criarUsuario(
         nome=user.name,
@@ -20,7 +21,7 @@ async def register_user(user: schemas.UserCreate):
 
 
 @router.post("/login", response_model=schemas.UserPublic)
-async def login_user(form_data: schemas.LoginRequest):
+def login_user(form_data: schemas.LoginRequest):
     "Endpoint HTTP para login de usuário."
     user_public = CRealizarLogin.loginUser(
         email=form_data.email,
@@ -31,14 +32,14 @@ async def login_user(form_data: schemas.LoginRequest):
 
 
 @router.post("/forgot-password", status_code=status.HTTP_200_OK)
-async def forgot_password(request: schemas.PasswordResetRequest):
+def forgot_password(request: schemas.PasswordResetRequest):
     "Endpoint HTTP para solicitar recuperação de senha."
     result = CRecuperarSenha.solicitarRecuperacao(email=request.email)
     return result
 
 
 @router.post("/reset-password", status_code=status.HTTP_200_OK)
-async def reset_password(request: schemas.PasswordResetConfirm):
+def reset_password(request: schemas.PasswordResetConfirm):
     "Endpoint HTTP para confirmar recuperação de senha."
     result = CRecuperarSenha.confirmar_recuperacao(
         token=request.token,
@@ -1,20 +1,22 @@
 from fastapi import APIRouter, HTTPException, status
 from typing import List
-from .. import schemas, db_json
+from .. import schemas
+from ..repository import get_repository
 from ..controllers.colecoes import CColecoes
+from ..instrumentation import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 @router.post("/", response_model=schemas.CollectionPublic, status_code=status.HTTP_201_CREATED)
-async def create_new_collection(collection_data: schemas.CollectionCreate):
+def create_new_collection(collection_data: schemas.CollectionCreate):
     "Endpoint HTTP para criação de coleção."
     collection_public = CColecoes.createCollection(dados=collection_data)
     return collection_public
 
 
 @router.put("/{collection_id}", response_model=schemas.CollectionPublic)
-async def update_collection(collection_id: int, collection_update: schemas.CollectionUpdate):
-    updated_col = db_json.update_collection_in_db(collection_id, collection_update)
+def update_collection(collection_id: int, collection_update: schemas.CollectionUpdate):
+    updated_col = get_repository().update_collection_in_db(collection_id, collection_update)
     if not updated_col:
         raise HTTPException(status_code=404, detail="Coleção não encontrada")
     return updated_col
@@ -22,12 +24,12 @@ async def update_collection(collection_id: int, collection_update: schemas.Colle
 
 @router.get("/{user_id}", response_model=List[schemas.CollectionPublic])
 async def get_collections_for_user(user_id: int):
-    return db_json.get_collections_by_owner_id(user_id)
+    return get_repository().get_collections_by_owner_id(user_id)
 
 
 @router.delete("/{collection_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_collection(collection_id: int):
-    success = db_json.delete_collection_in_db(collection_id)
+def delete_collection(collection_id: int):
+    success = get_repository().delete_collection_in_db(collection_id)
     if not success:
         raise HTTPException(status_code=404, detail="Coleção não encontrada")
     return None
\ No newline at end of file
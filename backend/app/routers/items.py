@@ -1,12 +1,15 @@
 from fastapi import APIRouter, HTTPException, status
 from typing import List
-from .. import schemas, db_json
+from .. import schemas
+from ..repository import get_repository
 from ..controllers.colecoes import CColecoes
+from ..entities.item import EItem
+from ..instrumentation import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 @router.post("/", response_model=schemas.ItemPublic, status_code=status.HTTP_201_CREATED)
-async def create_new_item(item_data: schemas.ItemCreate):
+def create_new_item(item_data: schemas.ItemCreate):
     "Endpoint HTTP para criação de item."
     item_public = CColecoes.adicionarItem(
         dados_item=item_data,
@@ -17,22 +20,21 @@ async def create_new_item(item_data: schemas.ItemCreate):
 
 @router.get("/collection/{collection_id}", response_model=List[schemas.ItemPublic])
 async def get_items(collection_id: int):
-    return db_json.get_items_by_collection_id(collection_id)
+    return get_repository().get_items_by_collection_id(collection_id)
 
 
 @router.put("/{item_id}", response_model=schemas.ItemPublic)
-async def update_item(item_id: int, item_update: schemas.ItemUpdate):
-    updated_item = db_json.update_item_in_db(item_id, item_update)
+def update_item(item_id: int, item_update: schemas.ItemUpdate):
+    updated_item = get_repository().update_item_in_db(item_id, item_update)
     if not updated_item:
         raise HTTPException(status_code=404, detail="Item não encontrado")
     return updated_item
 
 
 @router.delete("/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_item(item_id: int):
+def delete_item(item_id: int):
     "Endpoint HTTP para remoção de item."
-    items = db_json.load_items()
-    item = next((i for i in items if i.id == item_id), None)
+    item = EItem.buscar(id_item=item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Item não encontrado")
     
@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+
+from ..instrumentation import TimedRoute
+from ..storage import stats
+
+router = APIRouter(route_class=TimedRoute)
+
+
+@router.get("/storage", response_model=dict)
+async def storage_metrics():
+    "Acumulado das operações de armazenamento deste processo desde a partida."
+    return stats.totals()
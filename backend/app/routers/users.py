@@ -1,14 +1,17 @@
 from fastapi import APIRouter, HTTPException
 from typing import List, Optional
-from .. import schemas, db_json
+from .. import schemas
+from ..repository import get_repository
 from ..controllers.editarperfil import CEditarPerfil
 from ..controllers.visuoutro import VisuOutro
+from ..entities.colecionador import EColecionador
+from ..instrumentation import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 @router.get("/", response_model=List[schemas.UserPublic])
 async def read_users(search: Optional[str] = None):
-    users = db_json.load_users()
+    users = get_repository().load_users()
     
     if search:
         search_lower = search.lower()
@@ -32,15 +35,14 @@ async def get_user_profile(user_id: int):
 @router.get("/{user_id}", response_model=schemas.UserPublic)
 async def read_user(user_id: int):
     "Endpoint HTTP para buscar um usuário pelo ID."
-    users = db_json.load_users()
-    user = next((u for u in users if u.id == user_id), None)
+    user = EColecionador.buscarUsuario(id_outro=user_id)
     if user is None:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
     return user
 
 
 @router.put("/{user_id}", response_model=schemas.UserPublic)
-async def update_user(user_id: int, user_data: schemas.UserUpdate):
+def update_user(user_id: int, user_data: schemas.UserUpdate):
     "Endpoint HTTP para atualização de usuário."
     user_public = CEditarPerfil.updateUser(user_id=user_id, dados=user_data)
     
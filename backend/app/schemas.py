@@ -7,6 +7,10 @@ class UserUpdate(BaseModel): # <--- NOVO SCHEMA
     email: Optional[EmailStr] = None
     bio: Optional[str] = None
 
+def normalize_email(email: str) -> str:
+    """Forma canônica do email usada nas buscas (sem espaços, minúsculas)."""
+    return email.strip().lower()
+
 class UserCreate(BaseModel):
     name: str
     email: EmailStr 
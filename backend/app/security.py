@@ -1,5 +1,24 @@
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
 import bcrypt
 
+from . import instrumentation, metrics
+
+
+@contextmanager
+def _measured(operation: str) -> Iterator[None]:
+    """Tempo do bcrypt: nas métricas (/metrics) e no Server-Timing da requisição."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.BCRYPT_SECONDS.observe(elapsed, operation)
+        instrumentation.add_time("bcrypt", elapsed)
+
+
 def get_password_hash(password: str) -> str:
     """
     Cria um hash de senha usando bcrypt.
@@ -8,7 +27,8 @@ def get_password_hash(password: str) -> str:
     
     salt = bcrypt.gensalt()
     
-    hashed_bytes = bcrypt.hashpw(password_bytes, salt)
+    with _measured("hash"):
+        hashed_bytes = bcrypt.hashpw(password_bytes, salt)
     
     return hashed_bytes.decode('utf-8')
 
@@ -21,6 +41,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         
         hashed_password_bytes = hashed_password.encode('utf-8')
         
-        return bcrypt.checkpw(plain_password_bytes, hashed_password_bytes)
+        with _measured("verify"):
+            return bcrypt.checkpw(plain_password_bytes, hashed_password_bytes)
     except Exception:
         return False
\ No newline at end of file
@@ -0,0 +1,167 @@
+"""
+Sessão por requisição (identity map) sobre o repositório compartilhado.
+
+Uma requisição passa por vários E-* e controllers que buscam os mesmos
+registros (ex.: DELETE /api/items/{id} busca o item no router e de novo em
+EColecao.removerItem, e a coleção em EColecao.buscar). Com a sessão ativa,
+get_repository() devolve a RepositorySession da requisição: cada consulta é
+feita no máximo uma vez e todos recebem o mesmo objeto.
+"""
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from .instrumentation import timed
+from .repository import Repository, current_session, get_shared_repository
+from .schemas import UserInDB, CollectionInDB, ItemInDB, normalize_email
+from .storage import stats
+
+_MISSING = object()
+
+# Mutação → tabelas cujas consultas ela pode deixar desatualizadas (a
+# primeira é a do registro devolvido). Criar um item, por exemplo, também
+# altera os totais da coleção.
+_MUTATIONS: Dict[str, Tuple[str, ...]] = {
+    "save_users": ("users",),
+    "create_user": ("users",),
+    "update_user_in_db": ("users",),
+    "update_user_reset_token": ("users",),
+    "update_user_password": ("users",),
+    "save_collections": ("collections",),
+    "create_collection_in_db": ("collections",),
+    "update_collection_in_db": ("collections",),
+    "delete_collection_in_db": ("collections", "items"),
+    "update_collection_stats": ("collections",),
+    "recalculate_all_collection_stats": ("collections",),
+    "save_items": ("items", "collections"),
+    "create_item_in_db": ("items", "collections"),
+    "update_item_in_db": ("items", "collections"),
+    "delete_item_in_db": ("items", "collections"),
+}
+
+
+class RepositorySession:
+    """
+    Identity map de uma requisição: guarda o resultado de cada consulta por
+    chave (id, email, dono, coleção, tabela inteira) e registra cada
+    registro lido pelo seu id, de forma que buscas seguintes pelo id não
+    voltam ao repositório.
+
+    Mutações são repassadas ao repositório compartilhado; em seguida as
+    consultas das tabelas afetadas são descartadas e o registro devolvido
+    entra no mapa. Os demais métodos (consultas com filtros, manutenção,
+    ciclo de vida) são repassados como estão.
+
+    O tempo de cada chamada ao repositório compartilhado entra na fase
+    "storage" do Server-Timing da requisição.
+    """
+
+    def __init__(self, repository: Repository):
+        self.repository = repository
+        self._cache: Dict[str, Dict[Tuple[str, Hashable], Any]] = {
+            "users": {}, "collections": {}, "items": {},
+        }
+
+    def _lookup(self, table: str, lookup: str, key: Hashable, load: Callable[[], Any]) -> Any:
+        cache = self._cache[table]
+        value = cache.get((lookup, key), _MISSING)
+        stats.cache_lookup("session", value is not _MISSING)
+        if value is _MISSING:
+            with timed("storage"):
+                value = cache[(lookup, key)] = load()
+            if isinstance(value, list):
+                self._remember(table, value)
+            elif value is not None and lookup != "id":
+                self._remember(table, [value])
+        return value
+
+    def _remember(self, table: str, rows: List[Any]):
+        cache = self._cache[table]
+        for row in rows:
+            cache[("id", row.id)] = row
+
+    def _rows(self, table: str, lookup: str, key: Hashable, load: Callable[[], List[Any]]) -> List[Any]:
+        # Cópia rasa, como nos repositórios: quem chama pode alterar a lista
+        return list(self._lookup(table, lookup, key, load))
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.repository, name)
+        if not callable(attr):
+            return attr
+        tables = _MUTATIONS.get(name, ())
+
+        def call(*args, **kwargs):
+            try:
+                with timed("storage"):
+                    result = attr(*args, **kwargs)
+            finally:
+                for table in tables:
+                    self._cache[table].clear()
+            if tables and isinstance(result, BaseModel):
+                self._remember(tables[0], [result])
+            return result
+        return call
+
+    # --- Usuários ---
+
+    def load_users(self) -> List[UserInDB]:
+        return self._rows("users", "all", None, self.repository.load_users)
+
+    def get_user_by_id(self, user_id: int) -> Optional[UserInDB]:
+        return self._lookup("users", "id", user_id, lambda: self.repository.get_user_by_id(user_id))
+
+    def get_user_by_email(self, email: str) -> Optional[UserInDB]:
+        # Mesma chave para grafias que o repositório trata como o mesmo email
+        return self._lookup("users", "email", normalize_email(email),
+                            lambda: self.repository.get_user_by_email(email))
+
+    # --- Coleções ---
+
+    def load_collections(self) -> List[CollectionInDB]:
+        return self._rows("collections", "all", None, self.repository.load_collections)
+
+    def get_collection_by_id(self, collection_id: int) -> Optional[CollectionInDB]:
+        return self._lookup("collections", "id", collection_id,
+                            lambda: self.repository.get_collection_by_id(collection_id))
+
+    def get_collections_by_owner_id(self, owner_id: int) -> List[CollectionInDB]:
+        return self._rows("collections", "owner_id", owner_id,
+                          lambda: self.repository.get_collections_by_owner_id(owner_id))
+
+    # --- Itens ---
+
+    def load_items(self) -> List[ItemInDB]:
+        return self._rows("items", "all", None, self.repository.load_items)
+
+    def get_item_by_id(self, item_id: int) -> Optional[ItemInDB]:
+        return self._lookup("items", "id", item_id, lambda: self.repository.get_item_by_id(item_id))
+
+    def get_items_by_collection_id(self, collection_id: int) -> List[ItemInDB]:
+        return self._rows("items", "collection_id", collection_id,
+                          lambda: self.repository.get_items_by_collection_id(collection_id))
+
+
+@contextmanager
+def request_session() -> Iterator[RepositorySession]:
+    """Ativa uma sessão nova para o contexto atual (uma requisição)."""
+    session = RepositorySession(get_shared_repository())
+    token = current_session.set(session)
+    try:
+        yield session
+    finally:
+        current_session.reset(token)
+
+
+class RepositorySessionMiddleware:
+    """Middleware ASGI: cada requisição HTTP roda com a sua RepositorySession."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with request_session():
+            await self.app(scope, receive, send)
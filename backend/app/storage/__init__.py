@@ -0,0 +1,15 @@
+from . import stats
+from .table import JsonTable
+from .checkpoint import Checkpointer
+from .columns import ColumnStore, columns_enabled
+from .files import FsyncPolicy
+from .locks import ProcessLock
+from .ndjson import NdjsonTable, ndjson_path
+from .serializer import Serializer, get_serializer
+from .shards import ShardedTable, shards_directory
+from .transaction import UnitOfWork
+from .writer import StorageWriter
+
+__all__ = ['JsonTable', 'Checkpointer', 'FsyncPolicy', 'ProcessLock', 'StorageWriter', 'Serializer', 'get_serializer',
+           'ColumnStore', 'columns_enabled', 'NdjsonTable', 'ndjson_path',
+           'ShardedTable', 'shards_directory', 'UnitOfWork', 'stats']
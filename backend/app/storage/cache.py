@@ -0,0 +1,75 @@
+"""
+Cache binário de uma tabela JSON (<tabela>.cache), para a inicialização.
+
+Guarda o estado já montado (snapshot + log aplicado) em formato marshal,
+uma tupla de valores por registro, junto com a assinatura dos arquivos de
+origem. Se a assinatura ainda confere, a tabela é restaurada dele sem
+parse nem validação de JSON; senão o cache é ignorado. O marshal depende
+da versão do Python, que também faz parte da chave.
+"""
+import marshal
+import sys
+from operator import attrgetter
+from typing import Any, List, NamedTuple, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from . import stats
+from .files import atomic_write_bytes
+
+CACHE_FORMAT = 1
+
+
+class CachedState(NamedTuple):
+    rows: List[BaseModel]
+    log_offset: int
+    log_records: int
+
+
+def cache_path(path: str) -> str:
+    return path + ".cache"
+
+
+def _header(model: Type[BaseModel], source: Any) -> tuple:
+    return (CACHE_FORMAT, tuple(sys.version_info[:2]), tuple(model.model_fields), source)
+
+
+def _restore(model: Type[BaseModel], fields: Tuple[str, ...], values: List[tuple]) -> List[BaseModel]:
+    # O mesmo que model_construct() faz, sem os passos de valores padrão
+    new, set_attr = model.__new__, object.__setattr__
+    rows = []
+    for row_values in values:
+        row = new(model)
+        set_attr(row, "__dict__", dict(zip(fields, row_values)))
+        set_attr(row, "__pydantic_fields_set__", set(fields))
+        set_attr(row, "__pydantic_extra__", None)
+        set_attr(row, "__pydantic_private__", None)
+        rows.append(row)
+    return rows
+
+
+def write_cache(path: str, model: Type[BaseModel], source: Any, rows: List[BaseModel],
+                log_offset: int, log_records: int) -> None:
+    """`source`: assinatura dos arquivos que deram origem a `rows`."""
+    values = attrgetter(*model.model_fields)
+    with stats.timed("serialize"):
+        data = marshal.dumps((_header(model, source), log_offset, log_records, [values(row) for row in rows]))
+    atomic_write_bytes(cache_path(path), data)
+
+
+def read_cache(path: str, model: Type[BaseModel], source: Any) -> Optional[CachedState]:
+    """Estado guardado, ou None se não há cache ou ele não confere com `source`."""
+    try:
+        with open(cache_path(path), "rb") as f:
+            data = f.read()
+        stats.read(len(data))
+        with stats.timed("parse"):
+            header, log_offset, log_records, values = marshal.loads(data)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if header != _header(model, source):
+        return None
+    fields = header[2]
+    if len(fields) == 1:
+        values = [(value,) for value in values]  # attrgetter de um campo não devolve tupla
+    return CachedState(_restore(model, fields, values), log_offset, log_records)
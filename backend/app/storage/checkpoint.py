@@ -0,0 +1,75 @@
+import logging
+import threading
+import time
+from typing import Dict, List, Sequence
+
+from .table import JsonTable
+
+logger = logging.getLogger(__name__)
+
+
+class Checkpointer:
+    """
+    Thread em segundo plano que consolida o log das tabelas em snapshots.
+
+    Uma tabela é consolidada quando o log passa de `max_log_bytes` ou
+    `max_log_records`, ou quando tem registros há mais de `max_age_seconds`
+    desde o último checkpoint. Limites iguais a 0 ficam desativados.
+    """
+
+    def __init__(self, tables: Sequence[JsonTable], max_log_bytes: int = 0,
+                 max_log_records: int = 0, max_age_seconds: float = 0,
+                 poll_seconds: float = 1.0):
+        self.tables = list(tables)
+        self.max_log_bytes = max_log_bytes
+        self.max_log_records = max_log_records
+        self.max_age_seconds = max_age_seconds
+        self.poll_seconds = poll_seconds
+        self._last_checkpoint: Dict[str, float] = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _due(self, table: JsonTable, now: float) -> bool:
+        log_bytes, log_records = table.log_stats()
+        if log_records == 0:
+            return False
+        if self.max_log_bytes and log_bytes >= self.max_log_bytes:
+            return True
+        if self.max_log_records and log_records >= self.max_log_records:
+            return True
+        last = self._last_checkpoint.setdefault(table.path, now)
+        return bool(self.max_age_seconds) and now - last >= self.max_age_seconds
+
+    def run_once(self) -> List[str]:
+        """Consolida as tabelas que atingiram algum limite; retorna seus arquivos."""
+        done = []
+        for table in self.tables:
+            now = time.monotonic()
+            if self._due(table, now) and table.checkpoint():
+                self._last_checkpoint[table.path] = now
+                done.append(table.path)
+        return done
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                # Um checkpoint com falha não pode derrubar a thread; o log
+                # continua íntegro e a próxima volta tenta de novo
+                logger.exception("Falha no checkpoint do armazenamento")
+            self._stop.wait(self.poll_seconds)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="storage-checkpointer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
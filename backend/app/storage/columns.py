@@ -0,0 +1,243 @@
+"""
+Acelerador de consultas: cópia colunar (NumPy) dos registros de uma
+tabela, para filtros, ordenação e agregações vetorizados sobre muitos
+registros.
+
+É uma cópia a mais, mantida junto dos modelos Pydantic (que continuam em
+memória): troca memória (cerca de 150 bytes por registro, entre os arrays
+e o mapa chave → posição, mais os textos distintos) por consultas mais
+rápidas. Opcional (COLLECTMASTER_ITEM_COLUMNS):
+- "0": desativa (padrão; as consultas percorrem os modelos em Python)
+- "1": ativa; exige o NumPy
+- "auto": ativa se o NumPy estiver instalado
+"""
+import threading
+from operator import attrgetter
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Faixa inclusiva (mínimo, máximo); None deixa o lado em aberto
+Range = Tuple[Optional[float], Optional[float]]
+
+# Código de None nas colunas de texto
+_NONE_CODE = 0
+# Abaixo disto não vale a pena compactar
+_MIN_COMPACT = 1024
+
+
+def columns_enabled(setting: str = "0") -> bool:
+    if setting == "auto":
+        return np is not None
+    if setting == "0":
+        return False
+    if setting == "1":
+        if np is None:
+            raise RuntimeError("NumPy não está instalado (pip install numpy)")
+        return True
+    raise ValueError(f"Opção de armazenamento colunar inválida: {setting}")
+
+
+class ColumnStore:
+    """
+    Cópia dos registros de uma JsonTable (parâmetro `columns`) guardada por
+    coluna e mantida pela tabela a cada escrita, como os índices:
+    - cada campo numérico num array NumPy
+    - cada campo de texto num array de códigos int32, com um dicionário
+      que guarda cada string distinta uma única vez (código 0 = None)
+
+    Um registro removido só é desmarcado em `live`; as posições mortas são
+    descartadas quando passam da metade (compactação). As posições seguem a
+    ordem de inserção da tabela.
+
+    Consultas e escritas passam por um lock próprio: uma consulta nunca vê
+    uma escrita pela metade.
+    """
+
+    def __init__(self, numeric: Dict[str, str], text: Sequence[str] = (), key: str = "id"):
+        if np is None:
+            raise RuntimeError("NumPy não está instalado (pip install numpy)")
+        self.key = key
+        self._dtypes = {key: np.dtype(np.int64)}
+        self._dtypes.update((name, np.dtype(dtype)) for name, dtype in numeric.items())
+        self._text = tuple(text)
+        self._lock = threading.Lock()
+        self._clear(0)
+
+    # --- Escrita (chamada pela JsonTable) ---
+
+    def _clear(self, capacity: int):
+        self._size = 0
+        self._dead = 0
+        self._live = np.zeros(capacity, dtype=bool)
+        self._arrays = {name: np.zeros(capacity, dtype=dtype) for name, dtype in self._dtypes.items()}
+        self._arrays.update((name, np.zeros(capacity, dtype=np.int32)) for name in self._text)
+        self._positions: Dict[int, int] = {}
+        self._strings: Dict[str, List[Optional[str]]] = {name: [None] for name in self._text}
+        self._codes: Dict[str, Dict[Optional[str], int]] = {name: {None: _NONE_CODE} for name in self._text}
+        self._ranks: Dict[str, Any] = {}
+
+    def _intern(self, name: str, value: Optional[str]) -> int:
+        codes = self._codes[name]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self._strings[name])
+            self._strings[name].append(value)
+            self._ranks.pop(name, None)
+        return code
+
+    def _grow(self):
+        capacity = max(16, 2 * len(self._live))
+        self._live = np.resize(self._live, capacity)
+        self._live[self._size:] = False
+        for name, array in self._arrays.items():
+            self._arrays[name] = np.resize(array, capacity)
+
+    def _write_row(self, position: int, row: Any):
+        arrays = self._arrays
+        for name in self._dtypes:
+            arrays[name][position] = getattr(row, name)
+        for name in self._text:
+            arrays[name][position] = self._intern(name, getattr(row, name))
+        self._live[position] = True
+
+    def reset(self, rows: List[Any]):
+        """Substitui todo o conteúdo (carga da tabela)."""
+        with self._lock:
+            self._clear(len(rows))
+            self._size = len(rows)
+            self._live[:] = True
+            for name, dtype in self._dtypes.items():
+                self._arrays[name] = np.fromiter(map(attrgetter(name), rows), dtype=dtype, count=len(rows))
+            for name in self._text:
+                codes = self._codes[name]
+                strings = self._strings[name]
+                for value in set(map(attrgetter(name), rows)) - codes.keys():
+                    codes[value] = len(strings)
+                    strings.append(value)
+                self._arrays[name] = np.fromiter(map(codes.__getitem__, map(attrgetter(name), rows)),
+                                                 dtype=np.int32, count=len(rows))
+            self._positions = {pk: position for position, pk in enumerate(self._arrays[self.key].tolist())}
+
+    def put(self, row: Any):
+        """Insere ou substitui (na mesma posição) o registro de mesma chave."""
+        pk = getattr(row, self.key)
+        with self._lock:
+            position = self._positions.get(pk)
+            if position is None:
+                if self._size == len(self._live):
+                    self._grow()
+                position = self._positions[pk] = self._size
+                self._size += 1
+            self._write_row(position, row)
+
+    def remove(self, pk: int):
+        with self._lock:
+            position = self._positions.pop(pk, None)
+            if position is None:
+                return
+            self._live[position] = False
+            self._dead += 1
+            if self._dead > _MIN_COMPACT and self._dead * 2 > self._size:
+                self._compact()
+
+    def _compact(self):
+        live = self._live[:self._size]
+        arrays = {name: array[:self._size][live] for name, array in self._arrays.items()}
+        strings = self._strings
+        self._clear(0)
+        # Dicionários refeitos só com as strings ainda em uso
+        for name in self._text:
+            used = np.unique(arrays[name])
+            remap = np.zeros(len(strings[name]), dtype=np.int32)
+            remap[used] = [self._intern(name, strings[name][code]) for code in used.tolist()]
+            arrays[name] = remap[arrays[name]]
+        self._arrays = arrays
+        self._size = len(arrays[self.key])
+        self._live = np.ones(self._size, dtype=bool)
+        self._positions = {pk: position for position, pk in enumerate(arrays[self.key].tolist())}
+
+    # --- Consultas ---
+
+    def _snapshot(self, names: Iterable[str], ranked: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Cópia das colunas pedidas, só com os registros vivos. A coluna de
+        texto `ranked` vem como a posição de cada valor na ordem alfabética.
+        """
+        with self._lock:
+            live = self._live[:self._size]
+            columns = {name: self._arrays[name][:self._size][live] for name in set(names)}
+            if ranked in self._text:
+                columns[ranked] = self._text_ranks(ranked)[columns[ranked]]
+            return columns
+
+    def _text_ranks(self, name: str) -> Any:
+        ranks = self._ranks.get(name)
+        if ranks is None:
+            # None antes de qualquer string
+            strings = self._strings[name]
+            order = sorted(range(1, len(strings)), key=strings.__getitem__)
+            ranks = np.empty(len(strings), dtype=np.int64)
+            ranks[_NONE_CODE] = -1
+            ranks[order] = np.arange(len(order))
+            self._ranks[name] = ranks
+        return ranks
+
+    def _mask(self, columns: Dict[str, Any], equals_any: Dict[str, Sequence[Hashable]],
+              ranges: Dict[str, Range]) -> Any:
+        mask = np.ones(len(columns[self.key]), dtype=bool)
+        for name, values in equals_any.items():
+            mask &= np.isin(columns[name], np.asarray(list(values), dtype=self._dtypes[name]))
+        for name, (low, high) in ranges.items():
+            if low is not None:
+                mask &= columns[name] >= low
+            if high is not None:
+                mask &= columns[name] <= high
+        return mask
+
+    def select(self, equals_any: Optional[Dict[str, Sequence[Hashable]]] = None,
+               ranges: Optional[Dict[str, Range]] = None,
+               order_by: Optional[str] = None, descending: bool = False) -> List[int]:
+        """
+        Chaves dos registros cujo campo está entre os valores de
+        `equals_any[campo]` e dentro da faixa `ranges[campo]`, ordenadas por
+        `order_by` (empates pela chave, em ordem crescente).
+        """
+        equals_any, ranges = equals_any or {}, ranges or {}
+        names = [self.key, *equals_any, *ranges] + ([order_by] if order_by else [])
+        columns = self._snapshot(names, ranked=order_by)
+        mask = self._mask(columns, equals_any, ranges)
+        keys = columns[self.key][mask]
+        if order_by is not None:
+            sort_key = columns[order_by][mask]
+            keys = keys[np.lexsort((keys, -sort_key if descending else sort_key))]
+        return keys.tolist()
+
+    def sum_by(self, by: str, sums: Dict[str, Tuple[str, ...]],
+               equals_any: Optional[Dict[str, Sequence[Hashable]]] = None) -> Dict[Hashable, Dict[str, Any]]:
+        """
+        Somas agrupadas por `by`: cada entrada de `sums` é a soma do produto
+        dos campos listados (ex.: {"value": ("quantity", "estimated_value")}).
+        Grupos sem registros não aparecem no resultado.
+        """
+        equals_any = equals_any or {}
+        factors = [name for fields in sums.values() for name in fields]
+        columns = self._snapshot([self.key, by, *equals_any, *factors])
+        mask = self._mask(columns, equals_any, {})
+        groups, group_of = np.unique(columns[by][mask], return_inverse=True)
+        totals = {}
+        for out, fields in sums.items():
+            product = np.ones(len(group_of))
+            for name in fields:
+                product *= columns[name][mask]
+            total = np.bincount(group_of, weights=product, minlength=len(groups))
+            if all(self._dtypes[name].kind in "iu" for name in fields):
+                total = np.rint(total).astype(np.int64)
+            totals[out] = total.tolist()
+        return {group: {out: totals[out][i] for out in sums} for i, group in enumerate(groups.tolist())}
+
+    def __len__(self) -> int:
+        return len(self._positions)
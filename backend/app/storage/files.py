@@ -0,0 +1,129 @@
+import os
+import tempfile
+import threading
+from typing import Iterable, Optional, Set
+
+from . import stats
+
+FSYNC_POLICIES = ("always", "periodic", "never")
+
+
+class FsyncPolicy:
+    """
+    Política de durabilidade das gravações:
+    - "always": fsync do arquivo (e do diretório, após um rename) antes de
+      a escrita ser considerada concluída
+    - "periodic": a escrita retorna logo; uma thread faz fsync dos arquivos
+      alterados a cada `interval_seconds` (perde no máximo essa janela)
+    - "never": deixa a gravação no cache do sistema operacional
+    """
+
+    def __init__(self, policy: str = "never", interval_seconds: float = 1.0):
+        if policy not in FSYNC_POLICIES:
+            raise ValueError(f"Política de fsync inválida: {policy}")
+        self.policy = policy
+        self.interval_seconds = interval_seconds
+        self._pending: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def immediate(self) -> bool:
+        return self.policy == "always"
+
+    def written(self, path: str) -> None:
+        """Registra que `path` foi alterado sem fsync imediato."""
+        if self.policy != "periodic":
+            return
+        with self._lock:
+            self._pending.add(path)
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="storage-fsync", daemon=True)
+                self._thread.start()
+
+    def sync_pending(self) -> None:
+        """fsync de tudo o que foi alterado desde a última rodada."""
+        with self._lock:
+            paths, self._pending = self._pending, set()
+        for path in paths:
+            try:
+                fsync_path(path)
+            except FileNotFoundError:
+                pass  # substituído ou removido depois da gravação
+            fsync_directory(path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            self.sync_pending()
+
+    def stop(self) -> None:
+        """Encerra a thread periódica garantindo o fsync das pendências."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+        self.sync_pending()
+
+
+def fsync_path(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        with stats.timed("fsync"):
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def fsync_directory(path: str) -> None:
+    """Persiste a entrada de diretório (necessário depois de rename/criação)."""
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # sistemas sem suporte a abrir diretórios (ex.: Windows)
+    try:
+        with stats.timed("fsync"):
+            os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_bytes(path: str, data: bytes, durability: Optional[FsyncPolicy] = None) -> None:
+    """
+    Grava `data` em `path` de forma atômica: escreve num arquivo temporário
+    no mesmo diretório e o renomeia por cima do destino. Leitores veem o
+    arquivo antigo ou o novo, nunca um arquivo pela metade.
+    """
+    atomic_write_chunks(path, (data,), durability)
+
+
+def atomic_write_chunks(path: str, chunks: Iterable[bytes], durability: Optional[FsyncPolicy] = None) -> None:
+    """Como atomic_write_bytes, gravando os pedaços à medida que são gerados."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+            if durability is not None and durability.immediate:
+                f.flush()
+                with stats.timed("fsync"):
+                    os.fsync(f.fileno())
+            size = f.tell()
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    stats.written(size)
+
+    if durability is not None:
+        if durability.immediate:
+            fsync_directory(path)
+        else:
+            durability.written(path)
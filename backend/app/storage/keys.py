@@ -0,0 +1,32 @@
+"""
+Maior chave primária já usada por uma tabela, gravada junto dos dados.
+
+A sequência de next_key() fica no collectmaster.lock, que é descartável:
+sem ele, a próxima chave sai do maior registro nos arquivos. Quando o
+registro com a maior chave é removido, a chave é gravada em <tabela>.keys
+antes da remoção, para não voltar a ser usada ({"last_key": 42}).
+"""
+import json
+from typing import Optional
+
+from .files import FsyncPolicy, atomic_write_bytes
+
+
+def keys_path(path: str) -> str:
+    return path + ".keys"
+
+
+def read_last_key(path: str) -> int:
+    """Chave gravada em <tabela>.keys (0 se o arquivo não existe)."""
+    try:
+        with open(keys_path(path), "rb") as f:
+            return int(json.loads(f.read())["last_key"])
+    except FileNotFoundError:
+        return 0
+
+
+def write_last_key(path: str, key: int, durability: Optional[FsyncPolicy] = None) -> int:
+    """Grava max(`key`, chave já gravada) e a retorna."""
+    key = max(key, read_last_key(path))
+    atomic_write_bytes(keys_path(path), json.dumps({"last_key": key}).encode(), durability)
+    return key
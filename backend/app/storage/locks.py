@@ -0,0 +1,165 @@
+import os
+import struct
+import threading
+from typing import Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Versão de cada tabela guardada no arquivo de lock: (época, contador).
+# O contador sobe a cada gravação; a época, quando os arquivos são
+# substituídos (snapshot regravado, log consolidado).
+TableVersion = Tuple[int, int]
+# Posição de cada tabela no arquivo: época, contador e última chave reservada
+_SLOT = struct.Struct("<QQQ")
+# No Windows o lock é obrigatório para a região travada: fica longe das versões
+_LOCK_OFFSET = 1 << 20
+
+
+class ProcessLock:
+    """
+    Lock exclusivo entre processos (ex.: `uvicorn --workers N`), sobre um
+    arquivo .lock: fcntl.flock no Linux/macOS, msvcrt.locking no Windows.
+
+    Dentro do processo é reentrante para a thread que o detém; as demais
+    threads esperam num RLock antes de disputar o lock do arquivo.
+
+    hold()/release_hold() mantêm só o lock do arquivo, sem prender uma
+    thread: os outros processos esperam, as threads deste seguem (usado
+    enquanto uma tabela tem gravações adiadas).
+
+    O mesmo arquivo guarda a versão de cada tabela (read_version /
+    bump_version): um worker sabe que outro gravou comparando um contador,
+    sem depender de inode/mtime (reaproveitados pelo sistema de arquivos).
+    Guarda também a sequência de chaves primárias (allocate_key), comum a
+    todos os workers.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._state_lock = threading.Lock()
+        self._depth = 0
+        self._holds = 0
+        self._locked = False
+        self._fd = None
+        self._io_lock = threading.Lock()
+
+    def _file(self) -> int:
+        if self._fd is None:
+            with self._io_lock:
+                if self._fd is None:
+                    self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        return self._fd
+
+    def _lock_file(self):
+        fd = self._file()
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            return
+        while True:
+            try:
+                os.lseek(fd, _LOCK_OFFSET, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue  # LK_LOCK desiste após ~10 s; continua esperando
+
+    def _unlock_file(self):
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(self._fd, _LOCK_OFFSET, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+
+    def _sync_file_lock(self):
+        wanted = self._depth > 0 or self._holds > 0
+        if wanted and not self._locked:
+            self._lock_file()
+            self._locked = True
+        elif not wanted and self._locked:
+            self._unlock_file()
+            self._locked = False
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        with self._state_lock:
+            self._depth += 1
+            try:
+                self._sync_file_lock()
+            except BaseException:
+                self._depth -= 1
+                self._thread_lock.release()
+                raise
+
+    def release(self):
+        with self._state_lock:
+            self._depth -= 1
+            self._sync_file_lock()
+        self._thread_lock.release()
+
+    def hold(self):
+        with self._state_lock:
+            self._holds += 1
+            self._sync_file_lock()
+
+    def release_hold(self):
+        with self._state_lock:
+            self._holds -= 1
+            self._sync_file_lock()
+
+    def _pread(self, size: int, offset: int) -> bytes:
+        fd = self._file()
+        if hasattr(os, "pread"):
+            return os.pread(fd, size, offset)
+        with self._io_lock:
+            os.lseek(fd, offset, os.SEEK_SET)
+            return os.read(fd, size)
+
+    def _pwrite(self, data: bytes, offset: int):
+        fd = self._file()
+        if hasattr(os, "pwrite"):
+            os.pwrite(fd, data, offset)
+            return
+        with self._io_lock:
+            os.lseek(fd, offset, os.SEEK_SET)
+            os.write(fd, data)
+
+    def _read_slot(self, slot: int) -> Tuple[int, int, int]:
+        data = self._pread(_SLOT.size, slot * _SLOT.size)
+        if len(data) < _SLOT.size:
+            return (0, 0, 0)
+        return _SLOT.unpack(data)
+
+    def read_version(self, slot: int) -> TableVersion:
+        """Versão atual da tabela `slot` (leitura sem lock)."""
+        epoch, counter, _ = self._read_slot(slot)
+        return (epoch, counter)
+
+    def bump_version(self, slot: int, new_epoch: bool) -> TableVersion:
+        """Registra uma gravação na tabela `slot`; chamar com o lock adquirido."""
+        epoch, counter, last_key = self._read_slot(slot)
+        version = (epoch + 1 if new_epoch else epoch, counter + 1)
+        self._pwrite(_SLOT.pack(*version, last_key), slot * _SLOT.size)
+        return version
+
+    def allocate_key(self, slot: int, minimum: int) -> int:
+        """
+        Reserva a próxima chave da tabela `slot`, nunca abaixo de `minimum`
+        (se o arquivo de lock for apagado, a sequência recomeça do maior id
+        existente). Chamar com o lock adquirido.
+        """
+        epoch, counter, last_key = self._read_slot(slot)
+        key = max(last_key + 1, minimum)
+        self._pwrite(_SLOT.pack(epoch, counter, key), slot * _SLOT.size)
+        return key
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
@@ -0,0 +1,124 @@
+"""
+Log de escrita (append-only) de uma tabela JSON.
+
+Cada linha do arquivo <tabela>.log é um registro compacto:
+    {"op": "insert", "row": {...}}
+    {"op": "update", "row": {...}}
+    {"op": "delete", "key": 5}
+
+Inserções e atualizações carregam o registro completo, então reaplicar o
+mesmo registro duas vezes leva ao mesmo estado (replay idempotente).
+
+Antes de trocar o snapshot por um que substitui a tabela inteira (save()),
+o log recebe a marca do novo snapshot:
+    {"op": "snapshot", "digest": "..."}
+Se o processo cair depois da troca e antes de o log ser removido, o replay
+reconhece que o snapshot atual já contém tudo o que veio antes da marca
+(skip_replaced).
+"""
+import hashlib
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import stats
+from .files import FsyncPolicy, fsync_directory
+from .serializer import JSON, Serializer
+
+LogRecord = Dict[str, Any]
+
+
+def log_path(path: str) -> str:
+    return path + ".log"
+
+
+def encode_records(records: List[LogRecord], serializer: Serializer = JSON) -> bytes:
+    dumps = serializer.dumps
+    with stats.timed("serialize"):
+        return b"".join([dumps(record) + b"\n" for record in records])
+
+
+def append_lines(path: str, data: bytes, durability: Optional[FsyncPolicy] = None) -> Tuple[int, int]:
+    """
+    Anexa linhas já codificadas (terminadas em "\n") ao arquivo.
+    Retorna (posição onde `data` começou, novo tamanho do arquivo).
+    Com a política "always", só retorna depois do fsync.
+    """
+    created = not os.path.exists(path)
+    with open(path, "a+b") as f:
+        size = f.seek(0, 2)
+        if size > 0:
+            # Uma escrita interrompida pode ter deixado uma linha sem "\n";
+            # isola o lixo numa linha própria para não corromper o próximo registro
+            f.seek(size - 1)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+                size += 1
+        f.write(data)
+        end = f.tell()
+        if durability is not None and durability.immediate:
+            f.flush()
+            with stats.timed("fsync"):
+                os.fsync(f.fileno())
+    stats.written(len(data))
+
+    if durability is not None:
+        if not durability.immediate:
+            durability.written(path)
+        elif created:
+            fsync_directory(path)
+    return size, end
+
+
+def append_records(path: str, records: List[LogRecord],
+                   durability: Optional[FsyncPolicy] = None, serializer: Serializer = JSON) -> int:
+    """Anexa os registros ao log e retorna o novo tamanho do arquivo."""
+    return append_lines(path, encode_records(records, serializer), durability)[1]
+
+
+def read_records(path: str, offset: int = 0, serializer: Serializer = JSON) -> Tuple[List[LogRecord], int]:
+    """
+    Lê os registros a partir de `offset`.
+    Retorna (registros, offset logo após o último registro completo).
+    """
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return [], 0
+    stats.read(len(data))
+
+    records = []
+    consumed = 0
+    with stats.timed("parse"):
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break  # último registro ainda incompleto
+            consumed += len(line)
+            try:
+                records.append(serializer.loads(line))
+            except ValueError:
+                continue  # resto de uma escrita interrompida
+    return records, offset + consumed
+
+
+def snapshot_record(data: bytes) -> LogRecord:
+    """Marca de que o snapshot vai ser trocado pelo conteúdo `data`."""
+    return {"op": "snapshot", "digest": hashlib.blake2b(data, digest_size=16).hexdigest()}
+
+
+def skip_replaced(records: List[LogRecord], snapshot: Callable[[], bytes]) -> List[LogRecord]:
+    """
+    Registros a reaplicar sobre o snapshot atual (conteúdo lido por
+    `snapshot`, só se o log tem marcas): os anteriores à marca do snapshot
+    atual já estão nele. Marcas de trocas que não chegaram a acontecer são
+    ignoradas.
+    """
+    if not any(record["op"] == "snapshot" for record in records):
+        return records
+    current = snapshot_record(snapshot())["digest"]
+    start = 0
+    for position, record in enumerate(records):
+        if record["op"] == "snapshot" and record["digest"] == current:
+            start = position + 1
+    return [record for record in records[start:] if record["op"] != "snapshot"]
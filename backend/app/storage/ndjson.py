@@ -0,0 +1,681 @@
+"""
+Tabela em NDJSON lida por mmap, para tabelas grandes demais para ficarem
+inteiras na memória (COLLECTMASTER_ITEM_STORAGE=ndjson).
+
+Cada linha de <tabela>.ndjson é um registro completo. Uma alteração anexa
+a nova versão do registro; uma remoção anexa {"$delete": chave}. Em
+memória fica só o índice chave → (posição da linha, grupo) e grupo →
+chaves: os registros são lidos do mmap e decodificados só quando
+devolvidos.
+
+As linhas substituídas viram lixo: log_stats() diz quanto, e checkpoint()
+regrava o arquivo só com as linhas vivas, copiadas sem decodificar. O
+índice é salvo em <tabela>.ndjson.idx (save_cache()) e reaproveitado na
+próxima partida se o arquivo não mudou. Como na JsonTable, remover o
+registro com a maior chave a grava em <tabela>.ndjson.keys (ver keys.py).
+"""
+import marshal
+import mmap
+import os
+import threading
+from contextlib import nullcontext
+from typing import Any, Dict, Generic, Hashable, Iterable, Iterator, List, Optional, Tuple, Type
+
+from pydantic import TypeAdapter, ValidationError
+
+from . import stats
+from .files import FsyncPolicy, atomic_write_bytes, atomic_write_chunks
+from .keys import keys_path, read_last_key, write_last_key
+from .locks import ProcessLock, TableVersion
+from .log import LogRecord, append_lines
+from .serializer import JSON, Serializer
+from .table import M, FileSignature, file_signature, gc_paused, trusted_model
+
+INDEX_FORMAT = 1
+DELETE = "$delete"
+# Posição dos registros alterados no modo "memory" (guardados em _overlay)
+_IN_MEMORY = -1
+# Lugar de um registro ainda não decodificado (_decode_many)
+_PENDING = object()
+
+# Chave primária → (posição da linha no arquivo, valor do grupo)
+Entries = Dict[int, Tuple[int, Hashable]]
+
+
+def ndjson_path(path: str) -> str:
+    """items.json → items.ndjson"""
+    return os.path.splitext(path)[0] + ".ndjson"
+
+
+def index_path(path: str) -> str:
+    return path + ".idx"
+
+
+def _fd_signature(fd: int) -> FileSignature:
+    st = os.fstat(fd)
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class _View:
+    """
+    Um arquivo aberto, seu mmap e o índice que aponta para ele. A
+    compactação publica um _View novo de uma vez: um leitor nunca combina
+    o índice de um arquivo com as linhas de outro.
+    """
+
+    def __init__(self, path: str, entries: Optional[Entries] = None,
+                 groups: Optional[Dict[Hashable, Dict[int, None]]] = None):
+        self.path = path
+        try:
+            self.file = open(path, "rb")
+        except FileNotFoundError:
+            self.file = None  # aberto na primeira linha anexada
+        self.mm: Optional[mmap.mmap] = None
+        self.entries: Entries = entries if entries is not None else {}
+        self.groups: Dict[Hashable, Dict[int, None]] = groups if groups is not None else {}
+        self._lock = threading.Lock()
+
+    def remap(self) -> Optional[mmap.mmap]:
+        """Mapeia o arquivo de novo se ele cresceu (linhas anexadas)."""
+        with self._lock:
+            if self.file is None:
+                if not os.path.exists(self.path):
+                    return None
+                self.file = open(self.path, "rb")
+            size = os.fstat(self.file.fileno()).st_size
+            if size and (self.mm is None or len(self.mm) < size):
+                self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            return self.mm
+
+    def line(self, offset: int) -> bytes:
+        """Linha que começa em `offset`, sem o "\\n"."""
+        mm = self.mm
+        if mm is None or offset >= len(mm):
+            mm = self.remap()
+        return mm[offset:mm.find(b"\n", offset)]
+
+    def signature(self) -> FileSignature:
+        return None if self.file is None else _fd_signature(self.file.fileno())
+
+
+class NdjsonTable(Generic[M]):
+    """
+    Tabela em <arquivo>.ndjson com o mesmo uso da JsonTable (get, find_by,
+    insert, replace, delete, next_key, checkpoint...), mas sem manter os
+    registros em memória. `group` é o único índice de múltiplos valores
+    (ex.: "collection_id").
+
+    - Escritas anexam linhas (custo proporcional ao registro). Num lote
+      (begin_batch()) ou numa transação (UnitOfWork), os registros alterados
+      ficam em memória e são anexados de uma vez no flush(); o write-behind
+      não se aplica
+    - "snapshot" e "log" se comportam igual; no modo "memory" nada é
+      gravado e os registros alterados ficam em memória
+    - Com `process_lock`, a versão da tabela (`version_slot`) avisa os
+      outros processos: se só foram anexadas linhas, o índice lê apenas o
+      final do arquivo; se o arquivo foi compactado, o índice é refeito
+
+    O mmap de um arquivo substituído continua válido para os leitores
+    antigos (Linux/macOS); no Windows a compactação falha com o arquivo
+    aberto e é tentada de novo no próximo checkpoint.
+    """
+
+    def __init__(self, path: str, model: Type[M], key: str = "id", group: Optional[str] = None,
+                 mode: str = "snapshot", durability: Optional[FsyncPolicy] = None,
+                 process_lock: Optional[ProcessLock] = None, version_slot: int = 0,
+                 verify: bool = False, serializer: Serializer = JSON):
+        if mode not in ("snapshot", "log", "memory"):
+            raise ValueError(f"Modo de armazenamento inválido: {mode}")
+        self.path = path
+        self.model = model
+        self.key = key
+        self.group = group
+        self.mode = mode
+        self.durability = durability
+        self.process_lock = process_lock
+        self.version_slot = version_slot
+        self.verify = verify
+        self.serializer = serializer
+        row_model = model if verify else trusted_model(model)
+        self._row_adapter = TypeAdapter(row_model)
+        self._list_adapter = TypeAdapter(List[row_model])
+        self._dump_adapter = TypeAdapter(model)
+        self._view = _View(path)
+        self._overlay: Dict[int, M] = {}
+        # Fim da última linha completa já indexada
+        self._end = 0
+        self._dead_bytes = 0
+        self._dead_records = 0
+        self._signature: FileSignature = None
+        self._version: Optional[TableVersion] = None
+        self._index_source: FileSignature = None
+        self._loaded = False
+        self._max_key = 0
+        self._next_key = 1
+        # Maior chave gravada em <tabela>.ndjson.keys
+        self._last_key = 0
+        # Só protege escritas e recargas; leituras usam _ensure_fresh()
+        self._lock = threading.RLock()
+        # Lote/transação: mutações em _overlay, anexadas no flush()
+        self._batch_depth = 0
+        self._dirty = False
+        self._pending: List[LogRecord] = []
+        # Transação aberta: (chave, entrada anterior do índice, registro anterior em _overlay)
+        self._undo: Optional[List[Tuple[int, Optional[Tuple[int, Hashable]], Optional[M]]]] = None
+        self._undo_state: Tuple[bool, int, int, int] = (False, 0, 0, 0)
+        # Mesma interface da JsonTable (sem write-behind, não há flush por timer)
+        self.unit_of_work: Optional[Any] = None
+
+    # --- Índice ---
+
+    def _line_size(self, view: _View, offset: int) -> int:
+        return 0 if offset == _IN_MEMORY else len(view.line(offset)) + 1
+
+    def _index(self, view: _View, pk: int, offset: int, group: Hashable):
+        old = view.entries.get(pk)
+        if old is not None:
+            self._dead_bytes += self._line_size(view, old[0])
+            self._dead_records += 1
+            if old[1] != group:
+                self._ungroup(view, pk, old[1])
+        view.entries[pk] = (offset, group)
+        if group is not None:
+            view.groups.setdefault(group, {})[pk] = None
+        if pk > self._max_key:
+            self._max_key = pk
+
+    def _ungroup(self, view: _View, pk: int, group: Hashable):
+        bucket = view.groups.get(group)
+        if bucket is not None:
+            bucket.pop(pk, None)
+            if not bucket:
+                del view.groups[group]
+
+    def _unindex(self, view: _View, pk: int) -> bool:
+        old = view.entries.pop(pk, None)
+        if old is None:
+            return False
+        self._dead_bytes += self._line_size(view, old[0])
+        self._dead_records += 1
+        self._ungroup(view, pk, old[1])
+        self._overlay.pop(pk, None)
+        return True
+
+    def _scan(self, view: _View, start: int):
+        """Indexa as linhas completas a partir de `start` (decodifica cada uma)."""
+        mm = view.remap()
+        if mm is None:
+            return
+        loads = self.serializer.loads
+        position, size = start, len(mm)
+        stats.read(size - position)
+        with stats.timed("parse"):
+            while position < size:
+                end = mm.find(b"\n", position)
+                if end < 0:
+                    break  # última linha ainda incompleta
+                try:
+                    record = loads(mm[position:end])
+                except ValueError:
+                    record = None  # resto de uma escrita interrompida
+                if isinstance(record, dict) and DELETE in record:
+                    self._unindex(view, record[DELETE])
+                    self._dead_bytes += end + 1 - position
+                    self._dead_records += 1
+                elif isinstance(record, dict) and self.key in record:
+                    group = record.get(self.group) if self.group else None
+                    self._index(view, record[self.key], position, group)
+                else:
+                    self._dead_bytes += end + 1 - position
+                    self._dead_records += 1
+                position = end + 1
+        self._end = position
+
+    def _load_index(self, view: _View) -> bool:
+        try:
+            with open(index_path(self.path), "rb") as f:
+                data = f.read()
+            stats.read(len(data))
+            with stats.timed("parse"):
+                header, end, dead_bytes, dead_records, keys, offsets, groups = marshal.loads(data)
+        except (OSError, EOFError, ValueError, TypeError):
+            return False
+        source = view.signature()
+        if header != (INDEX_FORMAT, self.key, self.group, source):
+            return False
+        view.entries = dict(zip(keys, zip(offsets, groups)))
+        for pk, group in zip(keys, groups):
+            if group is not None:
+                view.groups.setdefault(group, {})[pk] = None
+        self._end, self._dead_bytes, self._dead_records = end, dead_bytes, dead_records
+        self._max_key = max(keys, default=0)
+        self._index_source = source
+        return True
+
+    def _open_view(self) -> _View:
+        stats.count("load:" + os.path.basename(self.path))
+        view = _View(self.path)
+        self._end = self._dead_bytes = self._dead_records = 0
+        self._max_key = 0
+        self._overlay = {}
+        if view.file is not None:
+            with gc_paused():
+                indexed = self._load_index(view)
+                stats.cache_lookup("ndjson_index", indexed)
+                if not indexed:
+                    self._scan(view, 0)
+        self._last_key = read_last_key(self.path)
+        self._max_key = max(self._max_key, self._last_key)
+        return view
+
+    # --- Leitura ---
+
+    def _read_version(self) -> Optional[TableVersion]:
+        if self.process_lock is None:
+            return None
+        return self.process_lock.read_version(self.version_slot)
+
+    def _refresh(self):
+        """Atualiza o índice se outro processo gravou desde a última leitura."""
+        if self.mode == "memory" and self._loaded:
+            return
+        if self._dirty:
+            # Há mutações ainda não gravadas (e o lock entre processos está retido)
+            return
+        version = self._read_version()
+        signature = file_signature(self.path)
+        if self._loaded and version == self._version and signature == self._signature:
+            return
+
+        same_epoch = version is None or (self._version is not None and version[0] == self._version[0])
+        grew = (
+            self._loaded and same_epoch
+            and signature is not None and self._signature is not None
+            and signature[0] == self._signature[0] and signature[2] >= self._end
+        )
+        if grew:
+            self._scan(self._view, self._end)
+        else:
+            self._view = self._open_view()
+        self._version = version
+        self._signature = signature
+        self._loaded = True
+
+    def _is_current(self) -> bool:
+        return self._read_version() == self._version and file_signature(self.path) == self._signature
+
+    def _ensure_fresh(self) -> _View:
+        if self._loaded and (self.mode == "memory" or self._dirty or self._is_current()):
+            stats.cache_lookup("table", True)
+        else:
+            stats.cache_lookup("table", False)
+            with self._lock:
+                self._refresh()
+        return self._view
+
+    def _decode_many(self, view: _View, keys: Iterable[int]) -> List[M]:
+        rows: List[Any] = []
+        lines = []
+        for pk in keys:
+            entry = view.entries.get(pk)
+            if entry is None:
+                continue
+            if entry[0] == _IN_MEMORY:
+                row = self._overlay.get(pk)
+                if row is not None:
+                    rows.append(row)
+                continue
+            rows.append(_PENDING)
+            lines.append(view.line(entry[0]))
+        if not lines:
+            return rows
+        data = b"[" + b",".join(lines) + b"]"
+        stats.read(len(data))
+        # Uma única validação para todas as linhas, como na carga da JsonTable
+        with stats.timed("validate"):
+            decoded = iter(self._list_adapter.validate_json(data))
+        return [next(decoded) if row is _PENDING else row for row in rows]
+
+    # --- Escrita ---
+
+    def _mark_written(self, new_epoch: bool):
+        if self.process_lock is not None:
+            self._version = self.process_lock.bump_version(self.version_slot, new_epoch)
+
+    def _apply_in_memory(self, view: _View, rows: List[M], deleted: List[int]):
+        for row in rows:
+            pk = getattr(row, self.key)
+            if self._undo is not None:
+                self._undo.append((pk, view.entries.get(pk), self._overlay.get(pk)))
+            self._overlay[pk] = row
+            self._index(view, pk, _IN_MEMORY, getattr(row, self.group) if self.group else None)
+        for pk in deleted:
+            if self._undo is not None:
+                self._undo.append((pk, view.entries.get(pk), self._overlay.get(pk)))
+            self._unindex(view, pk)
+
+    def _write(self, rows: List[M], deleted: List[int]):
+        view = self._view
+        if self.mode == "memory":
+            self._apply_in_memory(view, rows, deleted)
+            return
+        if self._batch_depth > 0:
+            if not self._dirty and self.process_lock is not None:
+                # Como na JsonTable: até o flush, só este processo grava
+                self.process_lock.hold()
+            self._dirty = True
+            self._pending.extend([{"op": "update", "row": row.model_dump()} for row in rows]
+                                 + [{"op": "delete", "key": pk} for pk in deleted])
+            self._apply_in_memory(view, rows, deleted)
+            return
+        self._append(view, rows, deleted)
+
+    def _append(self, view: _View, rows: List[M], deleted: List[int]):
+        stats.count("save:" + os.path.basename(self.path))
+        dumps = self._dump_adapter.dump_json
+        with stats.timed("serialize"):
+            data = b"".join([dumps(row) + b"\n" for row in rows]
+                            + [self.serializer.dumps({DELETE: pk}) + b"\n" for pk in deleted])
+        append_lines(self.path, data, self.durability)
+        # As linhas novas são indexadas como as de qualquer outro processo
+        self._scan(view, self._end)
+        self._signature = file_signature(self.path)
+        self._mark_written(new_epoch=False)
+
+    def _keep_last_key(self, pk: int):
+        """Antes de remover a chave `pk`: grava a maior chave já usada (ver JsonTable._keep_last_key)."""
+        if self.mode != "memory" and pk > self._last_key:
+            self._last_key = write_last_key(self.path, max(pk, self._max_key), self.durability)
+
+    def _cross_process(self):
+        return self.process_lock if self.process_lock is not None else nullcontext()
+
+    # --- API pública ---
+
+    def rows(self) -> List[M]:
+        """Decodifica todos os registros (evite em tabelas grandes)."""
+        view = self._ensure_fresh()
+        return self._decode_many(view, list(view.entries))
+
+    def get(self, key: int) -> Optional[M]:
+        view = self._ensure_fresh()
+        entry = view.entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] == _IN_MEMORY:
+            return self._overlay.get(key)
+        line = view.line(entry[0])
+        stats.read(len(line))
+        with stats.timed("validate"):
+            return self._row_adapter.validate_json(line)
+
+    def get_many(self, keys: Iterable[int]) -> List[M]:
+        view = self._ensure_fresh()
+        return self._decode_many(view, list(keys))
+
+    def find_by(self, index: str, value: Hashable) -> List[M]:
+        if index != self.group:
+            raise KeyError(index)
+        view = self._ensure_fresh()
+        return self._decode_many(view, list(view.groups.get(value, ())))
+
+    def columns(self) -> None:
+        """Sem cópia colunar: os registros não ficam em memória."""
+        return None
+
+    def next_key(self) -> int:
+        with self._cross_process(), self._lock:
+            self._refresh()
+            key = max(self._max_key + 1, self._next_key)
+            if self.process_lock is not None:
+                key = self.process_lock.allocate_key(self.version_slot, key)
+            self._next_key = key + 1
+            return key
+
+    def insert(self, row: M) -> M:
+        with self._lock:
+            self._refresh()
+            key = getattr(row, self.key)
+            if key in self._view.entries:
+                raise ValueError(f"Chave duplicada em {self.path}: {key}")
+            self._write([row], [])
+            return row
+
+    def replace(self, row: M) -> M:
+        with self._lock:
+            self._refresh()
+            key = getattr(row, self.key)
+            if key not in self._view.entries:
+                raise KeyError(key)
+            self._write([row], [])
+            return row
+
+    def delete(self, key: int) -> Optional[M]:
+        with self._lock:
+            self._refresh()
+            removed = self.get(key)
+            if removed is not None:
+                self._keep_last_key(key)
+                self._write([], [key])
+            return removed
+
+    def delete_many(self, keys: List[int]) -> List[M]:
+        """Remove vários registros com uma única escrita no arquivo."""
+        with self._lock:
+            self._refresh()
+            removed = self._decode_many(self._view, keys)
+            if removed:
+                deleted = [getattr(row, self.key) for row in removed]
+                self._keep_last_key(max(deleted))
+                self._write([], deleted)
+            return removed
+
+    def _clean(self):
+        if self._dirty and self.process_lock is not None:
+            self.process_lock.release_hold()
+        self._dirty = False
+        self._pending = []
+
+    def flush(self) -> bool:
+        """Anexa os registros alterados no lote; retorna False se não havia nada pendente."""
+        with self._cross_process(), self._lock:
+            if not self._dirty or self._undo is not None:
+                # Numa transação, as pendências só são gravadas depois do commit
+                return False
+            view = self._view
+            touched = dict.fromkeys(record.get("key", record.get("row", {}).get(self.key))
+                                    for record in self._pending)
+            rows = [self._overlay[pk] for pk in touched if pk in self._overlay]
+            deleted = [pk for pk in touched if pk not in self._overlay]
+            for row in rows:
+                # As linhas anexadas tomam o lugar das entradas em memória
+                pk = getattr(row, self.key)
+                group = view.entries.pop(pk)[1]
+                if group is not None:
+                    self._ungroup(view, pk, group)
+                del self._overlay[pk]
+            self._append(view, rows, deleted)
+            self._clean()
+            return True
+
+    def begin_batch(self):
+        """Guarda as escritas em memória até o end_batch() correspondente."""
+        with self._lock:
+            self._batch_depth += 1
+
+    def end_batch(self, flush: bool = True):
+        """Com `flush`=False, as pendências ficam para quem chama (UnitOfWork.flush)."""
+        with self._lock:
+            self._batch_depth -= 1
+            done = self._batch_depth == 0
+        if done and flush:
+            self.flush()
+
+    @property
+    def deferred(self) -> bool:
+        """As gravações estão sendo adiadas (lote ou transação)."""
+        return self._batch_depth > 0
+
+    def begin_transaction(self):
+        """Abre uma transação (ver JsonTable.begin_transaction)."""
+        with self._lock:
+            self._batch_depth += 1
+            self._undo = []
+            self._undo_state = (self._dirty, len(self._pending), self._dead_bytes, self._dead_records)
+
+    def commit_transaction(self):
+        with self._lock:
+            self._undo = None
+            self.end_batch(flush=False)
+
+    def rollback_transaction(self):
+        """Restaura as entradas do índice e de _overlay anteriores à transação."""
+        with self._lock:
+            view = self._view
+            for pk, entry, row in reversed(self._undo or ()):
+                current = view.entries.pop(pk, None)
+                if current is not None and current[1] is not None:
+                    self._ungroup(view, pk, current[1])
+                self._overlay.pop(pk, None)
+                if entry is not None:
+                    view.entries[pk] = entry
+                    if entry[1] is not None:
+                        view.groups.setdefault(entry[1], {})[pk] = None
+                if row is not None:
+                    self._overlay[pk] = row
+            self._undo = None
+            was_dirty, pending, self._dead_bytes, self._dead_records = self._undo_state
+            del self._pending[pending:]
+            if not was_dirty:
+                self._clean()
+            self.end_batch(flush=False)
+
+    def pending_records(self) -> Dict[str, List[LogRecord]]:
+        """Mutações do lote ainda não anexadas (journal da UnitOfWork)."""
+        with self._lock:
+            return {self.path: list(self._pending)} if self._dirty else {}
+
+    def apply_records(self, records: List[LogRecord]):
+        """Reaplica e anexa registros de um journal (commit interrompido); idempotente."""
+        with self._cross_process(), self._lock:
+            self._refresh()
+            rows = [self._row_adapter.validate_python(record["row"]) for record in records if "row" in record]
+            deleted = [record["key"] for record in records if record["op"] == "delete"]
+            if self.mode == "memory":
+                self._apply_in_memory(self._view, rows, deleted)
+            else:
+                self._append(self._view, rows, deleted)
+
+    def save(self, rows: List[M]):
+        """Grava a tabela inteira (arquivo novo, sem lixo), mesmo num lote."""
+        with self._lock:
+            self._clean()
+            if self.mode == "memory":
+                self._view = _View(self.path)
+                self._overlay = {}
+                self._write(rows, [])
+            else:
+                if self._max_key > max((getattr(row, self.key) for row in rows), default=0):
+                    # Saíram os registros com as maiores chaves
+                    self._keep_last_key(self._max_key)
+                dumps = self._dump_adapter.dump_json
+                atomic_write_chunks(self.path, (dumps(row) + b"\n" for row in rows), self.durability)
+                self._view = self._open_view()
+                self._signature = file_signature(self.path)
+                self._mark_written(new_epoch=True)
+            self._loaded = True
+            if self._undo is not None:
+                # Já gravado: um rollback só desfaz o que vier depois
+                self._undo = []
+                self._undo_state = (False, 0, 0, 0)
+
+    def log_stats(self) -> Tuple[int, int]:
+        """Bytes e linhas mortos (substituídos ou removidos), para o Checkpointer."""
+        with self._lock:
+            self._refresh()
+            return self._dead_bytes, self._dead_records
+
+    def _live_lines(self, view: _View, entries: Entries,
+                    groups: Dict[Hashable, Dict[int, None]]) -> Iterator[bytes]:
+        offset = 0
+        for pk, (old_offset, group) in view.entries.items():
+            line = view.line(old_offset) + b"\n"
+            entries[pk] = (offset, group)
+            if group is not None:
+                groups.setdefault(group, {})[pk] = None
+            offset += len(line)
+            yield line
+
+    def checkpoint(self) -> bool:
+        """
+        Compacta o arquivo: regrava só as linhas vivas, na ordem do índice,
+        e publica o índice novo. Retorna False se não havia lixo.
+        """
+        if self._batch_depth == 0:
+            # Dentro de um lote, as pendências só são gravadas no end_batch()
+            if self.unit_of_work is not None:
+                # Commit atômico com as outras tabelas, depois da transação em andamento
+                self.unit_of_work.flush()
+            else:
+                self.flush()
+        with self._cross_process(), self._lock:
+            self._refresh()
+            if self.mode == "memory" or self._dead_records == 0:
+                return False
+            if self._dirty or self._undo is not None:
+                # Uma transação ou lote aberto: as linhas em _overlay ainda não
+                # estão no arquivo. Fica para o próximo checkpoint.
+                return False
+            view = self._view
+            entries: Entries = {}
+            groups: Dict[Hashable, Dict[int, None]] = {}
+            atomic_write_chunks(self.path, self._live_lines(view, entries, groups), self.durability)
+            self._view = _View(self.path, entries, groups)
+            self._end = self._view.signature()[2]
+            self._dead_bytes = self._dead_records = 0
+            self._signature = file_signature(self.path)
+            self._mark_written(new_epoch=True)
+            return True
+
+    def save_cache(self) -> bool:
+        """Grava o índice em <arquivo>.idx, se ele ainda não corresponde ao arquivo."""
+        if self.mode == "memory":
+            return False
+        with self._cross_process(), self._lock:
+            self._refresh()
+            view = self._view
+            source = view.signature()
+            if self._dirty or source is None or source != self._signature or source == self._index_source:
+                return False
+            keys = list(view.entries)
+            offsets = [entry[0] for entry in view.entries.values()]
+            groups = [entry[1] for entry in view.entries.values()]
+            header = (INDEX_FORMAT, self.key, self.group, source)
+            atomic_write_bytes(index_path(self.path),
+                               marshal.dumps((header, self._end, self._dead_bytes, self._dead_records,
+                                              keys, offsets, groups)))
+            self._index_source = source
+            return True
+
+    def verify_files(self) -> List[str]:
+        """Valida por completo cada registro vivo do arquivo."""
+        view = self._ensure_fresh()
+        problems = []
+        for pk, (offset, _) in list(view.entries.items()):
+            if offset == _IN_MEMORY:
+                continue
+            try:
+                self.model.model_validate_json(view.line(offset))
+            except ValidationError as exc:
+                errors = "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors())
+                problems.append(f"{self.path} ({self.key}={pk}): {errors}")
+        return problems
+
+    def files(self) -> List[str]:
+        """Arquivos desta tabela que existem no disco (linhas, índice e chaves)."""
+        return [path for path in (self.path, index_path(self.path), keys_path(self.path)) if os.path.exists(path)]
+
+    def invalidate(self):
+        """Descarta o índice; a próxima leitura volta ao arquivo."""
+        with self._lock:
+            self._loaded = False
@@ -0,0 +1,45 @@
+"""
+Serialização JSON plugável do log de escrita: registros do <tabela>.log,
+do journal da UnitOfWork e das linhas do NDJSON. As respostas da API não
+passam por aqui.
+
+- "orjson": biblioteca orjson (opcional, bem mais rápida que a padrão)
+- "json": biblioteca padrão do Python
+- "auto": orjson se estiver instalada, senão json
+
+Listas de modelos (snapshots) não passam por aqui: são lidas e escritas
+direto pelo pydantic-core (TypeAdapter), que dispensa o model_dump().
+"""
+import json
+from typing import Any, Callable, NamedTuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class Serializer(NamedTuple):
+    name: str
+    dumps: Callable[[Any], bytes]  # JSON compacto, em UTF-8
+    loads: Callable[[bytes], Any]  # erros de parse são ValueError
+
+
+def _json_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+JSON = Serializer("json", _json_dumps, json.loads)
+ORJSON = Serializer("orjson", orjson.dumps, orjson.loads) if orjson is not None else None
+
+
+def get_serializer(name: str = "auto") -> Serializer:
+    if name == "auto":
+        return ORJSON or JSON
+    if name == "json":
+        return JSON
+    if name == "orjson":
+        if ORJSON is None:
+            raise RuntimeError("orjson não está instalado (pip install orjson)")
+        return ORJSON
+    raise ValueError(f"Serializador JSON inválido: {name}")
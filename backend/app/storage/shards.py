@@ -0,0 +1,553 @@
+import json
+import os
+import threading
+from contextlib import nullcontext
+from typing import Any, Dict, Generic, Hashable, Iterable, List, Optional, Set, Tuple, Type
+
+from .cache import cache_path
+from .files import FsyncPolicy, atomic_write_bytes
+from .locks import ProcessLock, TableVersion
+from .log import LogRecord
+from .serializer import JSON, Serializer
+from .table import JsonTable, M, file_signature
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_FORMAT = 1
+
+
+def shards_directory(path: str) -> str:
+    """Diretório dos shards de uma tabela (items.json → items.shards)."""
+    return os.path.splitext(path)[0] + ".shards"
+
+
+class ShardedTable(Generic[M]):
+    """
+    Tabela dividida em um arquivo por valor do campo `shard_by` (ex.: um
+    por coleção): <diretório>/<valor>.json, cada um uma JsonTable com os
+    mesmos modos de gravação (snapshot, log, memory). <diretório>/manifest.json
+    lista os shards, a posição de cada um no arquivo de lock e a maior chave
+    já usada (`last_key`, gravada ao remover o registro com a maior chave;
+    ver keys.py).
+
+    - Uma mutação grava só o shard do registro: no modo "snapshot" o custo
+      de cada escrita é proporcional ao tamanho do shard, não da tabela
+    - find_by(shard_by, valor) devolve um shard inteiro, sem índice extra
+    - Um shard que fica vazio (ex.: remoção em cascata com delete_many())
+      é apagado do disco e do manifesto, sem regravar nada; com gravações
+      adiadas (lote, transação, write-behind), isso fica para o flush()
+    - Em memória ficam os shards e o índice chave → shard (get() em O(1))
+
+    Entre processos, cada shard tem a sua versão no `process_lock`
+    (posições a partir de `first_shard_slot`) e a tabela tem a versão
+    `version_slot`, incrementada a cada gravação de qualquer shard: uma
+    leitura confere só essa versão e, quando ela muda, só os shards
+    alterados são relidos e reindexados.
+    """
+
+    def __init__(self, directory: str, model: Type[M], shard_by: str, key: str = "id",
+                 mode: str = "snapshot", write_behind_seconds: float = 0.0,
+                 durability: Optional[FsyncPolicy] = None,
+                 process_lock: Optional[ProcessLock] = None, version_slot: int = 0, first_shard_slot: int = 0,
+                 verify: bool = False, serializer: Serializer = JSON, pretty: bool = True,
+                 binary_cache: bool = False):
+        if mode not in ("snapshot", "log", "memory"):
+            raise ValueError(f"Modo de armazenamento inválido: {mode}")
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST_FILE)
+        self.model = model
+        self.shard_by = shard_by
+        self.key = key
+        self.mode = mode
+        self.durability = durability
+        self.serializer = serializer
+        self.process_lock = process_lock
+        self.version_slot = version_slot
+        self.first_shard_slot = first_shard_slot
+        self.write_behind_seconds = write_behind_seconds
+        self._shard_options = dict(
+            mode=mode, write_behind_seconds=write_behind_seconds, durability=durability,
+            process_lock=process_lock, verify=verify, serializer=serializer, pretty=pretty,
+            binary_cache=binary_cache,
+        )
+        self._shards: Dict[Hashable, JsonTable[M]] = {}
+        self._slots: Dict[Hashable, int] = {}
+        # Estado dos arquivos de cada shard na última reindexação
+        self._stamps: Dict[Hashable, Any] = {}
+        self._shard_keys: Dict[Hashable, Set[int]] = {}
+        self._key_shard: Dict[int, Hashable] = {}
+        self._version: Optional[TableVersion] = None
+        self._manifest_signature = None
+        self._loaded = False
+        self._max_key = 0
+        self._next_key = 1
+        # Maior chave gravada no manifesto
+        self._last_key = 0
+        # Só protege escritas e recargas; leituras usam _ensure_fresh()
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        # Transação aberta: shards criados e alterados desde begin_transaction()
+        self._created: Optional[Set[Hashable]] = None
+        self._touched: Set[Hashable] = set()
+        self._unit_of_work: Optional[Any] = None
+
+    @property
+    def unit_of_work(self) -> Optional[Any]:
+        return self._unit_of_work
+
+    @unit_of_work.setter
+    def unit_of_work(self, unit: Optional[Any]):
+        """A UnitOfWork também grava os shards quando o write-behind de um deles vence."""
+        self._unit_of_work = unit
+        for shard in self._shards.values():
+            shard.unit_of_work = unit
+
+    @property
+    def deferred(self) -> bool:
+        """As gravações estão sendo adiadas (lote, transação ou write-behind)."""
+        return self._batch_depth > 0 or self.write_behind_seconds > 0
+
+    # --- Manifesto e shards ---
+
+    def _shard_path(self, group: Hashable) -> str:
+        return os.path.join(self.directory, f"{group}.json")
+
+    def _read_manifest(self) -> Tuple[List[Tuple[Hashable, int]], int]:
+        """Shards (grupo, posição no lock) e a maior chave já usada."""
+        try:
+            with open(self.path, "rb") as f:
+                data = json.loads(f.read())
+        except FileNotFoundError:
+            return [], 0
+        return [(entry["group"], entry["slot"]) for entry in data["shards"]], data.get("last_key", 0)
+
+    def _write_manifest(self):
+        if self.mode == "memory":
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        data = {
+            "format": MANIFEST_FORMAT,
+            "shard_by": self.shard_by,
+            "shards": [{"group": group, "slot": slot} for group, slot in self._slots.items()],
+            "last_key": self._last_key,
+        }
+        atomic_write_bytes(self.path, json.dumps(data, indent=2).encode(), self.durability)
+        self._manifest_signature = file_signature(self.path)
+        self._publish()
+
+    def _publish(self):
+        """Publica uma gravação (de um shard ou do manifesto) aos demais processos."""
+        if self.process_lock is None:
+            return
+        current = self.process_lock.read_version(self.version_slot)
+        version = self.process_lock.bump_version(self.version_slot, new_epoch=False)
+        # Se outro processo gravou desde a última leitura, a próxima leitura
+        # ainda precisa conferir os shards
+        self._version = version if current == self._version else None
+
+    def _free_slot(self) -> int:
+        used = set(self._slots.values())
+        slot = self.first_shard_slot
+        while slot in used:
+            slot += 1
+        return slot
+
+    def _open_shard(self, group: Hashable, slot: int) -> JsonTable[M]:
+        shard = JsonTable(self._shard_path(group), self.model, key=self.key, version_slot=slot,
+                          on_written=self._publish, keep_last_key=False, **self._shard_options)
+        shard.unit_of_work = self._unit_of_work
+        in_transaction = self._created is not None
+        for _ in range(self._batch_depth - in_transaction):
+            shard.begin_batch()
+        if in_transaction:
+            shard.begin_transaction()
+            self._created.add(group)
+        self._shards[group] = shard
+        self._slots[group] = slot
+        return shard
+
+    def _create_shard(self, group: Hashable) -> JsonTable[M]:
+        shard = self._open_shard(group, self._free_slot())
+        if self.mode == "memory":
+            shard.save([])
+        else:
+            # Sobras de um shard apagado por um processo interrompido
+            self._remove_files(shard)
+        self._shard_keys[group] = set()
+        self._stamps[group] = self._stamp(shard)
+        self._write_manifest()
+        return shard
+
+    @staticmethod
+    def _remove_files(shard: JsonTable[M]):
+        for path in (shard.path, shard.log_path, cache_path(shard.path)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _forget(self, group: Hashable) -> JsonTable[M]:
+        """Tira um shard da memória (e do índice chave → shard)."""
+        shard = self._shards.pop(group)
+        del self._slots[group]
+        self._stamps.pop(group, None)
+        for pk in self._shard_keys.pop(group, ()):
+            if self._key_shard.get(pk) == group:
+                del self._key_shard[pk]
+        return shard
+
+    def _discard(self, group: Hashable):
+        """Apaga um shard inteiro; o manifesto fica para quem chama."""
+        shard = self._forget(group)
+        if self.mode != "memory":
+            # Gravações adiadas do shard liberam o lock entre processos
+            shard.flush()
+            self._remove_files(shard)
+
+    # --- Leitura ---
+
+    def _stamp(self, shard: JsonTable[M]) -> Any:
+        version = None if self.process_lock is None else self.process_lock.read_version(shard.version_slot)
+        return version, file_signature(shard.path), file_signature(shard.log_path)
+
+    def _reindex(self, group: Hashable):
+        """Atualiza o índice chave → shard com as chaves atuais do shard."""
+        shard = self._shards[group]
+        # Lido antes das chaves: uma gravação no meio força nova reindexação
+        stamp = self._stamp(shard)
+        keys = set(shard.keys())
+        for pk in self._shard_keys.get(group, set()) - keys:
+            if self._key_shard.get(pk) == group:
+                del self._key_shard[pk]
+        for pk in keys:
+            self._key_shard[pk] = group
+        self._shard_keys[group] = keys
+        self._stamps[group] = stamp
+        self._max_key = max(self._max_key, max(keys, default=0))
+
+    def _load_manifest(self):
+        entries, self._last_key = self._read_manifest()
+        self._max_key = max(self._max_key, self._last_key)
+        slots = dict(entries)
+        for group in [group for group, slot in self._slots.items() if slots.get(group) != slot]:
+            self._forget(group)
+        for group, slot in entries:
+            if group not in self._shards:
+                self._open_shard(group, slot)
+
+    def _read_version(self) -> Optional[TableVersion]:
+        if self.process_lock is None:
+            return None
+        return self.process_lock.read_version(self.version_slot)
+
+    def _refresh(self):
+        """Relê o manifesto e reindexa os shards alterados desde a última leitura."""
+        if self.mode == "memory" and self._loaded:
+            return
+        version = self._read_version()
+        manifest_signature = file_signature(self.path)
+        if (self._loaded and version is not None and version == self._version
+                and manifest_signature == self._manifest_signature):
+            return
+        self._load_manifest()
+        for group, shard in list(self._shards.items()):
+            if self._stamps.get(group) != self._stamp(shard):
+                self._reindex(group)
+        self._version = version
+        self._manifest_signature = manifest_signature
+        self._loaded = True
+
+    def _ensure_fresh(self):
+        """Caminho de leitura: com a versão da tabela em dia, segue sem pegar o lock."""
+        if self._loaded and (self.mode == "memory" or (
+                self._version is not None and self._read_version() == self._version)):
+            return
+        with self._lock:
+            self._refresh()
+
+    def _cross_process(self):
+        """Lock entre processos (sempre adquirido antes do lock da tabela)."""
+        return self.process_lock if self.process_lock is not None else nullcontext()
+
+    # --- Escrita ---
+
+    def _written(self, group: Hashable):
+        self._stamps[group] = self._stamp(self._shards[group])
+        if self._created is not None:
+            self._touched.add(group)
+
+    def _add_key(self, group: Hashable, pk: int):
+        self._shard_keys[group].add(pk)
+        self._key_shard[pk] = group
+        if pk > self._max_key:
+            self._max_key = pk
+
+    def _keep_last_key(self, pk: int):
+        """Antes de remover a chave `pk`: grava no manifesto a maior chave já usada."""
+        if self.mode != "memory" and pk > self._last_key:
+            self._last_key = max(pk, self._max_key)
+            self._write_manifest()
+
+    def _remove(self, group: Hashable, keys: List[int]) -> List[M]:
+        shard = self._shards[group]
+        self._keep_last_key(max(keys))
+        if not self.deferred and self._shard_keys[group] <= set(keys):
+            # O shard inteiro sai: apaga o arquivo em vez de regravá-lo vazio
+            removed = shard.get_many(keys)
+            self._discard(group)
+            self._write_manifest()
+            return removed
+        removed = shard.delete_many(keys)
+        for row in removed:
+            pk = getattr(row, self.key)
+            self._shard_keys[group].discard(pk)
+            self._key_shard.pop(pk, None)
+        self._written(group)
+        return removed
+
+    # --- API pública (a mesma de JsonTable) ---
+
+    def rows(self) -> List[M]:
+        """Registros de todos os shards, na ordem do manifesto."""
+        self._ensure_fresh()
+        return [row for shard in list(self._shards.values()) for row in shard.rows()]
+
+    def get(self, key: int) -> Optional[M]:
+        self._ensure_fresh()
+        shard = self._shards.get(self._key_shard.get(key))
+        return None if shard is None else shard.get(key)
+
+    def get_many(self, keys: Iterable[int]) -> List[M]:
+        """Registros das chaves dadas, na mesma ordem (chaves inexistentes são ignoradas)."""
+        rows = (self.get(key) for key in keys)
+        return [row for row in rows if row is not None]
+
+    def columns(self) -> None:
+        """Sem cópia colunar: as consultas usam find_by() por shard."""
+        return None
+
+    def find_by(self, index: str, value: Hashable) -> List[M]:
+        """Registros de um valor de `shard_by` (o único índice de múltiplos valores)."""
+        if index != self.shard_by:
+            raise KeyError(index)
+        self._ensure_fresh()
+        shard = self._shards.get(value)
+        return [] if shard is None else shard.rows()
+
+    def next_key(self) -> int:
+        """Reserva a próxima chave primária, comum a todos os shards (ver JsonTable.next_key)."""
+        with self._cross_process(), self._lock:
+            self._refresh()
+            key = max(self._max_key + 1, self._next_key)
+            if self.process_lock is not None:
+                key = self.process_lock.allocate_key(self.version_slot, key)
+            self._next_key = key + 1
+            return key
+
+    def insert(self, row: M) -> M:
+        with self._cross_process(), self._lock:
+            self._refresh()
+            pk = getattr(row, self.key)
+            if pk in self._key_shard:
+                raise ValueError(f"Chave duplicada em {self.directory}: {pk}")
+            group = getattr(row, self.shard_by)
+            shard = self._shards.get(group)
+            if shard is None:
+                shard = self._create_shard(group)
+            shard.insert(row)
+            self._add_key(group, pk)
+            self._written(group)
+            return row
+
+    def replace(self, row: M) -> M:
+        """Substitui o registro de mesma chave; se `shard_by` mudou, ele passa de shard."""
+        with self._cross_process(), self._lock:
+            self._refresh()
+            pk = getattr(row, self.key)
+            old_group = self._key_shard.get(pk)
+            if old_group is None:
+                raise KeyError(pk)
+            if getattr(row, self.shard_by) != old_group:
+                self._remove(old_group, [pk])
+                return self.insert(row)
+            self._shards[old_group].replace(row)
+            self._written(old_group)
+            return row
+
+    def delete(self, key: int) -> Optional[M]:
+        """Remove o registro e o retorna (None se não existia)."""
+        removed = self.delete_many([key])
+        return removed[0] if removed else None
+
+    def delete_many(self, keys: List[int]) -> List[M]:
+        """Remove vários registros com uma gravação por shard afetado."""
+        with self._cross_process(), self._lock:
+            self._refresh()
+            by_group: Dict[Hashable, List[int]] = {}
+            for pk in keys:
+                group = self._key_shard.get(pk)
+                if group is not None:
+                    by_group.setdefault(group, []).append(pk)
+            removed = []
+            for group, group_keys in by_group.items():
+                removed.extend(self._remove(group, group_keys))
+            return removed
+
+    def flush(self) -> bool:
+        """
+        Grava as mutações adiadas de todos os shards e apaga os que ficaram
+        vazios; False se não havia nada pendente.
+        """
+        with self._cross_process():
+            results = [shard.flush() for shard in list(self._shards.values())]
+            with self._lock:
+                empty = [group for group, keys in self._shard_keys.items() if not keys]
+                if self._batch_depth == 0 and empty:
+                    for group in empty:
+                        self._discard(group)
+                    self._write_manifest()
+        return any(results)
+
+    def begin_batch(self):
+        """Adia as gravações de todos os shards (inclusive os criados no bloco) até end_batch()."""
+        with self._lock:
+            self._batch_depth += 1
+            for shard in self._shards.values():
+                shard.begin_batch()
+
+    def end_batch(self, flush: bool = True):
+        """Com `flush`=False, as pendências ficam para quem chama (UnitOfWork.flush)."""
+        with self._lock:
+            self._batch_depth -= 1
+            done = self._batch_depth == 0
+            for shard in self._shards.values():
+                shard.end_batch(flush=False)
+        # Fora do lock da tabela: o flush pega o lock entre processos
+        if done and flush:
+            self.flush()
+
+    def begin_transaction(self):
+        """Abre uma transação em todos os shards, inclusive nos criados durante ela."""
+        with self._lock:
+            self._batch_depth += 1
+            self._created = set()
+            self._touched = set()
+            for shard in self._shards.values():
+                shard.begin_transaction()
+
+    def commit_transaction(self):
+        with self._lock:
+            self._batch_depth -= 1
+            self._created = None
+            for shard in self._shards.values():
+                shard.commit_transaction()
+
+    def rollback_transaction(self):
+        """Desfaz as mutações nos shards e devolve o índice chave → shard ao estado anterior."""
+        with self._lock:
+            self._batch_depth -= 1
+            created, self._created = self._created or set(), None
+            for shard in self._shards.values():
+                shard.rollback_transaction()
+            for group in self._touched:
+                if group in created:
+                    self._discard(group)
+                elif group in self._shards:
+                    self._reindex(group)
+            if created:
+                self._write_manifest()
+
+    def pending_records(self) -> Dict[str, List[LogRecord]]:
+        """Mutações adiadas de cada shard, por arquivo (journal da UnitOfWork)."""
+        pending: Dict[str, List[LogRecord]] = {}
+        for shard in list(self._shards.values()):
+            pending.update(shard.pending_records())
+        return pending
+
+    def apply_records(self, records: List[LogRecord]):
+        """Reaplica registros de um journal, distribuindo-os pelos shards; idempotente."""
+        with self._cross_process(), self._lock:
+            self.begin_batch()
+            try:
+                for record in records:
+                    if record["op"] == "delete":
+                        self.delete(record["key"])
+                        continue
+                    row = self.model.model_validate(record["row"])
+                    if getattr(row, self.key) in self._key_shard:
+                        self.replace(row)
+                    else:
+                        self.insert(row)
+            finally:
+                self.end_batch()
+
+    def save(self, rows: List[M]):
+        """Grava a tabela inteira: um snapshot por shard, apagando os shards que sobraram."""
+        groups: Dict[Hashable, List[M]] = {}
+        for row in rows:
+            groups.setdefault(getattr(row, self.shard_by), []).append(row)
+        with self._cross_process(), self._lock:
+            self._refresh()
+            if self.mode != "memory":
+                os.makedirs(self.directory, exist_ok=True)
+            if self._max_key > max((getattr(row, self.key) for row in rows), default=0):
+                # Saíram os registros com as maiores chaves
+                self._keep_last_key(self._max_key)
+            for group in [group for group in self._shards if group not in groups]:
+                self._discard(group)
+            for group, group_rows in groups.items():
+                shard = self._shards.get(group)
+                if shard is None:
+                    shard = self._open_shard(group, self._free_slot())
+                shard.save(group_rows)
+                self._reindex(group)
+            self._write_manifest()
+            self._loaded = True
+
+    def log_stats(self) -> Tuple[int, int]:
+        """Soma do tamanho e da quantidade de registros dos logs dos shards."""
+        with self._lock:
+            self._refresh()
+            shards = list(self._shards.values())
+        stats = [shard.log_stats() for shard in shards]
+        return sum(size for size, _ in stats), sum(records for _, records in stats)
+
+    def checkpoint(self) -> bool:
+        """Consolida o log de cada shard (ver JsonTable.checkpoint)."""
+        with self._lock:
+            self._refresh()
+            shards = list(self._shards.values())
+        results = [shard.checkpoint() for shard in shards]
+        return any(results)
+
+    def save_cache(self) -> bool:
+        with self._lock:
+            self._refresh()
+            shards = list(self._shards.values())
+        results = [shard.save_cache() for shard in shards]
+        return any(results)
+
+    def verify_files(self) -> List[str]:
+        """Verificação de integridade do manifesto e de todos os shards."""
+        try:
+            entries, _ = self._read_manifest()
+        except (ValueError, KeyError, TypeError) as exc:
+            return [f"{self.path}: manifesto inválido ({exc!r})"]
+        problems = []
+        for group, slot in entries:
+            shard = JsonTable(self._shard_path(group), self.model, key=self.key, serializer=self.serializer)
+            problems.extend(shard.verify_files())
+        return problems
+
+    def files(self) -> List[str]:
+        """Arquivos do diretório dos shards (manifesto, shards, logs e caches)."""
+        try:
+            names = sorted(os.listdir(self.directory))
+        except FileNotFoundError:
+            return []
+        return [os.path.join(self.directory, name) for name in names]
+
+    def invalidate(self):
+        """Descarta o cache; a próxima leitura volta aos arquivos."""
+        with self._lock:
+            for shard in self._shards.values():
+                shard.invalidate()
+            self._stamps.clear()
+            self._loaded = False
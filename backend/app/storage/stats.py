@@ -0,0 +1,164 @@
+"""
+Instrumentação da camada de armazenamento: quantas vezes cada operação
+rodou, arquivos e bytes lidos e gravados, e o tempo gasto em cada fase:
+
+- "parse": decodificação de JSON/NDJSON (log, linhas do índice, journal)
+  e dos caches binários
+- "validate": montagem dos modelos Pydantic. Nos snapshots JSON e nas
+  linhas NDJSON o pydantic-core faz parse e validação numa passada só, e
+  o tempo todo conta aqui
+- "serialize": codificação de snapshots, linhas e registros do log
+- "fsync": fsync de arquivos e diretórios
+
+As medições vão para o StorageStats do contexto atual: o da requisição em
+andamento (request_stats()) ou, fora de requisições (carga na partida,
+write-behind, checkpoint, fsync periódico), direto para o acumulado do
+processo (totals()). Cada requisição soma o seu StorageStats ao acumulado
+quando termina.
+
+Também conta, por processo, os acertos e faltas de cada cache (cópia em
+memória das tabelas, cache binário, índice do NDJSON, sessão da
+requisição): cache_lookup() e caches().
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+PHASES = ("parse", "validate", "serialize", "fsync")
+
+
+class StorageStats:
+    """Contadores de uma requisição (ou do processo inteiro)."""
+
+    __slots__ = ("calls", "files_read", "files_written", "bytes_read", "bytes_written", "seconds")
+
+    def __init__(self):
+        self.calls: Dict[str, int] = {}
+        self.files_read = 0
+        self.files_written = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.seconds: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+
+    def merge(self, other: "StorageStats"):
+        for name, count in other.calls.items():
+            self.calls[name] = self.calls.get(name, 0) + count
+        self.files_read += other.files_read
+        self.files_written += other.files_written
+        self.bytes_read += other.bytes_read
+        self.bytes_written += other.bytes_written
+        for phase, seconds in other.seconds.items():
+            self.seconds[phase] += seconds
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": dict(sorted(self.calls.items())),
+            "files_read": self.files_read,
+            "files_written": self.files_written,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "ms": {phase: round(seconds * 1000, 3) for phase, seconds in self.seconds.items()},
+        }
+
+    def header(self) -> str:
+        """Resumo numa linha, para o cabeçalho de depuração das respostas."""
+        parts = [f"{name}={count}" for name, count in sorted(self.calls.items())]
+        parts += [f"files_read={self.files_read}", f"files_written={self.files_written}",
+                  f"bytes_read={self.bytes_read}", f"bytes_written={self.bytes_written}"]
+        parts += [f"{phase}_ms={seconds * 1000:.3f}" for phase, seconds in self.seconds.items()]
+        return ", ".join(parts)
+
+
+_current: ContextVar[Optional[StorageStats]] = ContextVar("storage_stats", default=None)
+_totals = StorageStats()
+_requests = 0
+# Protege o acumulado (requisições terminando e threads de segundo plano)
+_lock = threading.Lock()
+# Nome do cache → [acertos, faltas]
+_caches: Dict[str, List[int]] = {}
+_caches_lock = threading.Lock()
+
+
+@contextmanager
+def _recording() -> Iterator[StorageStats]:
+    stats = _current.get()
+    if stats is not None:
+        yield stats
+        return
+    with _lock:
+        yield _totals
+
+
+def count(name: str):
+    """Conta uma chamada da operação `name` (ex.: "load_items")."""
+    with _recording() as stats:
+        stats.calls[name] = stats.calls.get(name, 0) + 1
+
+
+def read(size: int):
+    """Registra a leitura de um arquivo (ou trecho) de `size` bytes."""
+    with _recording() as stats:
+        stats.files_read += 1
+        stats.bytes_read += size
+
+
+def written(size: int):
+    """Registra a gravação de um arquivo (ou trecho anexado) de `size` bytes."""
+    with _recording() as stats:
+        stats.files_written += 1
+        stats.bytes_written += size
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """Soma ao `phase` o tempo gasto dentro do bloco (mesmo se ele falhar)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _recording() as stats:
+            stats.seconds[phase] += elapsed
+
+
+def current() -> Optional[StorageStats]:
+    """StorageStats da requisição em andamento (None fora de requisições)."""
+    return _current.get()
+
+
+@contextmanager
+def request_stats() -> Iterator[StorageStats]:
+    """Mede tudo o que roda no contexto atual (uma requisição) e soma ao acumulado no fim."""
+    global _requests
+    stats = StorageStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+        with _lock:
+            _totals.merge(stats)
+            _requests += 1
+
+
+def totals() -> Dict[str, Any]:
+    """Acumulado do processo desde a partida, com o número de requisições medidas."""
+    with _lock:
+        return {"requests": _requests, **_totals.as_dict()}
+
+
+def cache_lookup(cache: str, hit: bool):
+    """Conta um acesso ao cache `cache` (ex.: "table", "session")."""
+    with _caches_lock:
+        counts = _caches.get(cache)
+        if counts is None:
+            counts = _caches[cache] = [0, 0]
+        counts[0 if hit else 1] += 1
+
+
+def caches() -> Dict[str, Dict[str, int]]:
+    """Acertos e faltas de cada cache desde a partida do processo."""
+    with _caches_lock:
+        return {cache: {"hits": hits, "misses": misses} for cache, (hits, misses) in sorted(_caches.items())}
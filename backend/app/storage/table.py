@@ -0,0 +1,850 @@
+import gc
+import os
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Generic, Hashable, Iterable, Iterator, List, Optional, Tuple, Type, TypeVar, get_args
+
+from pydantic import BaseModel, EmailStr, TypeAdapter, ValidationError, create_model
+
+from . import stats
+from .cache import cache_path, read_cache, write_cache
+from .columns import ColumnStore
+from .files import FsyncPolicy, atomic_write_bytes
+from .keys import keys_path, read_last_key, write_last_key
+from .locks import ProcessLock, TableVersion
+from .log import LogRecord, append_records, encode_records, log_path, read_records, skip_replaced, snapshot_record
+from .serializer import JSON, Serializer
+
+M = TypeVar("M", bound=BaseModel)
+
+# Função que extrai a chave de um índice a partir do registro (None = não indexa)
+KeyFunc = Callable[[Any], Optional[Hashable]]
+
+FileSignature = Optional[Tuple[int, int, int]]
+
+
+def file_signature(path: str) -> FileSignature:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+@contextmanager
+def gc_paused() -> Iterator[None]:
+    """
+    Suspende o coletor de lixo durante a montagem de muitos objetos de uma
+    vez (carga de tabela): as coletas disparadas pelas alocações não
+    encontrariam nada para liberar e custam boa parte do tempo.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _is_email(annotation: Any) -> bool:
+    return annotation is EmailStr or EmailStr in get_args(annotation)
+
+
+def trusted_model(model: Type[M]) -> Type[M]:
+    """
+    Subclasse de `model` usada para ler dados escritos por nós mesmos: campos
+    EmailStr viram str (a validação de email roda em Python e dominaria o
+    tempo de carga da tabela de usuários). Os demais campos continuam
+    convertidos pelo pydantic-core.
+    """
+    overrides = {}
+    for name, field in model.model_fields.items():
+        if _is_email(field.annotation):
+            annotation = Optional[str] if type(None) in get_args(field.annotation) else str
+            overrides[name] = (annotation, field)
+    if not overrides:
+        return model
+    return create_model(f"Trusted{model.__name__}", __base__=model, **overrides)
+
+
+class JsonTable(Generic[M]):
+    """
+    Tabela persistida em um arquivo JSON e mantida em memória.
+
+    - Os registros são lidos uma única vez, com a lista inteira validada de
+      uma vez (TypeAdapter). Como os arquivos são escritos por esta própria
+      camada, a carga usa trusted_model() e pula as validações caras; com
+      `verify`, valida tudo. verify_files() faz a verificação completa sob
+      demanda, sem trocar o cache
+    - Com `binary_cache`, a carga inicial usa <arquivo>.cache (ver cache.py)
+      quando ele corresponde aos arquivos atuais; save_cache() o atualiza
+    - O arquivo só é relido quando o mtime/tamanho muda (alteração externa)
+    - Escritas deste processo atualizam a cópia em memória diretamente
+    - Os registros ficam num dict chave primária → registro (busca O(1)),
+      que preserva a ordem de inserção do arquivo
+    - Índices únicos opcionais (ex.: email → registro) e índices de
+      múltiplos valores (ex.: collection_id → itens) são mantidos a cada
+      escrita, sem reconstrução
+    - Com `columns` (ColumnStore), uma cópia colunar dos registros também é
+      mantida a cada escrita, para consultas vetorizadas (columns()); ela
+      acelera consultas ao custo de memória adicional
+
+    Modos de gravação:
+    - "snapshot": cada escrita regrava o arquivo inteiro
+    - "log": cada escrita anexa registros compactos a <arquivo>.log; a
+      leitura aplica o log sobre o último snapshot, e checkpoint() consolida
+      o log num novo snapshot
+    - "memory": lê o arquivo (snapshot + log) uma vez e nunca grava; as
+      escritas ficam só em memória (testes de carga, benchmarks)
+
+    Gravação adiada (write-behind): com `write_behind_seconds` > 0, ou dentro
+    de begin_batch()/end_batch(), as mutações só marcam a tabela como suja e
+    são gravadas de uma vez em flush() — uma escrita por tabela por janela.
+    Numa transação (begin_transaction(), usada pela UnitOfWork) as gravações
+    também ficam adiadas, e as mutações podem ser desfeitas em memória.
+
+    Snapshots são sempre gravados de forma atômica (temporário + rename); a
+    `durability` (FsyncPolicy) decide quando os dados chegam ao disco.
+
+    Vários processos (workers) podem compartilhar os arquivos: com um
+    `process_lock`, flush e checkpoint acontecem sob o lock entre processos
+    (as mutações imediatas já chegam sob ele, pelo repositório), e uma
+    tabela com gravações adiadas mantém o lock até o flush. Cada gravação
+    incrementa a versão da tabela (posição `version_slot` do arquivo de
+    lock); os outros processos comparam a versão para invalidar o cache.
+    Sem `process_lock`, vale a assinatura (inode, mtime, tamanho) dos
+    arquivos.
+
+    Remover o registro com a maior chave grava essa chave em <arquivo>.keys
+    (ver keys.py): sem o arquivo de lock, next_key() não a reaproveita.
+    Com `keep_last_key`=False, quem usa a tabela guarda a chave (ShardedTable).
+    """
+
+    def __init__(self, path: str, model: Type[M], key: str = "id",
+                 unique: Optional[Dict[str, KeyFunc]] = None,
+                 multi: Optional[Dict[str, KeyFunc]] = None,
+                 mode: str = "snapshot", write_behind_seconds: float = 0.0,
+                 durability: Optional[FsyncPolicy] = None,
+                 process_lock: Optional[ProcessLock] = None, version_slot: int = 0,
+                 verify: bool = False, serializer: Serializer = JSON, pretty: bool = True,
+                 binary_cache: bool = False, columns: Optional[ColumnStore] = None,
+                 on_written: Optional[Callable[[], None]] = None, keep_last_key: bool = True):
+        if mode not in ("snapshot", "log", "memory"):
+            raise ValueError(f"Modo de armazenamento inválido: {mode}")
+        self.path = path
+        self.log_path = log_path(path)
+        self.model = model
+        self.key = key
+        self.mode = mode
+        self.write_behind_seconds = write_behind_seconds
+        self.durability = durability
+        self.verify = verify
+        self._row_model: Type[M] = model if verify else trusted_model(model)
+        self._list_adapter = TypeAdapter(List[self._row_model])
+        # Gravação pelo modelo original: aceita também as subclasses "trusted"
+        self._dump_adapter = TypeAdapter(List[model])
+        self.serializer = serializer
+        self.pretty = pretty
+        self.binary_cache = binary_cache
+        # Assinatura dos arquivos que o <arquivo>.cache atual representa
+        self._cache_source: Any = None
+        self.process_lock = process_lock
+        self.version_slot = version_slot
+        # Chamado a cada gravação nos arquivos (ex.: ShardedTable publica a sua versão)
+        self.on_written = on_written
+        self._version: Optional[TableVersion] = None
+        self._rows: Dict[int, M] = {}
+        self._unique_funcs: Dict[str, KeyFunc] = dict(unique or {})
+        self._unique: Dict[str, Dict[Hashable, int]] = {name: {} for name in self._unique_funcs}
+        # Registros que repetem o valor de um índice único nos arquivos (ex.:
+        # emails gravados antes da normalização): valor → demais chaves
+        self._duplicates: Dict[str, Dict[Hashable, Dict[int, None]]] = {name: {} for name in self._unique_funcs}
+        self._multi_funcs: Dict[str, KeyFunc] = dict(multi or {})
+        # valor → chaves primárias (dict usado como conjunto ordenado)
+        self._multi: Dict[str, Dict[Hashable, Dict[int, None]]] = {name: {} for name in self._multi_funcs}
+        self._columns = columns
+        self._snapshot_signature: FileSignature = None
+        self._log_signature: FileSignature = None
+        self._log_offset = 0
+        self._log_records = 0
+        self._loaded = False
+        # Maior chave já vista e próxima chave a reservar (next_key)
+        self._max_key = 0
+        self._next_key = 1
+        # Maior chave gravada em <arquivo>.keys
+        self.keep_last_key = keep_last_key
+        self._last_key = 0
+        # Só protege escritas e recargas; leituras usam _ensure_fresh()
+        self._lock = threading.RLock()
+        # Estado da gravação adiada
+        self._dirty = False
+        self._pending: List[LogRecord] = []
+        self._batch_depth = 0
+        self._flush_timer: Optional[threading.Timer] = None
+        # UnitOfWork que grava esta tabela junto com as outras (flush do timer)
+        self.unit_of_work: Optional[Any] = None
+        # Transação aberta: (chave, registro anterior) de cada mutação
+        self._undo: Optional[List[Tuple[int, Optional[M]]]] = None
+        self._undo_state: Tuple[bool, int] = (False, 0)
+
+    # --- Leitura ---
+
+    def _snapshot_bytes(self) -> Optional[bytes]:
+        try:
+            with open(self.path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return None
+        stats.read(len(raw))
+        return raw
+
+    def _read_snapshot(self) -> List[M]:
+        raw = self._snapshot_bytes()
+        if raw is None:
+            return []
+        try:
+            # Parse e validação da lista inteira de uma vez, no pydantic-core
+            with stats.timed("validate"):
+                return self._list_adapter.validate_json(raw)
+        except ValidationError as exc:
+            if any(error["type"] == "json_invalid" for error in exc.errors()):
+                return []
+            raise
+
+    def _replay(self, records: List[LogRecord]):
+        validate = self._row_model.model_validate
+        for record in records:
+            if record["op"] == "delete":
+                self._pop(record["key"])
+            elif record["op"] == "snapshot":
+                continue  # marca de troca do snapshot (ver log.skip_replaced)
+            else:
+                with stats.timed("validate"):
+                    row = validate(record["row"])
+                self._put(row)
+
+    def _refresh(self):
+        """Recarrega snapshot/log se mudaram desde a última leitura/escrita."""
+        if self.mode == "memory" and self._loaded:
+            return
+        if self._dirty:
+            # Há mutações ainda não gravadas: a cópia em memória é a mais nova
+            return
+
+        # A versão é lida antes dos arquivos: uma gravação concorrente com a
+        # leitura deixa a versão guardada para trás e força nova recarga
+        version = self._read_version()
+        snapshot_signature = file_signature(self.path)
+        log_signature = file_signature(self.log_path)
+
+        if (self._loaded and version == self._version
+                and snapshot_signature == self._snapshot_signature
+                and log_signature == self._log_signature):
+            return
+
+        # Mesma época: desde a última leitura os arquivos não foram trocados
+        # (a assinatura sozinha falha se o inode for reaproveitado)
+        same_epoch = version is None or (self._version is not None and version[0] == self._version[0])
+        log_grew = (
+            self._loaded and same_epoch
+            and snapshot_signature == self._snapshot_signature
+            and log_signature is not None and self._log_signature is not None
+            and log_signature[0] == self._log_signature[0]
+            and log_signature[2] >= self._log_offset
+        )
+        self._reload(log_grew, (snapshot_signature, log_signature))
+        self._version = version
+        self._snapshot_signature = snapshot_signature
+        self._log_signature = log_signature
+
+    def _reload(self, tail_only: bool, source: Any):
+        stats.count("load:" + os.path.basename(self.path))
+        with gc_paused():
+            if tail_only:
+                # Outro processo só anexou registros: aplica apenas o final do log
+                records, self._log_offset = read_records(self.log_path, self._log_offset, self.serializer)
+                self._log_records += len(records)
+                self._replay(records)
+            else:
+                if self.keep_last_key:
+                    self._last_key = read_last_key(self.path)
+                if not self._load_cache(source):
+                    self._set_rows(self._read_snapshot())
+                    records, self._log_offset = read_records(self.log_path, serializer=self.serializer)
+                    self._log_records = len(records)
+                    self._replay(skip_replaced(records, lambda: self._snapshot_bytes() or b""))
+        self._loaded = True
+
+    def _load_cache(self, source: Any) -> bool:
+        if not self.binary_cache:
+            return False
+        cached = read_cache(self.path, self.model, source)
+        stats.cache_lookup("binary", cached is not None)
+        if cached is None:
+            return False
+        self._set_rows(cached.rows)
+        self._log_offset = cached.log_offset
+        self._log_records = cached.log_records
+        self._cache_source = source
+        return True
+
+    def _read_version(self) -> Optional[TableVersion]:
+        if self.process_lock is None:
+            return None
+        return self.process_lock.read_version(self.version_slot)
+
+    def _is_current(self) -> bool:
+        return (self._read_version() == self._version
+                and file_signature(self.path) == self._snapshot_signature
+                and file_signature(self.log_path) == self._log_signature)
+
+    def _ensure_fresh(self):
+        """
+        Caminho de leitura: se a cópia em memória está em dia, segue sem
+        pegar o lock. As escritas só trocam referências ou alteram dicts em
+        operações atômicas sob o GIL, então o leitor vê o estado anterior ou
+        o posterior a cada mutação. Com uma transação aberta (`_dirty`), a
+        cópia já inclui as mutações dela; quem só pode ver o estado
+        confirmado lê via UnitOfWork.read_committed().
+        """
+        if self._loaded and (self.mode == "memory" or self._dirty or self._is_current()):
+            stats.cache_lookup("table", True)
+            return
+        stats.cache_lookup("table", False)
+        with self._lock:
+            self._refresh()
+
+    # --- Índices ---
+
+    def _set_rows(self, rows: List[M]):
+        # Índices montados à parte e publicados no fim: leitores sem lock
+        # nunca veem um índice pela metade
+        new_rows = {getattr(row, self.key): row for row in rows}
+        unique: Dict[str, Dict[Hashable, int]] = {}
+        duplicates: Dict[str, Dict[Hashable, Dict[int, None]]] = {}
+        for name, func in self._unique_funcs.items():
+            index: Dict[Hashable, int] = {}
+            repeated: Dict[Hashable, Dict[int, None]] = {}
+            for pk, row in new_rows.items():
+                value = func(row)
+                if value is not None:
+                    # Em caso de duplicata no arquivo, o índice aponta para o
+                    # primeiro registro e os demais ficam em _duplicates
+                    if index.setdefault(value, pk) != pk:
+                        repeated.setdefault(value, {})[pk] = None
+            unique[name] = index
+            duplicates[name] = repeated
+        multi: Dict[str, Dict[Hashable, Dict[int, None]]] = {}
+        for name, func in self._multi_funcs.items():
+            buckets: Dict[Hashable, Dict[int, None]] = {}
+            for pk, row in new_rows.items():
+                value = func(row)
+                if value is not None:
+                    buckets.setdefault(value, {})[pk] = None
+            multi[name] = buckets
+        if self._columns is not None:
+            self._columns.reset(list(new_rows.values()))
+        self._rows, self._unique, self._multi = new_rows, unique, multi
+        self._duplicates = duplicates
+        self._max_key = max(max(new_rows, default=0), self._last_key)
+
+    def _check_unique(self, row: M, pk: int):
+        for name, func in self._unique_funcs.items():
+            value = func(row)
+            if value is None or self._unique[name].get(value, pk) == pk:
+                continue
+            if pk in self._duplicates[name].get(value, ()):
+                continue  # duplicata que já existia nos arquivos: não é nova
+            raise ValueError(f"Valor duplicado para o índice '{name}' em {self.path}: {value}")
+
+    def _multi_add(self, row: M, pk: int):
+        for name, func in self._multi_funcs.items():
+            value = func(row)
+            if value is not None:
+                self._multi[name].setdefault(value, {})[pk] = None
+
+    def _index_add(self, row: M, pk: int):
+        for name, func in self._unique_funcs.items():
+            value = func(row)
+            if value is not None and self._unique[name].setdefault(value, pk) != pk:
+                self._duplicates[name].setdefault(value, {})[pk] = None
+        self._multi_add(row, pk)
+
+    def _index_remove(self, row: M, pk: int, replacement: Optional[M] = None):
+        for name, func in self._unique_funcs.items():
+            value = func(row)
+            if value is None or (replacement is not None and func(replacement) == value):
+                continue  # o valor não muda: o registro mantém a sua posição no índice
+            repeated = self._duplicates[name].get(value)
+            if self._unique[name].get(value) == pk:
+                if repeated:
+                    # Outro registro com o mesmo valor passa a ser o do índice
+                    successor = next(iter(repeated))
+                    del repeated[successor]
+                    self._unique[name][value] = successor
+                else:
+                    del self._unique[name][value]
+            elif repeated is not None:
+                repeated.pop(pk, None)
+            if repeated is not None and not repeated:
+                del self._duplicates[name][value]
+        for name, func in self._multi_funcs.items():
+            value = func(row)
+            bucket = self._multi[name].get(value)
+            if bucket is not None:
+                bucket.pop(pk, None)
+                if not bucket:
+                    del self._multi[name][value]
+
+    def _put(self, row: M) -> Optional[M]:
+        """Insere ou substitui o registro mantendo os índices."""
+        pk = getattr(row, self.key)
+        old = self._rows.get(pk)
+        if old is not None:
+            self._index_remove(old, pk, row)
+        self._rows[pk] = row
+        self._index_add(row, pk)
+        if self._columns is not None:
+            self._columns.put(row)
+        if pk > self._max_key:
+            self._max_key = pk
+        return old
+
+    def _pop(self, pk: int) -> Optional[M]:
+        removed = self._rows.pop(pk, None)
+        if removed is not None:
+            self._index_remove(removed, pk)
+            if self._columns is not None:
+                self._columns.remove(pk)
+        return removed
+
+    # --- Escrita ---
+
+    def _keep_last_key(self, pk: int):
+        """Antes de remover a chave `pk`: grava a maior chave já usada, se `pk` passa da gravada."""
+        if self.keep_last_key and self.mode != "memory" and pk > self._last_key:
+            self._last_key = write_last_key(self.path, max(pk, self._max_key), self.durability)
+
+    def _encode_snapshot(self, rows: List[M]) -> bytes:
+        # pydantic-core serializa os modelos direto, sem model_dump();
+        # `pretty` mantém o arquivo legível (indentação de 2 espaços)
+        with stats.timed("serialize"):
+            return self._dump_adapter.dump_json(rows, indent=2 if self.pretty else None)
+
+    def _write_snapshot(self):
+        stats.count("save:" + os.path.basename(self.path))
+        payload = self._encode_snapshot(list(self._rows.values()))
+        has_log = os.path.exists(self.log_path)
+        if has_log:
+            # O snapshot novo substitui o log. Se o processo cair entre a troca
+            # e a remoção do log, a marca impede que o replay do log antigo
+            # traga de volta registros que o snapshot novo removeu
+            append_records(self.log_path, [snapshot_record(payload)], self.durability, self.serializer)
+        atomic_write_bytes(self.path, payload, self.durability)
+        if has_log:
+            os.remove(self.log_path)
+        self._snapshot_signature = file_signature(self.path)
+        self._log_signature = None
+        self._log_offset = 0
+        self._log_records = 0
+        self._loaded = True
+        self._mark_written(new_epoch=True)
+
+    def _mark_written(self, new_epoch: bool):
+        """Publica a gravação deste processo aos demais (versão da tabela)."""
+        if self.process_lock is not None:
+            self._version = self.process_lock.bump_version(self.version_slot, new_epoch)
+        if self.on_written is not None:
+            self.on_written()
+
+    def _write(self, records: List[LogRecord]):
+        if self.mode == "snapshot":
+            self._write_snapshot()
+            return
+        stats.count("save:" + os.path.basename(self.log_path))
+        self._log_offset = append_records(self.log_path, records, self.durability, self.serializer)
+        self._log_records += len(records)
+        self._log_signature = file_signature(self.log_path)
+        self._mark_written(new_epoch=False)
+
+    def _commit(self, records: List[LogRecord]):
+        """Persiste (ou agenda a gravação de) uma mutação já aplicada em memória."""
+        if self.mode == "memory":
+            return
+        if self._batch_depth == 0 and self.write_behind_seconds <= 0:
+            self._write(records)
+            return
+        if not self._dirty and self.process_lock is not None:
+            # Até o flush, só este processo grava: a cópia em memória com as
+            # pendências continua sendo a mais nova entre todos os workers
+            self.process_lock.hold()
+        self._dirty = True
+        # Gravados no log ou, no modo "snapshot", só no journal da UnitOfWork
+        self._pending.extend(records)
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        if (self._dirty and self._batch_depth == 0 and self.write_behind_seconds > 0
+                and self._flush_timer is None):
+            self._flush_timer = threading.Timer(self.write_behind_seconds, self._flush_from_timer)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _flush_from_timer(self):
+        with self._lock:
+            self._flush_timer = None
+        self._flush_committed()
+
+    def _flush_committed(self):
+        """Flush fora do caminho das escritas (write-behind, checkpoint)."""
+        if self.unit_of_work is not None:
+            # Grava junto as pendências das outras tabelas (commit atômico) e
+            # espera a transação em andamento terminar
+            self.unit_of_work.flush()
+        else:
+            self.flush()
+
+    def _track(self, pk: int, old: Optional[M]):
+        """Guarda o estado anterior de um registro para rollback_transaction()."""
+        if self._undo is not None:
+            self._undo.append((pk, old))
+
+    def _cross_process(self):
+        """Lock entre processos (sempre adquirido antes do lock da tabela)."""
+        return self.process_lock if self.process_lock is not None else nullcontext()
+
+    def _clean(self):
+        """Descarta o estado de gravação adiada (já gravado ou substituído)."""
+        if self._dirty and self.process_lock is not None:
+            self.process_lock.release_hold()
+        self._dirty = False
+        self._pending = []
+
+    # --- API pública ---
+
+    def rows(self) -> List[M]:
+        """Retorna os registros, relendo o arquivo apenas se ele mudou."""
+        self._ensure_fresh()
+        # Cópia rasa: quem chama pode adicionar/remover sem afetar o cache
+        return list(self._rows.values())
+
+    def keys(self) -> List[int]:
+        """Chaves primárias, na ordem da tabela."""
+        self._ensure_fresh()
+        return list(self._rows)
+
+    def get(self, key: int) -> Optional[M]:
+        """Busca um registro pela chave primária em O(1)."""
+        self._ensure_fresh()
+        return self._rows.get(key)
+
+    def get_by(self, index: str, value: Hashable) -> Optional[M]:
+        """Busca um registro por um índice único em O(1)."""
+        self._ensure_fresh()
+        pk = self._unique[index].get(value)
+        return None if pk is None else self._rows.get(pk)
+
+    def get_many(self, keys: Iterable[int]) -> List[M]:
+        """Registros das chaves dadas, na mesma ordem (chaves inexistentes são ignoradas)."""
+        self._ensure_fresh()
+        rows = self._rows
+        return [row for row in map(rows.get, keys) if row is not None]
+
+    def columns(self) -> Optional[ColumnStore]:
+        """Cópia colunar dos registros (None sem o parâmetro `columns`)."""
+        self._ensure_fresh()
+        return self._columns
+
+    def find_by(self, index: str, value: Hashable) -> List[M]:
+        """Retorna os registros de um índice de múltiplos valores."""
+        self._ensure_fresh()
+        rows = self._rows
+        # list() copia as chaves de uma vez, sem ceder o GIL no meio
+        pks = list(self._multi[index].get(value, ()))
+        return [row for row in map(rows.get, pks) if row is not None]
+
+    def next_key(self) -> int:
+        """
+        Reserva a próxima chave primária em O(1). Cada chamada devolve uma
+        chave diferente, mesmo que o registro ainda não tenha sido inserido;
+        com `process_lock`, a sequência é persistida e comum aos workers.
+        """
+        with self._cross_process(), self._lock:
+            self._refresh()
+            key = max(self._max_key + 1, self._next_key)
+            if self.process_lock is not None:
+                key = self.process_lock.allocate_key(self.version_slot, key)
+            self._next_key = key + 1
+            return key
+
+    def insert(self, row: M) -> M:
+        with self._lock:
+            self._refresh()
+            key = getattr(row, self.key)
+            if key in self._rows:
+                raise ValueError(f"Chave duplicada em {self.path}: {key}")
+            self._check_unique(row, key)
+            self._put(row)
+            self._track(key, None)
+            self._commit([{"op": "insert", "row": row.model_dump()}])
+            return row
+
+    def replace(self, row: M) -> M:
+        """Substitui o registro de mesma chave, mantendo sua posição."""
+        with self._lock:
+            self._refresh()
+            key = getattr(row, self.key)
+            if key not in self._rows:
+                raise KeyError(key)
+            self._check_unique(row, key)
+            self._track(key, self._put(row))
+            self._commit([{"op": "update", "row": row.model_dump()}])
+            return row
+
+    def delete(self, key: int) -> Optional[M]:
+        """Remove o registro e o retorna (None se não existia)."""
+        with self._lock:
+            self._refresh()
+            removed = self._pop(key)
+            if removed is not None:
+                self._track(key, removed)
+                self._keep_last_key(key)
+                self._commit([{"op": "delete", "key": key}])
+            return removed
+
+    def delete_many(self, keys: List[int]) -> List[M]:
+        """Remove vários registros com uma única gravação do arquivo."""
+        with self._lock:
+            self._refresh()
+            removed = []
+            for key in keys:
+                row = self._pop(key)
+                if row is not None:
+                    self._track(key, row)
+                    removed.append(row)
+            if removed:
+                keys = [getattr(row, self.key) for row in removed]
+                self._keep_last_key(max(keys))
+                self._commit([{"op": "delete", "key": key} for key in keys])
+            return removed
+
+    def flush(self) -> bool:
+        """Grava as mutações adiadas; retorna False se não havia nada pendente."""
+        with self._cross_process(), self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._dirty or self._undo is not None:
+                # Numa transação, as pendências só são gravadas depois do commit
+                return False
+            records = self._pending
+            self._write(records)
+            self._clean()
+            return True
+
+    def begin_batch(self):
+        """Adia as gravações até o end_batch() correspondente."""
+        with self._lock:
+            self._batch_depth += 1
+
+    def end_batch(self, flush: bool = True):
+        """Com `flush`=False, as pendências ficam para quem chama (UnitOfWork.flush)."""
+        with self._lock:
+            self._batch_depth -= 1
+            done = self._batch_depth == 0
+            if done and not flush:
+                self._schedule_flush()
+        if done and flush:
+            self.flush()
+
+    @property
+    def deferred(self) -> bool:
+        """As gravações estão sendo adiadas (lote, transação ou write-behind)."""
+        return self._batch_depth > 0 or self.write_behind_seconds > 0
+
+    def begin_transaction(self):
+        """
+        Abre uma transação (UnitOfWork): as gravações ficam adiadas como num
+        lote e cada mutação guarda o estado anterior do registro.
+        """
+        with self._lock:
+            self._batch_depth += 1
+            self._undo = []
+            self._undo_state = (self._dirty, len(self._pending))
+
+    def commit_transaction(self):
+        """Fecha a transação; as pendências são gravadas por UnitOfWork.flush()."""
+        with self._lock:
+            self._undo = None
+            self.end_batch(flush=False)
+
+    def rollback_transaction(self):
+        """Desfaz em memória as mutações da transação e descarta suas pendências."""
+        with self._lock:
+            for pk, old in reversed(self._undo or ()):
+                if old is None:
+                    self._pop(pk)
+                else:
+                    self._put(old)
+            self._undo = None
+            was_dirty, pending = self._undo_state
+            del self._pending[pending:]
+            if not was_dirty:
+                self._clean()
+            self.end_batch(flush=False)
+
+    def pending_records(self) -> Dict[str, List[LogRecord]]:
+        """Mutações adiadas ainda não gravadas, por arquivo (journal da UnitOfWork)."""
+        with self._lock:
+            return {self.path: list(self._pending)} if self._dirty else {}
+
+    def apply_records(self, records: List[LogRecord]):
+        """Reaplica e grava registros de um journal (commit interrompido); idempotente."""
+        with self._cross_process(), self._lock:
+            self._refresh()
+            self._replay(records)
+            if self.mode != "memory":
+                self._write(records)
+
+    def save(self, rows: List[M]):
+        """
+        Grava a tabela inteira (snapshot) e descarta o log. Numa transação,
+        também grava na hora: um rollback só desfaz o que vier depois.
+        """
+        with self._lock:
+            # O snapshot completo já inclui qualquer mutação pendente
+            self._clean()
+            if self._undo is not None:
+                self._undo = []
+                self._undo_state = (False, 0)
+            previous = self._max_key
+            self._set_rows(rows)
+            if previous > self._max_key:
+                # Saíram os registros com as maiores chaves
+                self._keep_last_key(previous)
+                self._max_key = previous
+            if self.mode == "memory":
+                self._loaded = True
+                return
+            self._write_snapshot()
+
+    def log_stats(self) -> Tuple[int, int]:
+        """Tamanho do log em bytes e quantidade de registros ainda não consolidados."""
+        with self._lock:
+            self._refresh()
+            return self._log_offset, self._log_records
+
+    def checkpoint(self) -> bool:
+        """
+        Consolida o log num novo snapshot (arquivo temporário + rename) e
+        trunca o log. A serialização e a gravação do snapshot acontecem fora
+        do lock; só a troca final dos arquivos bloqueia as escritas.
+        Retorna False se não havia log para consolidar.
+        """
+        if self._batch_depth == 0:
+            # Dentro de um lote, as pendências só são gravadas no end_batch()
+            self._flush_committed()
+        with self._lock:
+            self._refresh()
+            if self.mode == "memory" or self._log_offset == 0:
+                return False
+            if self._dirty or self._undo is not None:
+                # Uma transação ou lote aberto: as linhas em memória ainda não
+                # estão gravadas. Fica para o próximo checkpoint.
+                return False
+            rows = list(self._rows.values())
+            offset = self._log_offset
+            version = self._version
+            snapshot_signature = self._snapshot_signature
+            log_signature = self._log_signature
+
+        # Registros são imutáveis (escritas usam model_copy), então a lista
+        # capturada pode ser serializada sem segurar o lock
+        payload = self._encode_snapshot(rows)
+
+        with self._cross_process(), self._lock:
+            current = self._read_version()
+            current_log = file_signature(self.log_path)
+            replaced = (
+                (current is not None and (version is None or current[0] != version[0]))
+                or file_signature(self.path) != snapshot_signature
+                or current_log is None or log_signature is None or current_log[0] != log_signature[0]
+            )
+            if replaced:
+                return False  # os arquivos foram substituídos nesse meio-tempo
+            if self._dirty or self._undo is not None:
+                return False  # o replay do final do log passaria por cima da transação
+            atomic_write_bytes(self.path, payload, self.durability)
+            # Mantém só o que foi anexado ao log durante a serialização. Se o
+            # processo cair antes desta troca, o replay do log inteiro sobre o
+            # novo snapshot é idempotente e leva ao mesmo estado.
+            tail, _ = read_records(self.log_path, offset, self.serializer)
+            if tail:
+                tail_data = encode_records(tail, self.serializer)
+                atomic_write_bytes(self.log_path, tail_data, self.durability)
+                self._log_offset = len(tail_data)
+            else:
+                os.remove(self.log_path)
+                self._log_offset = 0
+            self._log_records = len(tail)
+            # O final do log pode vir de outros processos
+            self._replay(tail)
+            self._snapshot_signature = file_signature(self.path)
+            self._log_signature = file_signature(self.log_path)
+            self._mark_written(new_epoch=True)
+            return True
+
+    def save_cache(self) -> bool:
+        """
+        Grava o cache binário (binary_cache) com o estado atual, se ele
+        ainda não estiver lá. Retorna False se não havia o que gravar.
+        """
+        if not self.binary_cache or self.mode == "memory":
+            # No modo "memory" o estado diverge dos arquivos de origem
+            return False
+        with self._cross_process(), self._lock:
+            self._refresh()
+            source = (self._snapshot_signature, self._log_signature)
+            if self._dirty or source in (self._cache_source, (None, None)):
+                return False
+            write_cache(self.path, self.model, source, list(self._rows.values()),
+                        self._log_offset, self._log_records)
+            self._cache_source = source
+            return True
+
+    def verify_files(self) -> List[str]:
+        """
+        Verificação de integridade: valida por completo o snapshot e o log
+        no disco. Retorna a lista de problemas (vazia se está tudo certo).
+        """
+        problems = []
+        try:
+            with open(self.path, "rb") as f:
+                data = self.serializer.loads(f.read())
+        except FileNotFoundError:
+            data = []
+        except ValueError as exc:
+            return [f"{self.path}: JSON inválido ({exc})"]
+        rows = [("snapshot", row) for row in data]
+        records, _ = read_records(self.log_path, serializer=self.serializer)
+        rows += [("log", record["row"]) for record in records if record.get("op") not in ("delete", "snapshot")]
+
+        for source, row in rows:
+            try:
+                self.model.model_validate(row)
+            except ValidationError as exc:
+                key = row.get(self.key) if isinstance(row, dict) else None
+                errors = "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors())
+                problems.append(f"{self.path} ({source}, {self.key}={key}): {errors}")
+        return problems
+
+    def files(self) -> List[str]:
+        """Arquivos desta tabela que existem no disco (snapshot, log, cache, chaves)."""
+        paths = (self.path, self.log_path, cache_path(self.path), keys_path(self.path))
+        return [path for path in paths if os.path.exists(path)]
+
+    def invalidate(self):
+        """Descarta o cache; a próxima leitura volta ao arquivo."""
+        with self._lock:
+            self._loaded = False
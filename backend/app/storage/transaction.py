@@ -0,0 +1,177 @@
+import os
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from . import stats
+from .files import FsyncPolicy, atomic_write_bytes
+from .locks import ProcessLock
+from .log import LogRecord
+from .serializer import JSON, Serializer
+
+JOURNAL_FORMAT = 1
+# Leituras otimistas (sem lock) antes de read_committed() ler sob o lock
+READ_RETRIES = 3
+
+
+class UnitOfWork:
+    """
+    Commit atômico das mutações de várias tabelas (JsonTable, NdjsonTable
+    ou ShardedTable), ex.: um item e os totais da sua coleção.
+
+    - Dentro de transaction(), as tabelas adiam as gravações e guardam o
+      estado anterior de cada registro alterado: uma exceção desfaz tudo
+      em memória, sem nada ter chegado ao disco
+    - No fim da transação mais externa, flush() grava cada tabela alterada
+      uma única vez (a menos que um lote ou o write-behind ainda adie)
+    - Se o commit toca mais de um arquivo, as mutações vão antes para o
+      journal (`journal_path`, gravado de forma atômica). Se o processo cair
+      entre as gravações das tabelas, recover() reaplica o journal na
+      próxima transação ou partida; o replay é idempotente, como o do log.
+      Sem `journal_path` (tabelas só em memória), não há journal
+
+    Transações são serializadas (uma por vez, em qualquer thread) e, com
+    `process_lock`, também entre processos.
+
+    As mutações de uma transação em andamento já estão na cópia em memória
+    das tabelas. Leituras de outras threads que não podem vê-las (nem as
+    que um rollback desfaria) passam por read_committed().
+    """
+
+    def __init__(self, tables: Sequence[Any], journal_path: Optional[str], durability: Optional[FsyncPolicy] = None,
+                 process_lock: Optional[ProcessLock] = None, serializer: Serializer = JSON):
+        self.tables = list(tables)
+        self.journal_path = journal_path
+        self.durability = durability
+        self.process_lock = process_lock
+        self.serializer = serializer
+        self._lock = threading.RLock()
+        self._depth = 0
+        # Ímpar enquanto uma transação está aberta (ver read_committed)
+        self._generation = 0
+        self._idle = threading.Event()
+        self._idle.set()
+        self._owner: Optional[int] = None
+        for table in self.tables:
+            # O write-behind de qualquer tabela grava todas juntas
+            table.unit_of_work = self
+
+    def _cross_process(self):
+        """Lock entre processos (sempre adquirido antes do lock da UnitOfWork)."""
+        return self.process_lock if self.process_lock is not None else nullcontext()
+
+    def recover(self) -> bool:
+        """Reaplica o journal de um commit interrompido; False se não havia journal."""
+        if self.journal_path is None:
+            return False
+        with self._cross_process(), self._lock:
+            try:
+                with open(self.journal_path, "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                return False
+            stats.read(len(data))
+            with stats.timed("parse"):
+                journal = self.serializer.loads(data)
+            if journal.get("format") != JOURNAL_FORMAT:
+                raise RuntimeError(f"Formato de journal desconhecido em {self.journal_path}")
+            for table in self.tables:
+                records = journal["tables"].get(table.path)
+                if records:
+                    table.apply_records(records)
+            os.remove(self.journal_path)
+            return True
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """
+        Bloco transacional. Uma transação aninhada faz parte da externa:
+        uma exceção em qualquer nível desfaz a transação inteira.
+        """
+        with self._cross_process(), self._lock:
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield
+                finally:
+                    self._depth -= 1
+                return
+
+            self.recover()
+            self._owner = threading.get_ident()
+            self._idle.clear()
+            self._generation += 1
+            for table in self.tables:
+                table.begin_transaction()
+            self._depth = 1
+            try:
+                yield
+            except BaseException:
+                for table in self.tables:
+                    table.rollback_transaction()
+                raise
+            else:
+                for table in self.tables:
+                    table.commit_transaction()
+            finally:
+                self._depth = 0
+                self._generation += 1
+                self._owner = None
+                self._idle.set()
+            if not any(table.deferred for table in self.tables):
+                self.flush()
+
+    def read_committed(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Executa a leitura `func` sobre o estado confirmado das tabelas.
+
+        Sem transação aberta (o caso comum), lê sem lock e confere no fim
+        que nenhuma começou no meio. Uma transação aberta em outra thread
+        bloqueia a leitura até o commit ou rollback (só a parte em memória;
+        a gravação em disco vem depois); as tabelas não guardam uma cópia
+        do estado anterior para servir leitores nesse meio-tempo. Depois de
+        READ_RETRIES tentativas interrompidas por transações, lê sob o lock
+        da UnitOfWork, sem nenhuma aberta: escritas seguidas não deixam um
+        leitor esperando para sempre.
+
+        A própria transação lê o seu estado, sem esperar.
+        """
+        if self._owner == threading.get_ident():
+            return func(*args, **kwargs)
+        for _ in range(READ_RETRIES):
+            generation = self._generation
+            if generation % 2:
+                self._idle.wait()
+                continue
+            result = func(*args, **kwargs)
+            if self._generation == generation:
+                return result
+        # As leituras não pegam o lock entre processos: a ordem dos locks
+        # (processo → UnitOfWork → tabela) é mantida
+        with self._lock:
+            return func(*args, **kwargs)
+
+    def flush(self) -> bool:
+        """Grava as pendências de todas as tabelas como um único commit; False se não havia nada."""
+        with self._cross_process(), self._lock:
+            if self._depth:
+                return False  # dentro de uma transação: o commit dela grava tudo
+            pending: Dict[str, List[LogRecord]] = {}
+            files = 0
+            for table in self.tables:
+                by_file = table.pending_records()
+                if by_file:
+                    files += len(by_file)
+                    pending[table.path] = [record for records in by_file.values() for record in records]
+            if not pending:
+                return False
+            journaled = files > 1 and self.journal_path is not None
+            if journaled:
+                with stats.timed("serialize"):
+                    data = self.serializer.dumps({"format": JOURNAL_FORMAT, "tables": pending})
+                atomic_write_bytes(self.journal_path, data, self.durability)
+            for table in self.tables:
+                table.flush()
+            if journaled:
+                os.remove(self.journal_path)
+            return True
@@ -0,0 +1,83 @@
+import contextvars
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+
+class StorageWriter:
+    """
+    Thread única de escrita: todas as mutações passam por uma fila e são
+    aplicadas uma de cada vez, na ordem de chegada. Quem enviou a mutação
+    espera pelo resultado (ou pela exceção) num Future.
+
+    Leitores não passam pela fila: leem direto a cópia em memória, que só
+    esta thread altera.
+
+    Cada mutação roda no contexto (contextvars) de quem a enviou: as
+    medições da requisição (storage/stats.py) incluem as suas gravações.
+    """
+
+    def __init__(self, name: str = "storage-writer"):
+        self.name = name
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _run(tasks: "queue.Queue[Optional[tuple]]"):
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            future, context, func, args, kwargs = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(context.run(func, *args, **kwargs))
+            except BaseException as exc:
+                future.set_exception(exc)
+
+    def _ensure_started(self):
+        if self._thread is None:
+            # Fila nova a cada início: uma thread encerrada nunca consome
+            # tarefas da seguinte
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(target=self._run, args=(self._queue,), name=self.name, daemon=True)
+            self._thread.start()
+
+    def start(self):
+        with self._lock:
+            self._ensure_started()
+
+    def in_writer(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def submit(self, func: Callable[..., Any], *args, **kwargs) -> Future:
+        """Enfileira a mutação; a thread é iniciada no primeiro uso."""
+        future: Future = Future()
+        with self._lock:
+            self._ensure_started()
+            self._queue.put((future, contextvars.copy_context(), func, args, kwargs))
+        return future
+
+    def call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Executa na thread de escrita e espera o resultado (bloqueia quem
+        chama: as rotas que fazem mutações são `def`, executadas pelo
+        FastAPI numa thread do threadpool, não no event loop).
+        """
+        if self.in_writer():
+            # Mutação chamada de dentro de outra (ex.: recálculo de todas as
+            # coleções): já estamos na vez dela
+            return func(*args, **kwargs)
+        return self.submit(func, *args, **kwargs).result()
+
+    def stop(self):
+        """Aplica o que já está na fila e encerra a thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._queue.put(None)
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
@@ -0,0 +1,73 @@
+"""
+Custo de cada política de fsync (config.FSYNC_POLICY) nas gravações JSON.
+
+Executa N atualizações de item, cada uma com sua gravação, sobre uma cópia
+de items.json num diretório temporário, para cada combinação de modo de
+armazenamento ("snapshot", "log") e política ("always", "periodic", "never").
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_fsync [--writes 200] [--items 1000]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from app.schemas import ItemInDB
+from app.storage import FsyncPolicy, JsonTable
+
+POLICIES = ("always", "periodic", "never")
+MODES = ("snapshot", "log")
+
+
+def make_items(count: int):
+    return [
+        ItemInDB(id=i, collection_id=1 + i % 10, name=f"Item {i}",
+                 description="Item gerado para o benchmark", estimated_value=10.0,
+                 quantity=1)
+        for i in range(1, count + 1)
+    ]
+
+
+def run(directory: str, mode: str, policy: str, items, writes: int) -> float:
+    """Retorna gravações por segundo."""
+    path = os.path.join(directory, f"items-{mode}-{policy}.json")
+    durability = FsyncPolicy(policy, interval_seconds=1.0)
+    table = JsonTable(path, ItemInDB, mode=mode, durability=durability)
+    table.save(items)
+
+    start = time.perf_counter()
+    for n in range(writes):
+        item = items[n % len(items)]
+        table.replace(item.model_copy(update={"quantity": n + 1}))
+    elapsed = time.perf_counter() - start
+
+    durability.stop()
+    return writes / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writes", type=int, default=200, help="gravações por combinação")
+    parser.add_argument("--items", type=int, default=1000, help="registros na tabela")
+    parser.add_argument("--dir", default=None, help="diretório dos arquivos (padrão: temporário)")
+    args = parser.parse_args()
+
+    items = make_items(args.items)
+    directory = args.dir or tempfile.mkdtemp(prefix="bench-fsync-")
+    try:
+        print(f"{args.writes} gravações, tabela com {args.items} itens, em {directory}")
+        print(f"{'modo':<10}{'política':<10}{'grav./s':>12}{'relativo':>10}")
+        for mode in MODES:
+            results = {policy: run(directory, mode, policy, items, args.writes) for policy in POLICIES}
+            baseline = results["never"]
+            for policy, rate in results.items():
+                print(f"{mode:<10}{policy:<10}{rate:>12.1f}{rate / baseline:>9.2f}x")
+    finally:
+        if args.dir is None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Consultas sobre os itens com e sem a cópia colunar (COLLECTMASTER_ITEM_COLUMNS):
+- "totais": get_item_totals() de todas as coleções (recalcular-estatisticas)
+- "busca": search_items() em 10% das coleções, com faixa de valor e
+  ordenação por valor decrescente
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_items [--items 200000] [--collections 1000] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+
+from app import config
+from app.db_json import JsonRepository
+from app.schemas import ItemInDB
+from app.storage import JsonTable, columns_enabled
+
+from .bench_load import best_of
+
+
+def make_items(count: int, collections: int):
+    rng = random.Random(0)
+    return [
+        ItemInDB(id=i, collection_id=rng.randint(1, collections), name=f"Item {rng.randint(1, 5000)}",
+                 description="Item gerado para o benchmark", estimated_value=round(rng.uniform(1, 1000), 2),
+                 quantity=rng.randint(1, 5))
+        for i in range(1, count + 1)
+    ]
+
+
+def open_repository(directory: str, item_columns: str) -> JsonRepository:
+    config.ITEM_COLUMNS = item_columns
+    repository = JsonRepository(os.path.join(directory, "users.json"), os.path.join(directory, "collections.json"),
+                                os.path.join(directory, "items.json"), mode="memory")
+    repository.load_items()
+    return repository
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=200000)
+    parser.add_argument("--collections", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3, help="execuções por consulta (vale a melhor)")
+    args = parser.parse_args()
+    if not columns_enabled("auto"):
+        parser.error("NumPy não está instalado (pip install numpy)")
+
+    directory = tempfile.mkdtemp(prefix="bench-items-")
+    try:
+        JsonTable(os.path.join(directory, "items.json"), ItemInDB).save(make_items(args.items, args.collections))
+        collection_ids = list(range(1, args.collections + 1, 10))
+        print(f"{'consulta':<10}{'python (ms)':>14}{'colunar (ms)':>14}{'ganho':>8}")
+        repositories = {setting: open_repository(directory, setting) for setting in ("0", "1")}
+        queries = {
+            "totais": lambda repository: repository.get_item_totals(),
+            "busca": lambda repository: repository.search_items(
+                collection_ids, min_value=100, max_value=500, sort_by="estimated_value", descending=True),
+        }
+        for name, query in queries.items():
+            plain, columnar = (best_of(args.repeat, lambda: query(repositories[setting])) for setting in ("0", "1"))
+            print(f"{name:<10}{plain * 1000:>14.1f}{columnar * 1000:>14.1f}{plain / columnar:>7.1f}x")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Tempo de carga das tabelas JSON de usuários e itens:
+- "por registro": json.load + Model(**row) para cada registro (carga antiga)
+- "validada": lista inteira validada de uma vez (COLLECTMASTER_STORAGE_VERIFY=1)
+- "confiável": lista inteira com trusted_model() (padrão)
+- "cache binário": restaurada do <tabela>.cache (COLLECTMASTER_BINARY_CACHE=1)
+- "log" / "log + cache": modo "log" com cada registro alterado uma vez no
+  log, reaplicado na carga ou restaurado do cache
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_load [--rows 20000] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from app.schemas import ItemInDB, UserInDB
+from app.storage import JsonTable
+
+from .bench_fsync import make_items
+
+
+def make_users(count: int):
+    return [
+        UserInDB(id=i, name=f"Usuário {i}", email=f"usuario{i}@example.com",
+                 hashed_password="$2b$12$" + "x" * 53)
+        for i in range(1, count + 1)
+    ]
+
+
+def best_of(repeat: int, func) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def per_record(path: str, model):
+    with open(path) as f:
+        return [model(**row) for row in json.load(f)]
+
+
+def write_log_table(path: str, model, rows):
+    table = JsonTable(path, model, mode="log")
+    table.save(rows)
+    table.begin_batch()
+    for row in rows:
+        table.replace(row.model_copy())
+    table.end_batch()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000, help="registros por tabela")
+    parser.add_argument("--repeat", type=int, default=3, help="cargas por modo (vale a melhor)")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bench-load-")
+    try:
+        print(f"{'tabela':<10}{'modo':<16}{'ms':>10}{'relativo':>10}")
+        for name, model, rows in (("users", UserInDB, make_users(args.rows)),
+                                  ("items", ItemInDB, make_items(args.rows))):
+            path = os.path.join(directory, f"{name}.json")
+            JsonTable(path, model).save(rows)
+            log_path = os.path.join(directory, f"{name}-log.json")
+            write_log_table(log_path, model, rows)
+            for cache_path, mode in ((path, "snapshot"), (log_path, "log")):
+                cached = JsonTable(cache_path, model, mode=mode, binary_cache=True)
+                cached.rows()
+                cached.save_cache()
+            results = {
+                "por registro": best_of(args.repeat, lambda: per_record(path, model)),
+                "validada": best_of(args.repeat, lambda: JsonTable(path, model, verify=True).rows()),
+                "confiável": best_of(args.repeat, lambda: JsonTable(path, model).rows()),
+                "cache binário": best_of(args.repeat, lambda: JsonTable(path, model, binary_cache=True).rows()),
+                "log": best_of(args.repeat, lambda: JsonTable(log_path, model, mode="log").rows()),
+                "log + cache": best_of(
+                    args.repeat, lambda: JsonTable(log_path, model, mode="log", binary_cache=True).rows()),
+            }
+            baseline = results["por registro"]
+            for mode, seconds in results.items():
+                print(f"{name:<10}{mode:<16}{seconds * 1000:>10.1f}{seconds / baseline:>9.2f}x")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Itens em items.json (tudo em memória) x items.ndjson (mmap + índice):
+memória retida pela tabela carregada, tempo de abertura e de consultas.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_ndjson [--items 200000] [--collections 1000]
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from app.schemas import ItemInDB
+from app.storage import JsonTable, NdjsonTable
+
+from .bench_items import make_items
+
+
+def measure(open_table):
+    """(tabela aberta, memória retida por ela em MB, segundos para abrir)."""
+    start = time.perf_counter()
+    open_table().get(1)
+    elapsed = time.perf_counter() - start
+    # Memória medida numa segunda abertura: o tracemalloc deixa a carga lenta
+    tracemalloc.start()
+    table = open_table()
+    table.get(1)
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return table, retained / 2 ** 20, elapsed
+
+
+def per_call_us(func, args_list) -> float:
+    start = time.perf_counter()
+    for args in args_list:
+        func(*args)
+    return (time.perf_counter() - start) / len(args_list) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=200000)
+    parser.add_argument("--collections", type=int, default=1000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bench-ndjson-")
+    try:
+        items = make_items(args.items, args.collections)
+        json_path = os.path.join(directory, "items.json")
+        ndjson_path = os.path.join(directory, "items.ndjson")
+        JsonTable(json_path, ItemInDB).save(items)
+        NdjsonTable(ndjson_path, ItemInDB, group="collection_id").save(items)
+        NdjsonTable(ndjson_path, ItemInDB, group="collection_id").save_cache()
+        del items
+
+        rng = random.Random(1)
+        keys = [(rng.randint(1, args.items),) for _ in range(2000)]
+        groups = [("collection_id", rng.randint(1, args.collections)) for _ in range(200)]
+        setups = {
+            "json": lambda: JsonTable(json_path, ItemInDB, multi={"collection_id": lambda item: item.collection_id}),
+            "ndjson (varredura)": lambda: NdjsonTable(ndjson_path + ".sem-indice", ItemInDB, group="collection_id"),
+            "ndjson (.idx)": lambda: NdjsonTable(ndjson_path, ItemInDB, group="collection_id"),
+        }
+        # Mesmo arquivo, sem o .idx ao lado: o índice é montado lendo as linhas
+        shutil.copy(ndjson_path, ndjson_path + ".sem-indice")
+
+        print(f"{'tabela':<20}{'memória (MB)':>14}{'abertura (ms)':>15}{'get (µs)':>10}{'find_by (µs)':>14}")
+        for name, open_table in setups.items():
+            table, megabytes, seconds = measure(open_table)
+            get_us = per_call_us(table.get, keys)
+            find_us = per_call_us(table.find_by, groups)
+            print(f"{name:<20}{megabytes:>14.1f}{seconds * 1000:>15.0f}{get_us:>10.1f}{find_us:>14.1f}")
+            del table
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
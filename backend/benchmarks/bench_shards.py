@@ -0,0 +1,78 @@
+"""
+Custo de cada escrita nos itens (modo "snapshot"): items.json inteiro x um
+arquivo por coleção (COLLECTMASTER_ITEM_STORAGE=sharded). Mede a
+atualização de um item e a remoção em cascata de uma coleção, com os
+bytes gravados por operação.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_shards [--items 50000] [--collections 500] [--writes 50]
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from app.schemas import ItemInDB
+from app.storage import JsonTable, ProcessLock, ShardedTable, shards_directory
+
+from .bench_items import make_items
+
+
+def disk_bytes(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=50000)
+    parser.add_argument("--collections", type=int, default=500)
+    parser.add_argument("--writes", type=int, default=50, help="atualizações medidas por tabela")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bench-shards-")
+    try:
+        items = make_items(args.items, args.collections)
+        json_path = os.path.join(directory, "items.json")
+        # Como no repositório: versões no arquivo de lock, sem conferir cada shard a cada leitura
+        process_lock = ProcessLock(os.path.join(directory, "bench.lock"))
+        tables = {
+            "items.json": JsonTable(json_path, ItemInDB, multi={"collection_id": lambda item: item.collection_id},
+                                    process_lock=process_lock, version_slot=0),
+            "shards": ShardedTable(shards_directory(json_path), ItemInDB, shard_by="collection_id",
+                                   process_lock=process_lock, version_slot=1, first_shard_slot=2),
+        }
+        rng = random.Random(2)
+        updates = [rng.randint(1, args.items) for _ in range(args.writes)]
+        cascades = rng.sample(range(1, args.collections + 1), 5)
+
+        print(f"{'tabela':<12}{'no disco (MB)':>15}{'update (ms)':>13}{'cascata (ms)':>14}{'KB por update':>15}")
+        for name, table in tables.items():
+            table.save(items)
+            size = disk_bytes(table.path if name == "items.json" else table.directory)
+
+            start = time.perf_counter()
+            written = 0
+            for key in updates:
+                item = table.get(key)
+                table.replace(item.model_copy(update={"quantity": item.quantity + 1}))
+                written += len(table.find_by("collection_id", item.collection_id)) if name == "shards" else args.items
+            update_ms = (time.perf_counter() - start) / len(updates) * 1000
+
+            start = time.perf_counter()
+            for collection_id in cascades:
+                table.delete_many([item.id for item in table.find_by("collection_id", collection_id)])
+            cascade_ms = (time.perf_counter() - start) / len(cascades) * 1000
+
+            # Bytes regravados por update: proporcionais aos itens do arquivo tocado
+            kb_per_update = written / len(updates) * size / args.items / 1024
+            print(f"{name:<12}{size / 2 ** 20:>15.1f}{update_ms:>13.2f}{cascade_ms:>14.2f}{kb_per_update:>15.1f}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
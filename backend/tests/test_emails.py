@@ -0,0 +1,85 @@
+"""Emails que só diferem em maiúsculas: índice único e fusão pela manutenção."""
+import json
+
+import pytest
+
+from app import manutencao
+from app.db_json import JsonRepository
+from app.repository import set_repository
+from app.schemas import UserInDB, normalize_email
+from app.session import RepositorySession
+from app.storage import JsonTable
+
+
+def _user(pk, email):
+    return {"id": pk, "name": f"u{pk}", "email": email, "hashed_password": "x"}
+
+
+def _write(path, rows):
+    with open(path, "w") as f:
+        json.dump(rows, f)
+
+
+def _users(tmp_path):
+    path = str(tmp_path / "users.json")
+    _write(path, [_user(1, "Ana@x.com"), _user(2, "ana@x.com"), _user(3, "bia@x.com")])
+    return JsonTable(path, UserInDB, unique={"email": lambda user: normalize_email(user.email)})
+
+
+def test_index_tolerates_existing_collisions(tmp_path):
+    table = _users(tmp_path)
+    assert table.get_by("email", "ana@x.com").id == 1
+
+    # Os dois registros da colisão continuam editáveis
+    table.replace(table.get(2).model_copy(update={"name": "outra"}))
+    table.replace(table.get(1).model_copy(update={"name": "primeira"}))
+    assert table.get_by("email", "ana@x.com").id == 1
+
+    # Uma colisão nova continua proibida
+    with pytest.raises(ValueError):
+        table.insert(UserInDB(**_user(4, "ANA@x.com")))
+    with pytest.raises(ValueError):
+        table.replace(table.get(3).model_copy(update={"email": "Ana@X.com"}))
+
+    # Sem o primeiro, o índice passa para o outro registro
+    table.delete(1)
+    assert table.get_by("email", "ana@x.com").id == 2
+    table.delete(2)
+    assert table.get_by("email", "ana@x.com") is None
+
+
+def test_emails_duplicados_merges_users(tmp_path, capsys):
+    users, collections = str(tmp_path / "users.json"), str(tmp_path / "collections.json")
+    _write(users, [_user(1, "Ana@x.com"), _user(2, "ana@x.com"), _user(3, "bia@x.com")])
+    _write(collections, [{"id": 1, "name": "c1", "owner_id": 2}, {"id": 2, "name": "c2", "owner_id": 3}])
+    set_repository(JsonRepository(users, collections, str(tmp_path / "items.json")))
+    try:
+        with pytest.raises(SystemExit):
+            manutencao.main(["emails-duplicados"])
+        assert "duplicados: 2 (ana@x.com)" in capsys.readouterr().out
+
+        manutencao.main(["emails-duplicados", "--corrigir"])
+        repository = JsonRepository(users, collections, str(tmp_path / "items.json"))
+        assert [user.id for user in repository.load_users()] == [1, 3]
+        assert {col.id: col.owner_id for col in repository.load_collections()} == {1: 1, 2: 3}
+        repository.stop()
+
+        manutencao.main(["emails-duplicados"])
+        assert "Nenhum email duplicado." in capsys.readouterr().out
+    finally:
+        set_repository(None)
+
+
+def test_session_caches_email_case_insensitively(tmp_path):
+    table = _users(tmp_path)
+    calls = []
+
+    class Repository:
+        def get_user_by_email(self, email):
+            calls.append(email)
+            return table.get_by("email", normalize_email(email))
+
+    session = RepositorySession(Repository())
+    user = session.get_user_by_email("ANA@x.com")
+    assert session.get_user_by_email(" ana@X.com") is user
+    assert user.id == 1 and calls == ["ANA@x.com"]
@@ -0,0 +1,47 @@
+"""Chaves primárias: a maior chave já usada sobrevive à perda do arquivo de lock."""
+import os
+
+import pytest
+from pydantic import BaseModel
+
+from app.storage import JsonTable, NdjsonTable, ProcessLock, ShardedTable
+
+
+class Row(BaseModel):
+    id: int
+    group: int
+
+
+def _open(kind, tmp_path, mode):
+    lock = ProcessLock(str(tmp_path / "collectmaster.lock"))
+    if kind == "json":
+        return JsonTable(str(tmp_path / "rows.json"), Row, mode=mode, process_lock=lock)
+    if kind == "ndjson":
+        return NdjsonTable(str(tmp_path / "rows.ndjson"), Row, group="group", mode=mode, process_lock=lock)
+    return ShardedTable(str(tmp_path / "rows.shards"), Row, shard_by="group", mode=mode,
+                        process_lock=lock, first_shard_slot=1)
+
+
+def _insert(table, group):
+    return table.insert(Row(id=table.next_key(), group=group)).id
+
+
+@pytest.mark.parametrize("mode", ["snapshot", "log"])
+@pytest.mark.parametrize("kind", ["json", "ndjson", "sharded"])
+def test_deleted_last_key_is_not_reused_without_lock_file(tmp_path, kind, mode):
+    table = _open(kind, tmp_path, mode)
+    assert [_insert(table, 1), _insert(table, 2), _insert(table, 2)] == [1, 2, 3]
+    table.delete(3)
+    table.checkpoint()  # a compactação descarta a remoção do log/NDJSON
+    os.remove(tmp_path / "collectmaster.lock")
+
+    # Nova partida: a sequência só pode vir dos arquivos de dados
+    table = _open(kind, tmp_path, mode)
+    assert _insert(table, 2) == 4
+
+    # Também quando o shard inteiro sai junto com a maior chave
+    table.delete_many([2, 4])
+    table.checkpoint()
+    os.remove(tmp_path / "collectmaster.lock")
+    table = _open(kind, tmp_path, mode)
+    assert _insert(table, 1) == 5
@@ -0,0 +1,79 @@
+"""Log de escrita: replay depois de uma queda no meio da troca do snapshot, e checkpoints."""
+import logging
+import os
+import threading
+
+import pytest
+from pydantic import BaseModel
+
+from app.storage import Checkpointer, JsonTable
+from app.storage import table as table_module
+
+
+class Row(BaseModel):
+    id: int
+    name: str
+
+
+class Crash(Exception):
+    pass
+
+
+def _crash(*args, **kwargs):
+    raise Crash()
+
+
+def _table(tmp_path):
+    table = JsonTable(str(tmp_path / "rows.json"), Row, mode="log")
+    table.insert(Row(id=1, name="a"))
+    table.insert(Row(id=2, name="b"))
+    return table
+
+
+def _ids(path):
+    return sorted(row.id for row in JsonTable(path, Row, mode="log").rows())
+
+
+def test_old_log_is_not_replayed_over_new_snapshot(tmp_path, monkeypatch):
+    table = _table(tmp_path)
+    # Queda depois da troca do snapshot, antes de remover o log
+    monkeypatch.setattr(table_module.os, "remove", _crash)
+    with pytest.raises(Crash):
+        table.save([Row(id=1, name="a")])
+    monkeypatch.undo()
+    assert os.path.exists(table.log_path)
+
+    assert _ids(table.path) == [1]
+    # Registros anexados depois da marca continuam valendo
+    reopened = JsonTable(table.path, Row, mode="log")
+    reopened.insert(Row(id=3, name="c"))
+    assert _ids(table.path) == [1, 3]
+
+
+def test_log_is_replayed_when_snapshot_was_not_replaced(tmp_path, monkeypatch):
+    table = _table(tmp_path)
+    # Queda depois de gravar a marca, antes de trocar o snapshot
+    monkeypatch.setattr(table_module, "atomic_write_bytes", _crash)
+    with pytest.raises(Crash):
+        table.save([Row(id=1, name="a")])
+    monkeypatch.undo()
+
+    assert _ids(table.path) == [1, 2]
+    assert JsonTable(table.path, Row, mode="log").verify_files() == []
+
+
+def test_checkpointer_logs_failures(tmp_path, monkeypatch, caplog):
+    table = _table(tmp_path)
+    failed = threading.Event()
+
+    def checkpoint():
+        failed.set()
+        raise Crash()
+
+    monkeypatch.setattr(table, "checkpoint", checkpoint)
+    checkpointer = Checkpointer([table], max_log_records=1, poll_seconds=0.01)
+    with caplog.at_level(logging.ERROR, logger="app.storage.checkpoint"):
+        checkpointer.start()
+        assert failed.wait(5)
+        checkpointer.stop()
+    assert caplog.records[0].exc_info[0] is Crash
@@ -0,0 +1,50 @@
+"""Comandos de manutenção: cada um para só os repositórios que abriu."""
+import pytest
+
+from app import manutencao
+
+
+class FakeRepository:
+    def __init__(self, stopped, name, users=()):
+        self.stopped = stopped
+        self.name = name
+        self.users = list(users)
+
+    def load_users(self):
+        return self.users
+
+    def load_collections(self):
+        return []
+
+    def load_items(self):
+        return []
+
+    def import_from(self, source):
+        return {"users": 0, "collections": 0, "items": 0}
+
+    def verify(self):
+        raise RuntimeError("falhou")
+
+    def stop(self):
+        self.stopped.append(self.name)
+
+
+def _no_default_repository():
+    raise AssertionError("o repositório padrão não devia ser criado")
+
+
+def test_migrar_sqlite_stops_only_its_repositories(monkeypatch):
+    stopped = []
+    monkeypatch.setattr(manutencao, "get_repository", _no_default_repository)
+    monkeypatch.setattr(manutencao, "JsonRepository", lambda mode: FakeRepository(stopped, "json"))
+    monkeypatch.setattr(manutencao, "SqliteRepository", lambda: FakeRepository(stopped, "sqlite"))
+    manutencao.main(["migrar-sqlite"])
+    assert stopped == ["sqlite", "json"]
+
+
+def test_failed_command_stops_its_repository(monkeypatch):
+    stopped = []
+    monkeypatch.setattr(manutencao, "get_repository", lambda: FakeRepository(stopped, "ativo"))
+    with pytest.raises(RuntimeError):
+        manutencao.main(["verificar"])
+    assert stopped == ["ativo"]
@@ -0,0 +1,32 @@
+"""Repositório SQLite: conexões por thread."""
+import sqlite3
+import threading
+
+from app.db_sqlite import SqliteRepository
+
+
+def test_stop_closes_connections_of_every_thread(tmp_path):
+    repository = SqliteRepository(str(tmp_path / "collectmaster.db"))
+    opened, stopped = threading.Event(), threading.Event()
+    closed = []
+
+    def worker():
+        conn = repository._connect()
+        opened.set()
+        stopped.wait()
+        try:
+            conn.execute("SELECT 1")
+        except sqlite3.ProgrammingError:
+            closed.append(conn)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    opened.wait()
+    repository.stop()
+    stopped.set()
+    thread.join()
+    assert len(closed) == 1
+
+    # Depois do stop(), cada thread abre uma conexão nova
+    assert repository.load_users() == []
+    repository.stop()
@@ -0,0 +1,146 @@
+"""Transações da UnitOfWork: checkpoint e leituras de outras threads durante uma transação."""
+import threading
+
+from pydantic import BaseModel
+
+from app.storage import JsonTable, NdjsonTable, UnitOfWork
+from app.storage.transaction import READ_RETRIES
+
+
+class Row(BaseModel):
+    id: int
+    name: str
+
+
+def _ids(table):
+    return sorted(row.id for row in table.rows())
+
+
+def test_checkpoint_during_transaction_does_not_write_uncommitted_rows(tmp_path):
+    path = str(tmp_path / "rows.json")
+    table = JsonTable(path, Row, mode="log")
+    table.insert(Row(id=1, name="a"))
+
+    table.begin_transaction()
+    table.insert(Row(id=2, name="b"))
+    table.checkpoint()
+    table.rollback_transaction()
+
+    assert _ids(table) == [1]
+    assert _ids(JsonTable(path, Row, mode="log")) == [1]
+
+
+def test_checkpoint_inside_unit_of_work_transaction(tmp_path):
+    users = JsonTable(str(tmp_path / "users.json"), Row, mode="log")
+    items = NdjsonTable(str(tmp_path / "items.ndjson"), Row, mode="log")
+    unit = UnitOfWork([users, items], journal_path=str(tmp_path / "journal.json"))
+    with unit.transaction():
+        users.insert(Row(id=1, name="a"))
+        items.insert(Row(id=1, name="a"))
+    items.replace(Row(id=1, name="b"))  # linha morta: dá o que compactar
+
+    try:
+        with unit.transaction():
+            users.insert(Row(id=2, name="b"))
+            items.insert(Row(id=2, name="b"))
+            assert users.checkpoint() is False
+            items.checkpoint()
+            raise RuntimeError("rollback")
+    except RuntimeError:
+        pass
+
+    assert _ids(users) == _ids(items) == [1]
+    assert _ids(JsonTable(users.path, Row, mode="log")) == [1]
+    assert _ids(NdjsonTable(items.path, Row, mode="log")) == [1]
+
+    # Fora da transação o checkpoint volta a consolidar
+    assert users.checkpoint() is True
+    assert _ids(JsonTable(users.path, Row, mode="log")) == [1]
+
+
+def _ndjson_with_dead_line(tmp_path):
+    items = NdjsonTable(str(tmp_path / "items.ndjson"), Row, mode="log")
+    unit = UnitOfWork([items], journal_path=str(tmp_path / "journal.json"))
+    with unit.transaction():
+        items.insert(Row(id=1, name="a"))
+    items.replace(Row(id=1, name="b"))  # linha morta: dá o que compactar
+    return items, unit
+
+
+def test_ndjson_checkpoint_inside_committed_transaction(tmp_path):
+    items, unit = _ndjson_with_dead_line(tmp_path)
+    with unit.transaction():
+        items.insert(Row(id=2, name="c"))
+        assert items.checkpoint() is False
+        assert items.get(2).name == "c"
+
+    with open(items.path, "rb") as f:
+        assert b"\n\n" not in f.read()
+    reopened = NdjsonTable(items.path, Row, mode="log")
+    assert [(row.id, row.name) for row in reopened.rows()] == [(1, "b"), (2, "c")]
+    assert items.checkpoint() is True
+    assert _ids(NdjsonTable(items.path, Row, mode="log")) == [1, 2]
+
+
+def test_checkpoint_inside_batch_does_not_flush(tmp_path):
+    items, _ = _ndjson_with_dead_line(tmp_path)
+    users = JsonTable(str(tmp_path / "users.json"), Row, mode="log")
+    users.insert(Row(id=1, name="a"))
+    for table in (items, users):
+        table.begin_batch()
+        table.insert(Row(id=2, name="c"))
+        assert table.checkpoint() is False
+        assert _ids(type(table)(table.path, Row, mode="log")) == [1]
+        table.end_batch()
+        assert _ids(type(table)(table.path, Row, mode="log")) == [1, 2]
+
+
+def test_read_committed_waits_for_open_transaction(tmp_path):
+    table = JsonTable(str(tmp_path / "rows.json"), Row, mode="memory")
+    unit = UnitOfWork([table], journal_path=None)
+    with unit.transaction():
+        table.insert(Row(id=1, name="a"))
+    opened, release = threading.Event(), threading.Event()
+
+    def write():
+        try:
+            with unit.transaction():
+                table.insert(Row(id=2, name="b"))
+                opened.set()
+                release.wait()
+                raise RuntimeError("rollback")
+        except RuntimeError:
+            pass
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    opened.wait()
+    assert _ids(table) == [1, 2]  # leitura direta: vê a transação em andamento
+    seen = []
+    reader = threading.Thread(target=lambda: seen.append(unit.read_committed(_ids, table)))
+    reader.start()
+    reader.join(0.2)
+    assert reader.is_alive()  # espera o fim da transação
+    release.set()
+    writer.join()
+    reader.join()
+    assert seen == [[1]]
+    # A própria transação lê o seu estado
+    with unit.transaction():
+        table.insert(Row(id=3, name="c"))
+        assert unit.read_committed(_ids, table) == [1, 3]
+
+
+def test_read_committed_retries_are_capped(tmp_path):
+    table = JsonTable(str(tmp_path / "rows.json"), Row, mode="memory")
+    unit = UnitOfWork([table], journal_path=None)
+    calls = []
+
+    def read():
+        # Cada leitura é interrompida por uma transação inteira
+        calls.append(unit._generation)
+        unit._generation += 2
+        return _ids(table)
+
+    assert unit.read_committed(read) == []
+    assert len(calls) == READ_RETRIES + 1